@@ -0,0 +1,310 @@
+# benchmarks/bench.py
+#
+# Замеры производительности через публичный API на синтетических таблицах
+# разного размера. Для каждого размера создается временная база, таблица
+# загружается из сгенерированного CSV, затем замеряются отдельные команды:
+# время каждой операции (перцентили), число операций в секунду и пиковая
+# память процесса. Каждый размер замеряется в отдельном процессе, чтобы
+# пиковая память не зависела от предыдущих размеров.
+#
+#     python -m benchmarks.bench --sizes 1000,100000,1000000
+#     python -m benchmarks.bench --save benchmarks/baseline.json
+#     python -m benchmarks.bench --baseline benchmarks/baseline.json
+#
+# С --baseline результаты сравниваются с сохраненными: если медианное время
+# операции или пиковая память выросли больше чем на --tolerance, запуск
+# завершается с кодом 1.
+
+import argparse
+import csv
+import json
+import multiprocessing
+import os
+import platform
+import queue
+import random
+import resource
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+
+from prettytable import PrettyTable
+
+from src.primitive_db import connect
+
+TABLE = "bench"
+# Схема таблицы: имя столбца, тип и генератор значения.
+SCHEMA = (
+    ("name", "str", lambda rng: f"user{rng.randrange(1_000_000)}"),
+    ("age", "int", lambda rng: rng.randrange(18, 100)),
+    ("score", "int", lambda rng: rng.randrange(1_000_000)),
+    ("active", "bool", lambda rng: rng.random() < 0.5),
+)
+DEFAULT_SIZES = (1_000, 100_000, 1_000_000)
+# Сколько раз выполняется каждая одиночная операция.
+DEFAULT_SAMPLES = 200
+# Ширина диапазона для выборки по диапазону (доля значений score).
+RANGE_WIDTH = 1_000
+DEFAULT_TOLERANCE = 0.25
+# Разница меньше этих порогов не считается регрессией: время операций
+# в сотые доли миллисекунды колеблется сильнее допуска.
+MIN_REGRESSION_MS = 0.05
+MIN_REGRESSION_MB = 2.0
+SEED = 20240601
+
+WORKLOADS = ("bulk_load", "startup", "point_select", "range_select", "info",
+             "insert", "update", "delete")
+
+
+def _row(rng):
+    return [generate(rng) for _, _, generate in SCHEMA]
+
+
+def _write_csv(path, size, rng):
+    with open(path, "w", encoding="utf-8", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow([name for name, _, _ in SCHEMA])
+        for _ in range(size):
+            writer.writerow([str(value).lower() if isinstance(value, bool) else value
+                             for value in _row(rng)])
+
+
+def _summary(samples, rows=None):
+    # samples - время операций в секундах.
+    ordered = sorted(samples)
+
+    def percentile(share):
+        return ordered[min(len(ordered) - 1, int(share * len(ordered)))]
+
+    total = sum(ordered)
+    result = {"ops": len(ordered), "total": total, "p50": statistics.median(ordered),
+              "p95": percentile(0.95), "p99": percentile(0.99), "max": ordered[-1],
+              "ops_per_sec": len(ordered) / total if total > 0 else 0.0}
+    if rows is not None:
+        result["rows_per_sec"] = rows / total if total > 0 else 0.0
+    return result
+
+
+def _timed(samples, function, *args):
+    started = time.perf_counter()
+    result = function(*args)
+    samples.append(time.perf_counter() - started)
+    return result
+
+
+def _measure_size(size, samples, path):
+    rng = random.Random(SEED + size)
+    results = {}
+    columns = [(name, column_type) for name, column_type, _ in SCHEMA]
+
+    connection = connect(path)
+    connection.create_table(TABLE, columns)
+    source = os.path.join(path, "source.csv")
+    _write_csv(source, size, rng)
+    times = []
+    _timed(times, connection.import_file, TABLE, source)
+    results["bulk_load"] = _summary(times, rows=size)
+
+    # Запуск: новое соединение и первый запрос, который читает всю таблицу
+    # с диска. Последний запрос оставляет таблицу в памяти для остальных замеров.
+    first_query = f"select count(*) from {TABLE} where active = true"
+    times = []
+    for _ in range(max(3, samples // 20)):
+        connection.close()
+        started = time.perf_counter()
+        connection = connect(path)
+        connection.execute(first_query).fetchall()
+        times.append(time.perf_counter() - started)
+    results["startup"] = _summary(times)
+
+    times = []
+    for _ in range(samples):
+        row_id = rng.randrange(1, size + 1)
+        _timed(times, lambda: connection.execute(
+            f"select * from {TABLE} where ID = ?", (row_id,)).fetchall())
+    results["point_select"] = _summary(times)
+
+    times = []
+    for _ in range(samples):
+        low = rng.randrange(1_000_000 - RANGE_WIDTH)
+        _timed(times, lambda: connection.execute(
+            f"select * from {TABLE} where score between ? and ?",
+            (low, low + RANGE_WIDTH)).fetchall())
+    results["range_select"] = _summary(times)
+
+    times = []
+    for _ in range(samples):
+        _timed(times, connection.table_info, TABLE)
+    results["info"] = _summary(times)
+
+    times = []
+    for _ in range(samples):
+        _timed(times, connection.execute,
+               f"insert into {TABLE} values (?, ?, ?, ?)", _row(rng))
+    results["insert"] = _summary(times)
+
+    times = []
+    for _ in range(samples):
+        _timed(times, connection.execute,
+               f"update {TABLE} set score = ? where ID = ?",
+               (rng.randrange(1_000_000), rng.randrange(1, size + 1)))
+    results["update"] = _summary(times)
+
+    times = []
+    for row_id in rng.sample(range(1, size + 1), min(samples, size)):
+        _timed(times, connection.execute, f"delete from {TABLE} where ID = ?",
+               (row_id,))
+    results["delete"] = _summary(times)
+    connection.close()
+
+    # ru_maxrss в Linux - в килобайтах, в macOS - в байтах.
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    if sys.platform != "darwin":
+        peak *= 1024
+    return {"workloads": results, "peak_rss": peak}
+
+
+def _child(size, samples, results):
+    path = tempfile.mkdtemp(prefix="primitive_db_bench_")
+    try:
+        results.put((size, _measure_size(size, samples, path)))
+    finally:
+        shutil.rmtree(path, ignore_errors=True)
+
+
+def _wait(process, results):
+    # Результат читается до join: объект в очереди не дает процессу
+    # завершиться, пока его не заберут. Упавший процесс результата не пришлет.
+    while True:
+        alive = process.is_alive()
+        try:
+            return results.get(timeout=1)
+        except queue.Empty:
+            if not alive:
+                return None
+
+
+def run(sizes, samples):
+    results = {}
+    for size in sizes:
+        reports = multiprocessing.Queue()
+        process = multiprocessing.Process(target=_child,
+                                          args=(size, samples, reports))
+        process.start()
+        report = _wait(process, reports)
+        process.join()
+        if process.exitcode != 0 or report is None:
+            raise RuntimeError(f"замер таблицы из {size} строк завершился с ошибкой")
+        results[str(size)] = report[1]
+    return {"python": platform.python_version(), "platform": platform.platform(),
+            "samples": samples, "sizes": results}
+
+
+def _ms(seconds):
+    return f"{seconds * 1000:.3f}"
+
+
+def print_results(results):
+    for size, report in results["sizes"].items():
+        table = PrettyTable()
+        table.field_names = ["Операция", "Число", "p50, мс", "p95, мс", "p99, мс",
+                             "Макс, мс", "Оп/с", "Строк/с"]
+        table.align["Операция"] = "l"
+        for name in WORKLOADS:
+            stats = report["workloads"][name]
+            rows_per_sec = stats.get("rows_per_sec")
+            table.add_row([name, stats["ops"], _ms(stats["p50"]), _ms(stats["p95"]),
+                           _ms(stats["p99"]), _ms(stats["max"]),
+                           f"{stats['ops_per_sec']:.0f}",
+                           "" if rows_per_sec is None else f"{rows_per_sec:.0f}"])
+        print(f"Таблица из {size} строк, пиковая память "
+              f"{report['peak_rss'] / 1024 / 1024:.1f} МБ")
+        print(table)
+
+
+def compare(results, baseline, tolerance):
+    # Сравнение медианного времени операций и пиковой памяти с базовой
+    # линией. Возвращает список регрессий.
+    table = PrettyTable()
+    table.field_names = ["Строк", "Показатель", "Было", "Стало", "Изменение"]
+    table.align["Показатель"] = "l"
+    regressions = []
+
+    def check(size, name, before, after, unit, floor):
+        change = after / before - 1 if before > 0 else 0.0
+        mark = " !" if change > tolerance and after - before > floor else ""
+        table.add_row([size, name, f"{before:.3f}", f"{after:.3f}",
+                       f"{change:+.1%}{mark}"])
+        if mark:
+            regressions.append(f"{name} на {size} строк: {before:.3f} -> "
+                               f"{after:.3f} {unit} ({change:+.1%})")
+
+    for size, report in results["sizes"].items():
+        before = baseline.get("sizes", {}).get(size)
+        if before is None:
+            continue
+        for name in WORKLOADS:
+            if name in before["workloads"]:
+                check(size, f"{name} p50", before["workloads"][name]["p50"] * 1000,
+                      report["workloads"][name]["p50"] * 1000, "мс",
+                      MIN_REGRESSION_MS)
+        check(size, "пиковая память", before["peak_rss"] / 1024 / 1024,
+              report["peak_rss"] / 1024 / 1024, "МБ", MIN_REGRESSION_MB)
+    print(table)
+    return regressions
+
+
+def _sizes(value):
+    try:
+        sizes = [int(size) for size in value.split(",")]
+    except ValueError:
+        raise argparse.ArgumentTypeError("ожидается список чисел через запятую")
+    if not sizes or min(sizes) < 1:
+        raise argparse.ArgumentTypeError("размер таблицы должен быть больше 0")
+    return sizes
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Замеры производительности")
+    parser.add_argument("--sizes", type=_sizes, default=list(DEFAULT_SIZES),
+                        help="размеры таблиц через запятую "
+                             "(по умолчанию 1000,100000,1000000)")
+    parser.add_argument("--samples", type=int, default=DEFAULT_SAMPLES,
+                        help="повторов каждой одиночной операции")
+    parser.add_argument("--save", help="сохранить результаты в файл JSON")
+    parser.add_argument("--baseline", help="сравнить с сохраненными результатами")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE,
+                        help="допустимый рост времени и памяти (0.25 - на 25%%)")
+    args = parser.parse_args(argv)
+
+    baseline = None
+    if args.baseline is not None:
+        if os.path.exists(args.baseline):
+            with open(args.baseline, encoding="utf-8") as f:
+                baseline = json.load(f)
+        else:
+            print(f"Базовая линия '{args.baseline}' не найдена, сравнение пропущено. "
+                  f"Сохранить ее: --save {args.baseline}")
+
+    results = run(args.sizes, args.samples)
+    print_results(results)
+
+    if args.save is not None:
+        with open(args.save, "w", encoding="utf-8") as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+        print(f"Результаты сохранены в '{args.save}'")
+
+    if baseline is None:
+        return 0
+    regressions = compare(results, baseline, args.tolerance)
+    if regressions:
+        print("Регрессия: " + "; ".join(regressions))
+        return 1
+    print(f"Регрессий нет (допуск {args.tolerance:.0%})")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
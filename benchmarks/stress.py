@@ -0,0 +1,127 @@
+# benchmarks/stress.py
+#
+# Нагрузочная проверка одновременной работы нескольких процессов с одной
+# базой: писатели вставляют и изменяют строки, читатели выполняют запросы.
+# В конце проверяется, что ни одна вставка не потерялась и ID не повторяются.
+#
+#     python -m benchmarks.stress --writers 4 --readers 4 --ops 500
+
+import argparse
+import multiprocessing
+import shutil
+import sys
+import tempfile
+import time
+
+from src.primitive_db import OperationalError, connect
+
+TABLE = "stress"
+
+
+def _writer(path, number, ops, results):
+    connection = connect(path)
+    started = time.perf_counter()
+    for op in range(ops):
+        cursor = connection.execute(f"insert into {TABLE} values (?, ?, ?)",
+                                    (f"w{number}", number, op))
+        if op % 10 == 9:
+            connection.execute(f"update {TABLE} set op = ? where ID = ?",
+                               (-op, cursor.lastrowid))
+    results.put(("writer", ops, time.perf_counter() - started))
+    connection.close()
+
+
+def _reader(path, stop, results):
+    connection = connect(path)
+    started = time.perf_counter()
+    queries = 0
+    errors = 0
+    while not stop.is_set():
+        try:
+            connection.execute(f"select count(*) from {TABLE}").fetchall()
+            connection.execute(f"select * from {TABLE} where writer = 0 "
+                               f"and op > 100").fetchall()
+        except OperationalError:
+            errors += 1
+        queries += 2
+    results.put(("reader", queries, time.perf_counter() - started, errors))
+    connection.close()
+
+
+def _check(path, writers, ops):
+    connection = connect(path)
+    ids = [row[0] for row in connection.execute(f"select ID from {TABLE}")]
+    connection.close()
+    problems = []
+    if len(ids) != writers * ops:
+        problems.append(f"строк {len(ids)}, ожидалось {writers * ops}")
+    if len(set(ids)) != len(ids):
+        problems.append(f"повторяющихся ID: {len(ids) - len(set(ids))}")
+    return problems
+
+
+def run(path, writers, readers, ops):
+    connection = connect(path)
+    connection.create_table(TABLE, [("name", "str"), ("writer", "int"),
+                                    ("op", "int")])
+    connection.close()
+
+    results = multiprocessing.Queue()
+    stop = multiprocessing.Event()
+    reader_processes = [multiprocessing.Process(target=_reader,
+                                                args=(path, stop, results))
+                        for _ in range(readers)]
+    writer_processes = [multiprocessing.Process(target=_writer,
+                                                args=(path, number, ops, results))
+                        for number in range(writers)]
+    started = time.perf_counter()
+    for process in reader_processes + writer_processes:
+        process.start()
+    for process in writer_processes:
+        process.join()
+    elapsed = time.perf_counter() - started
+    stop.set()
+    for process in reader_processes:
+        process.join()
+
+    # Процесс, упавший с ошибкой, не присылает отчет.
+    failed = sum(1 for process in reader_processes + writer_processes
+                 if process.exitcode != 0)
+    reports = [results.get() for _ in range(writers + readers - failed)]
+    written = sum(report[1] for report in reports if report[0] == "writer")
+    queries = sum(report[1] for report in reports if report[0] == "reader")
+    errors = sum(report[3] for report in reports if report[0] == "reader")
+    print(f"Писателей: {writers}, читателей: {readers}, время: {elapsed:.2f} с")
+    print(f"Вставок: {written} ({written / elapsed:.0f} в секунду)")
+    print(f"Запросов на чтение: {queries} ({queries / elapsed:.0f} в секунду), "
+          f"ошибок: {errors}")
+    problems = _check(path, writers, ops)
+    if failed:
+        problems.append(f"процессов, завершившихся с ошибкой: {failed}")
+    return problems
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Нагрузка из нескольких процессов")
+    parser.add_argument("--writers", type=int, default=4)
+    parser.add_argument("--readers", type=int, default=4)
+    parser.add_argument("--ops", type=int, default=500,
+                        help="вставок на одного писателя")
+    parser.add_argument("--path", help="каталог базы (по умолчанию временный)")
+    args = parser.parse_args(argv)
+
+    path = args.path or tempfile.mkdtemp(prefix="primitive_db_stress_")
+    try:
+        problems = run(path, args.writers, args.readers, args.ops)
+    finally:
+        if args.path is None:
+            shutil.rmtree(path, ignore_errors=True)
+    if problems:
+        print("Ошибка: " + "; ".join(problems))
+        return 1
+    print("Проверка пройдена: вставки не потеряны, ID не повторяются")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,19 @@
+from .api import Connection, Cursor, connect
+from .errors import (
+    DatabaseError,
+    DataError,
+    OperationalError,
+    ProgrammingError,
+    TableNotFoundError,
+)
+
+__all__ = [
+    "Connection",
+    "Cursor",
+    "DataError",
+    "DatabaseError",
+    "OperationalError",
+    "ProgrammingError",
+    "TableNotFoundError",
+    "connect",
+]
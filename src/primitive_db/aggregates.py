@@ -0,0 +1,285 @@
+# src/primitive_db/aggregates.py
+
+import heapq
+import math
+import operator
+import re
+
+from .errors import ProgrammingError
+from .predicates import NUMERIC_TYPES
+
+AGGREGATE_FUNCTIONS = ("count", "sum", "avg", "min", "max")
+# Функции, которым нужен числовой столбец.
+NUMERIC_FUNCTIONS = ("sum", "avg")
+
+_AGGREGATE = re.compile(r"^(count|sum|avg|min|max)\(\s*(\*|[^()\s]+)\s*\)$",
+                        re.IGNORECASE)
+
+
+class Aggregate:
+    # Агрегатная функция в списке столбцов select: count(*), sum(x) и т.д.
+    def __init__(self, function, column=None):
+        self.function = function
+        self.column = column
+
+    def __str__(self):
+        return f"{self.function}({self.column or '*'})"
+
+    def __repr__(self):
+        return f"Aggregate({self.function!r}, {self.column!r})"
+
+
+def parse_select_item(text):
+    # Имя столбца (строка) или Aggregate.
+    match = _AGGREGATE.match(text)
+    if match is None:
+        return text
+    function, column = match.group(1).lower(), match.group(2)
+    if column == "*":
+        if function != "count":
+            raise ProgrammingError(f"Ошибка: {function.upper()}(*) не поддерживается, "
+                                   f"укажите столбец")
+        column = None
+    return Aggregate(function, column)
+
+
+def is_aggregate(items, group_by):
+    return group_by is not None or \
+        any(isinstance(item, Aggregate) for item in items or ())
+
+
+def check_aggregates(items, group_by, schema):
+    for column in group_by:
+        if column not in schema:
+            raise ProgrammingError(f"Столбец '{column}' не найден")
+    for item in items:
+        if not isinstance(item, Aggregate):
+            if item not in group_by:
+                raise ProgrammingError(f"Столбец '{item}' должен быть в GROUP BY "
+                                       f"или внутри агрегатной функции")
+            continue
+        if item.column is None:
+            continue
+        if item.column not in schema:
+            raise ProgrammingError(f"Столбец '{item.column}' не найден")
+        if item.function in NUMERIC_FUNCTIONS and \
+                schema[item.column] not in NUMERIC_TYPES:
+            raise ProgrammingError(f"{item.function.upper()} применим только "
+                                   f"к столбцам типа integer и float, "
+                                   f"'{item.column}' имеет тип "
+                                   f"{schema[item.column]}")
+
+
+# Шаги агрегатных функций для GROUP BY: состояние группы - одно значение
+# (для avg - пара сумма/количество), None до первой строки группы.
+# Значения NULL функции пропускают.
+
+def _step_count(state, value):
+    return 1 if state is None else state + 1
+
+
+def _step_sum(state, value):
+    return value if state is None else state + value
+
+
+def _step_avg(state, value):
+    return (value, 1) if state is None else (state[0] + value, state[1] + 1)
+
+
+def _step_min(state, value):
+    return value if state is None or value < state else state
+
+
+def _step_max(state, value):
+    return value if state is None or value > state else state
+
+
+STEPS = {"count": _step_count, "sum": _step_sum, "avg": _step_avg,
+         "min": _step_min, "max": _step_max}
+
+
+def _values(table, column_name):
+    # Чтение значения по позиции и его декодирование. Числа и логические
+    # значения агрегируются в виде, в котором хранятся в столбце (0/1 для
+    # bool сравниваются так же, как False/True), строки - после декодирования:
+    # коды словаря не упорядочены. Столбец, в котором могут быть NULL,
+    # читается с декодированием, чтобы NULL можно было пропустить.
+    if column_name is None:
+        # count(*) считает каждую строку.
+        return (lambda position: True), None
+    column = table.columns[column_name]
+    if column.type_name == "text" or column.has_nulls:
+        return column.get, None
+    return column.buffer().__getitem__, column.decode
+
+
+def _identity(value):
+    return value
+
+
+def _key(column):
+    # Чтение значения ключа группы и его декодирование. Ключ - хранимое
+    # значение (для строк - код словаря); у float берется само значение:
+    # NULL хранится как NaN, а NaN не равен сам себе.
+    if column.type_name == "float":
+        return column.get, _identity
+    return column.buffer().__getitem__, column.decode
+
+
+def _finish(function, state, decode):
+    if state is None:
+        return 0 if function == "count" else None
+    if function == "avg":
+        return state[0] / state[1]
+    if decode is not None and function in ("min", "max"):
+        return decode(state)
+    return state
+
+
+def _aggregates(items):
+    return [item for item in items if isinstance(item, Aggregate)]
+
+
+def group_states(table, positions, items, group_by):
+    # Хеш-агрегация за один проход по позициям: на каждую группу хранится
+    # только список состояний функций. Ключ группы - хранимые значения
+    # столбцов (для строк - коды словаря), декодируется в finish_groups.
+    aggregates = _aggregates(items)
+    key_getters = [_key(table.columns[name])[0] for name in group_by]
+    steps = [STEPS[item.function] for item in aggregates]
+    getters = [_values(table, item.column)[0] for item in aggregates]
+    functions = list(zip(range(len(aggregates)), steps, getters))
+
+    groups = {}
+    for position in positions:
+        key = tuple([get(position) for get in key_getters])
+        states = groups.get(key)
+        if states is None:
+            states = groups[key] = [None] * len(aggregates)
+        for i, step, get in functions:
+            value = get(position)
+            if value is not None:
+                states[i] = step(states[i], value)
+    return groups
+
+
+def total_states(table, positions, items):
+    # Состояния функций без GROUP BY: каждая считается встроенными
+    # sum/min/max за один проход по столбцу. Сумма столбца float считается
+    # math.fsum и округляется один раз, а не после каждого сложения.
+    count = len(positions)
+    if not count:
+        return {}
+    states = []
+    for item in _aggregates(items):
+        values = map(_values(table, item.column)[0], positions)
+        present = count
+        if item.column is not None and table.columns[item.column].has_nulls:
+            values = [value for value in values if value is not None]
+            present = len(values)
+        if item.function == "count":
+            states.append(present)
+        elif not present:
+            states.append(None)
+        elif item.function in NUMERIC_FUNCTIONS:
+            total = math.fsum(values) \
+                if table.columns[item.column].type_name == "float" else sum(values)
+            states.append(total if item.function == "sum" else (total, present))
+        else:
+            states.append(min(values) if item.function == "min" else max(values))
+    return {(): states}
+
+
+def _merge_avg(left, right):
+    return left[0] + right[0], left[1] + right[1]
+
+
+# Суммы частей складываются по одной, поэтому sum и avg столбца float при
+# параллельном просмотре могут отличаться от последовательного в последних
+# знаках: каждое сложение частей округляется.
+MERGES = {"count": operator.add, "sum": operator.add, "avg": _merge_avg,
+          "min": min, "max": max}
+
+
+def merge_states(items, groups, other):
+    # Добавляет к groups состояния групп, посчитанные по другой части строк.
+    merges = [MERGES[item.function] for item in _aggregates(items)]
+    for key, states in other.items():
+        current = groups.get(key)
+        if current is None:
+            groups[key] = states
+            continue
+        for i, merge in enumerate(merges):
+            if states[i] is not None:
+                current[i] = states[i] if current[i] is None else \
+                    merge(current[i], states[i])
+    return groups
+
+
+def finish_groups(table, groups, items, group_by):
+    # Строки результата из состояний групп в порядке элементов select.
+    aggregates = _aggregates(items)
+    if not group_by and not groups:
+        groups = {(): [None] * len(aggregates)}
+    key_decoders = [_key(table.columns[name])[1] for name in group_by]
+    decoders = [_values(table, item.column)[1] for item in aggregates]
+    # Для каждого элемента select: номер столбца ключа или None для функции.
+    layout = [None if isinstance(item, Aggregate) else group_by.index(item)
+              for item in items]
+    rows = []
+    for key, states in groups.items():
+        values = [decode(stored) for decode, stored in zip(key_decoders, key)]
+        results = iter([_finish(item.function, state, decode) for item, state,
+                        decode in zip(aggregates, states, decoders)])
+        rows.append(tuple(next(results) if index is None else values[index]
+                          for index in layout))
+    return rows
+
+
+def partial_states(table, positions, items, group_by):
+    if not group_by:
+        return total_states(table, positions, items)
+    return group_states(table, positions, items, group_by)
+
+
+def aggregate(table, positions, items, group_by):
+    return finish_groups(table, partial_states(table, positions, items, group_by),
+                         items, group_by)
+
+
+def totals_from_statistics(items, statistics):
+    # count(*), min и max без WHERE и GROUP BY по статистике таблицы,
+    # если границы столбцов точные; иначе None.
+    result = []
+    for item in items:
+        if item.function == "count" and item.column is None:
+            result.append(statistics["rows"])
+        elif item.function in ("min", "max"):
+            if not statistics["rows"]:
+                result.append(None)
+                continue
+            bounds = statistics["columns"].get(item.column)
+            if bounds is None or not bounds["exact"]:
+                return None
+            result.append(bounds[item.function])
+        else:
+            return None
+    return [tuple(result)]
+
+
+def order_rows(rows, labels, order_by, count=None):
+    # Сортировка результата агрегации по столбцу результата; при LIMIT
+    # первые count строк отбираются кучей.
+    column, descending = order_by
+    if column not in labels:
+        raise ProgrammingError(f"Столбец '{column}' не найден в результате")
+    index = labels.index(column)
+
+    def key(row):
+        # Пустые значения (None) идут первыми.
+        return (row[index] is not None, row[index])
+
+    if count is None:
+        return sorted(rows, key=key, reverse=descending)
+    select_top = heapq.nlargest if descending else heapq.nsmallest
+    return select_top(count, rows, key=key)
@@ -0,0 +1,784 @@
+# src/primitive_db/api.py
+
+import functools
+import heapq
+import os
+import shlex
+from itertools import islice
+
+from .aggregates import (
+    Aggregate,
+    check_aggregates,
+    order_rows,
+    totals_from_statistics,
+)
+from .bulk import read_records, write_records
+from .cache import QueryCache
+from .core import (
+    RecordType,
+    create_table,
+    delete,
+    drop_table,
+    get_constraints,
+    insert,
+    list_tables,
+    order,
+    scan,
+    select,
+    update,
+)
+from .errors import OperationalError, ProgrammingError, TableNotFoundError
+from .execution import get_executor
+from .indexes import IndexRegistry, create_index, drop_index, get_index_defs
+from .joins import JoinColumns, check_join_types, hash_join, index_join, split_where
+from .locks import metadata_lock, table_lock
+from .metrics import Metrics, Profile, count, counted, profiling, stage
+from .parallel import ParallelExecutor, get_workers
+from .predicates import compile_where
+from .statements import Statement, StatementCache, parse_statement
+from .storage import DEFAULT_STORAGE, compact_table, get_storage, table_storage
+from .tables import WRITE_AT_EXIT, TableManager
+from .utils import (
+    DATA_DIR,
+    DURABILITY_NORMAL,
+    METADATA,
+    DataDir,
+    get_durability,
+    load_metadata,
+    save_metadata,
+)
+from .wal import recover, write_locks
+
+
+def _connected(method):
+    # Перед каждым вызовом соединение перечитывает метаданные, если их
+    # изменил другой процесс.
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        if self.closed:
+            raise ProgrammingError("Соединение закрыто")
+        self._refresh_metadata()
+        return method(self, *args, **kwargs)
+
+    return wrapper
+
+
+def split_command(sql):
+    # posix=False сохраняет кавычки: "30" остается строкой, а 30 - числом.
+    try:
+        return shlex.split(sql, posix=False)
+    except ValueError as ve:
+        raise ProgrammingError(f"Ошибка разбора команды: {ve}")
+
+
+def _iter_rows(table, positions, version, names):
+    # Строки из столбцов names читаются по одной при обходе курсора. Версия
+    # проверяется до получения позиции: позиции могут вычисляться лениво.
+    columns = [table.columns[name] for name in names]
+    positions = iter(positions)
+    while True:
+        if table.version != version:
+            raise OperationalError("Таблица изменилась во время чтения результата")
+        position = next(positions, None)
+        if position is None:
+            return
+        yield tuple(column.get(position) for column in columns)
+
+
+class Cursor:
+    # Курсор в духе DB-API: execute/executemany, fetchone/fetchmany/fetchall
+    # и обход в цикле. Результат select выдается лениво, кортежами
+    # в порядке столбцов из description.
+    def __init__(self, connection):
+        self.connection = connection
+        self.description = None
+        self.rowcount = -1
+        self.lastrowid = None
+        self.arraysize = 1
+        self._rows = iter(())
+
+    def _reset(self):
+        self.description = None
+        self.rowcount = -1
+        self._rows = iter(())
+
+    def execute(self, sql, params=()):
+        self._reset()
+        connection = self.connection
+        with connection.metrics.measure() as profile:
+            statement = connection.statement(sql)
+            if profile is not None:
+                profile.kind = statement.kind
+            connection._run(self, statement, params)
+        return self
+
+    def executemany(self, sql, seq_of_params):
+        self._reset()
+        connection = self.connection
+        with connection.metrics.measure() as profile:
+            statement = connection.statement(sql)
+            if profile is not None:
+                profile.kind = statement.kind
+            connection._run_many(self, statement, seq_of_params)
+        return self
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        return next(self._rows)
+
+    def fetchone(self):
+        return next(self._rows, None)
+
+    def fetchmany(self, size=None):
+        return list(islice(self._rows, size or self.arraysize))
+
+    def fetchall(self):
+        return list(self._rows)
+
+    def close(self):
+        self._rows = iter(())
+
+
+class Connection:
+    # Соединение с базой в каталоге path. Ничего не печатает: ошибки
+    # поднимаются исключениями из errors.py, результаты возвращаются.
+    # Каталог и надежность записи хранятся в самом соединении (data_dir)
+    # и передаются всем функциям, которые работают с файлами.
+    def __init__(self, path=DATA_DIR, durability=DURABILITY_NORMAL):
+        self.data_dir = DataDir(path, durability)
+        self.path = self.data_dir.path
+        self.closed = False
+        self.recovered = recover(self.data_dir)
+        self.metadata = load_metadata(self.data_dir)
+        self.metadata_signature = self._metadata_signature()
+        self.tables = TableManager(self.data_dir, self.metadata)
+        self.indexes = IndexRegistry(self.data_dir)
+        self.cache = QueryCache(self.data_dir)
+        self.executor = get_executor()
+        self.parallelism = 1
+        self.statements = StatementCache()
+        self.prepared = {}
+        self.metrics = Metrics()
+        self.record_types = {}
+
+    def statement(self, sql):
+        # Разобранная команда из кеша по тексту (или уже готовый Statement).
+        if isinstance(sql, Statement):
+            return sql
+        statement = self.statements.get(sql)
+        if statement is None:
+            with stage("parse"):
+                statement = parse_statement(split_command(sql))
+            self.statements.put(sql, statement)
+        else:
+            count("statement_cache_hits")
+        return statement
+
+    def _metadata_signature(self):
+        try:
+            stat = os.stat(self.data_dir.file(METADATA))
+        except FileNotFoundError:
+            return None
+        return stat.st_ino, stat.st_mtime_ns, stat.st_size
+
+    def _refresh_metadata(self):
+        # Таблицы и индексы могли создать или удалить другие процессы.
+        # Словарь обновляется на месте: на него ссылается TableManager.
+        signature = self._metadata_signature()
+        if signature == self.metadata_signature:
+            return
+        metadata = load_metadata(self.data_dir)
+        for table_name, schema in self.metadata.items():
+            # Таблицу из открытой транзакции не забываем: commit сам
+            # обнаружит, что ее файлы изменились.
+            if metadata.get(table_name) != schema and \
+                    table_name not in (self.tables.transaction or ()):
+                self.forget_table(table_name)
+        self.metadata.clear()
+        self.metadata.update(metadata)
+        self.metadata_signature = signature
+
+    def _schema(self, table_name):
+        schema = self.metadata.get(table_name)
+        if schema is None:
+            raise TableNotFoundError(f"Таблица '{table_name}' не существует")
+        return schema
+
+    def _record_type(self, table_name):
+        # Проверки значений строятся один раз на схему и ограничения таблицы;
+        # после изменения метаданных (drop и create) строятся заново.
+        schema = self._schema(table_name)
+        constraints = get_constraints(self.metadata, table_name)
+        record_type = self.record_types.get(table_name)
+        if record_type is None or record_type.schema is not schema or \
+                record_type.constraints is not constraints:
+            record_type = RecordType(schema, constraints)
+            self.record_types[table_name] = record_type
+        return record_type
+
+    def forget_table(self, table_name):
+        self.record_types.pop(table_name, None)
+        self.tables.discard(table_name)
+        self.indexes.invalidate(table_name)
+        self.cache.invalidate(table_name)
+
+    # Выполнение разобранных команд
+
+    def _positions(self, table_name, table_data, predicate):
+        def filter_rows():
+            with stage("filter"):
+                positions = self.indexes.lookup(self.metadata, table_name,
+                                                table_data, predicate)
+                return select(table_data, predicate, positions, self.executor)
+
+        if predicate is None:
+            return filter_rows()
+        # В кеше хранятся позиции строк, а не сами строки.
+        return self.cache(table_name, f"select.{predicate}", filter_rows)
+
+    def _page(self, table_data, statement, predicate):
+        # LIMIT/OFFSET без сортировки: строки после последней нужной
+        # не проверяются.
+        start = statement.offset
+        stop = None if statement.limit is None else start + statement.limit
+        if predicate is None:
+            return range(len(table_data))[start:stop]
+        positions = self.indexes.lookup(self.metadata, statement.table_name,
+                                        table_data, predicate)
+        return islice(scan(table_data, predicate, positions, self.executor),
+                      start, stop)
+
+    def _ordered(self, table_data, statement, predicate):
+        # ORDER BY: если условие не сужается индексом, а по столбцу сортировки
+        # есть отсортированный индекс, строки идут в порядке индекса и
+        # просмотр останавливается на LIMIT. Иначе подходящие строки
+        # сортируются, а при LIMIT отбираются кучей.
+        table_name = statement.table_name
+        column, descending = statement.order_by
+        start = statement.offset
+        stop = None if statement.limit is None else start + statement.limit
+        if self.indexes.lookup(self.metadata, table_name, table_data,
+                               predicate) is None:
+            positions = self.indexes.ordered(self.metadata, table_name, table_data,
+                                             column, descending)
+            if positions is not None:
+                return islice(scan(table_data, predicate, positions, self.executor),
+                              start, stop)
+        positions = self._positions(table_name, table_data, predicate)
+        with stage("sort"):
+            return order(table_data, positions, column, descending, stop)[start:]
+
+    def _part_positions(self, table_data, statement, predicate):
+        # Позиции для части таблицы, загруженной из сегментов: индексы
+        # и кеш запросов строятся только для таблицы целиком.
+        with stage("filter"):
+            positions = select(table_data, predicate, None, self.executor)
+        start = statement.offset
+        stop = None if statement.limit is None else start + statement.limit
+        if statement.order_by is None:
+            return positions[start:stop]
+        column, descending = statement.order_by
+        with stage("sort"):
+            return order(table_data, positions, column, descending, stop)[start:]
+
+    def _aggregate(self, cursor, statement, schema, predicate):
+        table_name = statement.table_name
+        group_by = statement.group_by or ()
+        items = statement.columns or group_by
+        check_aggregates(items, group_by, schema)
+
+        rows = None
+        if predicate is None and not group_by:
+            # count(*), min и max по всей таблице - без чтения строк.
+            rows = totals_from_statistics(items, self.tables.statistics(table_name))
+        if rows is None:
+            names = {*group_by, *(item.column for item in items
+                                  if isinstance(item, Aggregate) and item.column)}
+            table_data = self.tables.read_part(table_name, predicate, names)
+            if table_data is not None:
+                with stage("filter"):
+                    positions = select(table_data, predicate, None, self.executor)
+            else:
+                table_data = self.tables.get(table_name)
+                positions = self._positions(table_name, table_data, predicate)
+            with stage("aggregate"):
+                rows = self.executor.aggregate(table_data, positions, items,
+                                               group_by)
+
+        labels = tuple(str(item) for item in items)
+        start = statement.offset
+        stop = None if statement.limit is None else start + statement.limit
+        if statement.order_by is not None:
+            with stage("sort"):
+                rows = order_rows(rows, labels, statement.order_by, stop)
+        rows = rows[start:stop]
+        cursor.description = labels
+        cursor.rowcount = len(rows)
+        count("rows_returned", len(rows))
+        cursor._rows = iter(rows)
+
+    def _join_pairs(self, columns, left, right, pushed):
+        # Планировщик соединения. Меньшая по статистике сторона - внешняя
+        # (build); если по столбцу соединения большей стороны есть индекс,
+        # выполняется соединение вложенными циклами по индексу, иначе
+        # хеш-соединение. Условия сторон проверяются до соединения.
+        # Выдает пары позиций (строка left, строка right).
+        sides = {}
+        for table_name, column in (left, right):
+            schema = columns.schemas[table_name]
+            sides[table_name] = (self.tables.get(table_name), column,
+                                 compile_where(pushed[table_name], schema))
+        outer, inner = sorted((left[0], right[0]),
+                              key=lambda name: self.tables.statistics(name)["rows"])
+        outer_data, outer_column, outer_predicate = sides[outer]
+        inner_data, inner_column, inner_predicate = sides[inner]
+
+        outer_positions = self._positions(outer, outer_data, outer_predicate)
+        lookup = self.indexes.probe(self.metadata, inner, inner_data, inner_column)
+        if lookup is not None:
+            inner_filter = None
+            if inner_predicate is not None:
+                def inner_filter(positions):
+                    return self.executor.filter(inner_data, inner_predicate,
+                                                positions)
+            pairs = index_join(outer_data, outer_positions, outer_column, lookup,
+                               inner_filter)
+        else:
+            inner_positions = self._positions(inner, inner_data, inner_predicate)
+            pairs = hash_join(outer_data, outer_positions, outer_column,
+                              inner_data, inner_positions, inner_column)
+        if outer == left[0]:
+            return pairs
+        return ((left_position, right_position)
+                for right_position, left_position in pairs)
+
+    def _join(self, cursor, statement, params):
+        left_table = statement.table_name
+        right_table, first, second = statement.join
+        if left_table == right_table:
+            raise ProgrammingError("Соединение таблицы с самой собой "
+                                   "не поддерживается")
+        if statement.aggregate:
+            raise ProgrammingError("Агрегатные функции и GROUP BY в запросах "
+                                   "с join не поддерживаются")
+        columns = JoinColumns({left_table: self._schema(left_table),
+                               right_table: self._schema(right_table)})
+        left, right = columns.resolve(first), columns.resolve(second)
+        if left[0] == right[0]:
+            raise ProgrammingError("Условие соединения должно связывать "
+                                   "столбцы двух таблиц")
+        if left[0] != left_table:
+            left, right = right, left
+        check_join_types(columns, left, right)
+        _, _, where = statement.bind(params)
+        pushed, residual = split_where(where, columns)
+
+        pairs = self._join_pairs(columns, left, right, pushed)
+        data = {left_table: self.tables.get(left_table),
+                right_table: self.tables.get(right_table)}
+        sides = (left_table, right_table)
+
+        def reader(name):
+            # Функция (позиция слева, позиция справа) -> значение столбца.
+            table_name, column = columns.resolve(name)
+            get = data[table_name].columns[column].get
+            side = sides.index(table_name)
+            return lambda pair: get(pair[side])
+
+        if residual is not None:
+            residual_readers = {name: reader(name) for name in residual.columns}
+            pairs = (pair for pair in pairs if residual.matches(
+                {name: read(pair) for name, read in residual_readers.items()}))
+
+        start = statement.offset
+        stop = None if statement.limit is None else start + statement.limit
+        if statement.order_by is not None:
+            name, descending = statement.order_by
+            select_top = heapq.nlargest if descending else heapq.nsmallest
+            key = reader(name)
+            pairs = sorted(pairs, key=key, reverse=descending) if stop is None \
+                else select_top(stop, pairs, key=key)
+            pairs = pairs[start:]
+        elif start or stop is not None:
+            pairs = islice(pairs, start, stop)
+
+        names = statement.columns or columns.all_columns()
+        readers = [reader(name) for name in names]
+        versions = {table_name: table.version for table_name, table in data.items()}
+
+        def rows():
+            for pair in pairs:
+                if any(data[name].version != version
+                       for name, version in versions.items()):
+                    raise OperationalError("Таблица изменилась во время чтения "
+                                           "результата")
+                yield tuple(read(pair) for read in readers)
+
+        cursor.description = tuple(names)
+        cursor.rowcount = len(pairs) if hasattr(pairs, "__len__") else -1
+        cursor._rows = counted(rows())
+
+    def _select(self, cursor, statement, params):
+        if statement.join is not None:
+            return self._join(cursor, statement, params)
+        table_name = statement.table_name
+        schema = self._schema(table_name)
+        _, _, where = statement.bind(params)
+        predicate = statement.predicate(schema, where)
+        if statement.aggregate:
+            return self._aggregate(cursor, statement, schema, predicate)
+        columns = statement.columns or tuple(schema)
+        checked = list(columns)
+        if statement.order_by is not None:
+            checked.append(statement.order_by[0])
+        for column in checked:
+            if column not in schema:
+                raise ProgrammingError(f"Столбец '{column}' не найден")
+
+        table_data = self.tables.read_part(table_name, predicate, checked)
+        if table_data is not None:
+            positions = self._part_positions(table_data, statement, predicate)
+        else:
+            table_data = self.tables.get(table_name)
+            if statement.order_by is not None:
+                positions = self._ordered(table_data, statement, predicate)
+            elif statement.limit is not None or statement.offset:
+                positions = self._page(table_data, statement, predicate)
+            else:
+                positions = self._positions(table_name, table_data, predicate)
+        cursor.description = columns
+        # При ленивом просмотре число строк заранее неизвестно.
+        cursor.rowcount = len(positions) if hasattr(positions, "__len__") else -1
+        # Читаются только выбранные столбцы.
+        rows = _iter_rows(table_data, positions, table_data.version, columns)
+        if cursor.rowcount >= 0:
+            count("rows_returned", cursor.rowcount)
+        else:
+            rows = counted(rows)
+        cursor._rows = rows
+
+    def _insert(self, cursor, statement, params):
+        table_name = statement.table_name
+        values, _, _ = statement.bind(params)
+        new_record = insert(self.metadata, table_name, values,
+                            self._record_type(table_name))
+
+        with write_locks(self.data_dir, [table_name]):
+            self.tables.insert(table_name, new_record)
+            self.indexes.on_insert(table_name, new_record)
+        self.cache.invalidate(table_name)
+        cursor.rowcount = 1
+        cursor.lastrowid = new_record["ID"]
+
+    def _update(self, cursor, statement, params):
+        table_name = statement.table_name
+        schema = self._schema(table_name)
+        _, set_clause, where = statement.bind(params)
+        predicate = statement.predicate(schema, where)
+        changes = self._record_type(table_name).changes(set_clause)
+
+        # Строки выбираются и изменяются под блокировкой таблицы: другой
+        # процесс не изменит их между чтением и записью.
+        with write_locks(self.data_dir, [table_name]):
+            table_data = self.tables.get(table_name)
+            positions = self.indexes.lookup(self.metadata, table_name, table_data,
+                                            predicate)
+            updated_ids, changes, old_values = update(
+                table_data, changes, predicate, positions, self.executor)
+
+            self.tables.update(table_name, updated_ids, changes)
+            self.indexes.on_update(table_name, updated_ids, changes, old_values)
+        self.cache.invalidate(table_name)
+        cursor.rowcount = len(updated_ids)
+
+    def _delete(self, cursor, statement, params):
+        table_name = statement.table_name
+        schema = self._schema(table_name)
+        _, _, where = statement.bind(params)
+        predicate = statement.predicate(schema, where)
+
+        with write_locks(self.data_dir, [table_name]):
+            table_data = self.tables.get(table_name)
+            positions = self.indexes.lookup(self.metadata, table_name, table_data,
+                                            predicate)
+            _, deleted_ids = delete(table_data, predicate, positions, self.executor)
+            if deleted_ids:
+                deleted_rows = table_data.rows(table_data.positions_of(deleted_ids))
+                self.tables.delete(table_name, deleted_ids)
+                self.indexes.on_delete(table_name, deleted_rows)
+                self.cache.invalidate(table_name)
+        cursor.rowcount = len(deleted_ids)
+
+    @_connected
+    def _run(self, cursor, statement, params=()):
+        getattr(self, f"_{statement.kind}")(cursor, statement, params)
+
+    @_connected
+    def _run_many(self, cursor, statement, seq_of_params):
+        if statement.kind == "insert":
+            return self._insert_many(cursor, statement, seq_of_params)
+
+        # Изменения всех наборов параметров записываются на диск один раз.
+        write_back = self.tables.write_back
+        self.tables.write_back = WRITE_AT_EXIT
+        total = 0
+        try:
+            for params in seq_of_params:
+                self._run(cursor, statement, params)
+                total += max(cursor.rowcount, 0)
+        finally:
+            self.tables.write_back = write_back
+            self.tables.flush()
+        cursor.rowcount = total
+
+    def _insert_many(self, cursor, statement, seq_of_params):
+        table_name = statement.table_name
+        record_type = self._record_type(table_name)
+
+        def records():
+            for params in seq_of_params:
+                values, _, _ = statement.bind(params)
+                yield record_type.values(values)
+
+        with write_locks(self.data_dir, [table_name]):
+            table_data = self.tables.get(table_name)
+            count = self.tables.insert_many(table_name, records())
+        self.indexes.invalidate(table_name)
+        self.cache.invalidate(table_name)
+        cursor.rowcount = count
+        if count:
+            cursor.lastrowid = table_data.ids.get(len(table_data) - 1)
+
+    # Публичный интерфейс
+
+    def cursor(self):
+        return Cursor(self)
+
+    def execute(self, sql, params=()):
+        return self.cursor().execute(sql, params)
+
+    def executemany(self, sql, seq_of_params):
+        return self.cursor().executemany(sql, seq_of_params)
+
+    @_connected
+    def prepare(self, name, sql):
+        statement = parse_statement(split_command(sql))
+        self.prepared[name] = statement
+        return statement
+
+    def prepared_statement(self, name):
+        statement = self.prepared.get(name)
+        if statement is None:
+            raise ProgrammingError(f"Подготовленного запроса '{name}' нет")
+        return statement
+
+    def deallocate(self, name):
+        if self.prepared.pop(name, None) is None:
+            raise ProgrammingError(f"Подготовленного запроса '{name}' нет")
+
+    def _check_not_in_transaction(self, action):
+        if self.tables.transaction is not None:
+            raise ProgrammingError(f"Команда '{action}' недоступна внутри транзакции")
+
+    @_connected
+    def create_table(self, table_name, columns, storage=DEFAULT_STORAGE):
+        # columns - список пар (имя, тип), тип: int, float, str или bool;
+        # третьим элементом можно передать ограничения столбца:
+        # {"not_null": True, "default": значение};
+        # storage - формат файлов сегментов: jsonl или binary.
+        self._check_not_in_transaction("create_table")
+        with metadata_lock(self.data_dir):
+            self._refresh_metadata()
+            create_table(self.data_dir, self.metadata, table_name, columns, storage)
+            self.metadata_signature = self._metadata_signature()
+        return self.metadata[table_name]
+
+    @_connected
+    def drop_table(self, table_name):
+        self._check_not_in_transaction("drop_table")
+        with metadata_lock(self.data_dir), table_lock(self.data_dir, table_name):
+            self._refresh_metadata()
+            drop_table(self.data_dir, self.metadata, table_name)
+            self.metadata_signature = self._metadata_signature()
+        self.forget_table(table_name)
+
+    @_connected
+    def list_tables(self):
+        return list_tables(self.data_dir)
+
+    @_connected
+    def table_info(self, table_name):
+        # Число строк и границы значений берутся из статистики таблицы.
+        schema = self._schema(table_name)
+        index_defs = {"ID": "primary"}
+        index_defs.update(get_index_defs(self.metadata, table_name))
+        statistics = self.tables.statistics(table_name)
+        constraints = get_constraints(self.metadata, table_name) or {}
+        return {"rows": statistics["rows"], "schema": dict(schema),
+                "constraints": {name: dict(options)
+                                for name, options in constraints.items()},
+                "indexes": index_defs, "statistics": statistics["columns"],
+                "segments": statistics["segments"],
+                "storage": table_storage(self.data_dir, table_name) or "json"}
+
+    @_connected
+    def create_index(self, table_name, column, kind="hash"):
+        self._check_not_in_transaction("create_index")
+        with metadata_lock(self.data_dir):
+            self._refresh_metadata()
+            save_metadata(self.data_dir,
+                          create_index(self.metadata, table_name, column, kind))
+            self.metadata_signature = self._metadata_signature()
+
+    @_connected
+    def drop_index(self, table_name, column):
+        self._check_not_in_transaction("drop_index")
+        with metadata_lock(self.data_dir):
+            self._refresh_metadata()
+            save_metadata(self.data_dir,
+                          drop_index(self.metadata, table_name, column))
+            self.metadata_signature = self._metadata_signature()
+
+    @_connected
+    def compact(self, table_name):
+        self._check_not_in_transaction("compact")
+        schema = self._schema(table_name)
+        with write_locks(self.data_dir, [table_name]):
+            self.tables.flush(table_name)
+            state = compact_table(self.data_dir, table_name, schema)
+        self.forget_table(table_name)
+        return state
+
+    @_connected
+    def convert(self, table_name, storage):
+        # Перезапись таблицы с сегментами в другом формате.
+        self._check_not_in_transaction("convert")
+        schema = self._schema(table_name)
+        get_storage(storage)
+        with write_locks(self.data_dir, [table_name]):
+            self.tables.flush(table_name)
+            state = compact_table(self.data_dir, table_name, schema, storage)
+        self.forget_table(table_name)
+        return state
+
+    @_connected
+    def import_file(self, table_name, path, report=None):
+        record_type = self._record_type(table_name)
+        with write_locks(self.data_dir, [table_name]):
+            count = self.tables.insert_many(table_name,
+                                            read_records(path, record_type, report))
+        self.indexes.invalidate(table_name)
+        self.cache.invalidate(table_name)
+        return count
+
+    @_connected
+    def export_file(self, table_name, path, where=None, params=(), report=None):
+        # where - текст условия WHERE, в нем можно использовать параметры ?.
+        schema = self._schema(table_name)
+        predicate = None
+        if where:
+            statement = parse_statement(["select", "from", table_name, "where",
+                                         where])
+            predicate = statement.predicate(schema, statement.bind(params)[2])
+        table_data = self.tables.get(table_name)
+        positions = None
+        if predicate is not None:
+            positions = self._positions(table_name, table_data, predicate)
+        return write_records(path, table_data, positions, report)
+
+    @_connected
+    def begin(self):
+        self.tables.begin()
+
+    @_connected
+    def commit(self):
+        return self.tables.commit()
+
+    @_connected
+    def rollback(self):
+        rolled_back = self.tables.rollback()
+        for table_name in rolled_back:
+            self.indexes.invalidate(table_name)
+            self.cache.invalidate(table_name)
+        return rolled_back
+
+    @property
+    def in_transaction(self):
+        return self.tables.transaction is not None
+
+    @_connected
+    def flush(self):
+        self.tables.flush()
+
+    @property
+    def durability(self):
+        return self.data_dir.durability
+
+    def set_durability(self, level):
+        self.data_dir.durability = get_durability(level)
+
+    def _install_executor(self, executor, workers):
+        # При parallelism > 1 исполнитель оборачивается пулом процессов.
+        if isinstance(self.executor, ParallelExecutor):
+            self.executor.close()
+        if workers > 1:
+            executor = ParallelExecutor(executor, workers)
+        self.executor = executor
+        self.parallelism = workers
+
+    def set_executor(self, name):
+        self._install_executor(get_executor(name), self.parallelism)
+        return self.executor.name
+
+    def set_parallelism(self, value):
+        executor = self.executor
+        if isinstance(executor, ParallelExecutor):
+            executor = executor.executor
+        self._install_executor(executor, get_workers(value))
+        return self.parallelism
+
+    @_connected
+    def explain_analyze(self, sql, params=()):
+        # Выполняет команду с замером этапов и счетчиков (insert, update
+        # и delete действительно изменяют таблицу). Строки результата
+        # select читаются, но не возвращаются.
+        profile = Profile(None)
+        with profiling(profile):
+            statement = self.statement(sql)
+            profile.kind = statement.kind
+            for _ in self.cursor().execute(statement, params):
+                pass
+        self.metrics.record(profile)
+        return profile.to_dict()
+
+    def stats(self):
+        return {"cache": self.cache.stats(), "statements": self.statements.stats(),
+                "tables": self.tables.stats(), "metrics": self.metrics.stats()}
+
+    def close(self):
+        # Незавершенная транзакция при закрытии отменяется.
+        if self.closed:
+            return
+        if self.in_transaction:
+            self.rollback()
+        self.tables.close()
+        self._install_executor(self.executor, 1)
+        self.metrics.close()
+        self.closed = True
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, traceback):
+        if self.in_transaction and not self.closed:
+            if exc_type is None:
+                self.commit()
+            else:
+                self.rollback()
+        self.close()
+
+
+def connect(path=DATA_DIR, durability=DURABILITY_NORMAL):
+    return Connection(path, durability)
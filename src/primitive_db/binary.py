@@ -0,0 +1,142 @@
+# src/primitive_db/binary.py
+
+import json
+import mmap
+import struct
+import sys
+from array import array
+
+from .columnar import PRIMARY_KEY, ColumnarTable
+from .errors import OperationalError
+
+# Двоичный файл сегмента: блоки столбцов подряд, за ними оглавление в JSON
+# (заголовок сегмента и смещения блоков каждого столбца), в самом конце -
+# длина оглавления и метка формата. Целые и дробные числа хранятся по 8 байт,
+# логические значения - по байту, строки - словарем: длины строк (4 байта),
+# байты UTF-8 подряд и 4-байтовые коды строк. Порядок байтов - little-endian.
+# NULL хранится так же, как в столбце в памяти; NULL в словаре строк -
+# длина NULL_LENGTH. Столбцы, в которых могут быть NULL, помечены в оглавлении.
+MAGIC = b"PDBSEG01"
+_TRAILER = struct.Struct("<Q8s")
+_SWAP = sys.byteorder == "big"
+NULL_LENGTH = 0xFFFFFFFF
+
+
+def _to_bytes(data):
+    if isinstance(data, array):
+        if _SWAP:
+            data = array(data.typecode, data)
+            data.byteswap()
+        return data.tobytes()
+    return bytes(data)
+
+
+def _from_bytes(typecode, view):
+    data = array(typecode)
+    data.frombytes(view)
+    if _SWAP:
+        data.byteswap()
+    return data
+
+
+def _text_blocks(column):
+    # Свой словарь сегмента: только строки, которые в нем встречаются.
+    local = {}
+    codes = array("i", [local.setdefault(code, len(local)) for code in column.codes])
+    pool = column.pool
+    encoded = [None if pool[code] is None else pool[code].encode("utf-8")
+               for code in local]
+    lengths = array("I", [NULL_LENGTH if value is None else len(value)
+                          for value in encoded])
+    return lengths, b"".join(value for value in encoded if value is not None), codes
+
+
+def write_segment(f, table, header):
+    # f - файл, открытый в двоичном режиме.
+    offset = 0
+    columns = {}
+
+    def block(data):
+        nonlocal offset
+        raw = _to_bytes(data)
+        f.write(raw)
+        position = offset
+        offset += len(raw)
+        return [position, len(raw)]
+
+    for name, column in table.columns.items():
+        if column.type_name == "text":
+            lengths, blob, codes = _text_blocks(column)
+            columns[name] = {"lengths": block(lengths), "blob": block(blob),
+                             "codes": block(codes)}
+        else:
+            columns[name] = {"data": block(column.buffer())}
+        if column.has_nulls:
+            columns[name]["nulls"] = True
+
+    footer = json.dumps({"segment": header, "columns": columns},
+                        ensure_ascii=False).encode("utf-8")
+    f.write(footer)
+    f.write(_TRAILER.pack(len(footer), MAGIC))
+
+
+def _block(view, entry):
+    return view[entry[0]:entry[0] + entry[1]]
+
+
+def _decode(view, schema, names):
+    size = len(view)
+    if size < _TRAILER.size:
+        return None
+    length, magic = _TRAILER.unpack_from(view, size - _TRAILER.size)
+    if magic != MAGIC or length > size - _TRAILER.size:
+        return None
+    end = size - _TRAILER.size
+    footer = json.loads(bytes(view[end - length:end]))
+
+    names = [PRIMARY_KEY, *(name for name in schema if name != PRIMARY_KEY and
+                            (names is None or name in names))]
+    table = ColumnarTable({name: schema[name] for name in names})
+    for name in names:
+        entry = footer["columns"][name]
+        column = table.columns[name]
+        if column.type_name == "text":
+            blob = _block(view, entry["blob"])
+            pool = []
+            position = 0
+            for length in _from_bytes("I", _block(view, entry["lengths"])):
+                if length == NULL_LENGTH:
+                    pool.append(None)
+                    continue
+                pool.append(str(blob[position:position + length], "utf-8"))
+                position += length
+            column.codes = _from_bytes("i", _block(view, entry["codes"]))
+            column.set_pool(pool)
+        elif column.type_name == "boolean":
+            column.data = bytearray(_block(view, entry["data"]))
+        else:
+            column.data = _from_bytes(column.typecode, _block(view, entry["data"]))
+        column.has_nulls = entry.get("nulls", False)
+    return footer["segment"], table
+
+
+def read_segment(path, schema, names=None):
+    # Файл отображается в память (mmap): декодируются только блоки столбцов
+    # names (и ID), остальная часть файла не читается. Возвращает заголовок
+    # сегмента и таблицу ColumnarTable.
+    with open(path, "rb") as f:
+        try:
+            mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:  # пустой файл
+            mapped = None
+        result = None
+        if mapped is not None:
+            with mapped:
+                view = memoryview(mapped)
+                try:
+                    result = _decode(view, schema, names)
+                finally:
+                    view.release()
+    if result is None:
+        raise OperationalError(f"Файл сегмента '{path}' поврежден")
+    return result
@@ -0,0 +1,140 @@
+# src/primitive_db/bulk.py
+
+import csv
+import json
+import os
+import time
+
+from .errors import DataError, ProgrammingError
+
+# Записи читаются и пишутся порциями; после каждой порции выводится прогресс.
+CHUNK_ROWS = 50000
+
+FORMATS = (".csv", ".jsonl")
+
+
+def file_format(path):
+    extension = os.path.splitext(path)[1].lower()
+    if extension not in FORMATS:
+        raise ProgrammingError(f"Формат файла '{path}' не поддерживается. "
+                               f"Используйте: {', '.join(FORMATS)}")
+    return extension
+
+
+class Progress:
+    # report - функция для вывода сообщений о ходе работы или None.
+    def __init__(self, action, report=None):
+        self.action = action
+        self.report = report
+        self.started = time.perf_counter()
+        self.count = 0
+
+    def rate(self):
+        elapsed = time.perf_counter() - self.started
+        return self.count / elapsed if elapsed > 0 else 0.0
+
+    def advance(self, count):
+        before = self.count // CHUNK_ROWS
+        self.count += count
+        if self.report is not None and self.count // CHUNK_ROWS > before:
+            self.report(f"{self.action}: {self.count} записей "
+                        f"({self.rate():.0f} записей/с)")
+
+    def finish(self):
+        if self.report is None:
+            return
+        elapsed = time.perf_counter() - self.started
+        self.report(f"{self.action}: всего {self.count} записей за {elapsed:.3f} с "
+                    f"({self.rate():.0f} записей/с)")
+
+
+def _read_csv(f, columns, types):
+    # В CSV нет отдельного значения NULL: пустое поле нетекстового столбца
+    # читается как NULL, текстового - как пустая строка.
+    nullable = [column_type != "text" for column_type in types]
+    reader = csv.reader(f)
+    header = next(reader, None)
+    if header is None:
+        return
+    missing = [name for name in columns if name not in header]
+    if missing:
+        raise ValueError(f"В заголовке CSV нет столбцов: {', '.join(missing)}")
+    # Столбец ID из файла игнорируется: идентификаторы выдает таблица.
+    indexes = [header.index(name) for name in columns]
+    for row in reader:
+        if not row:
+            continue
+        if len(row) != len(header):
+            raise ValueError(f"ожидается {len(header)} значений, "
+                             f"получено {len(row)}")
+        yield [None if value == "" and null else value
+               for value, null in zip((row[i] for i in indexes), nullable)]
+
+
+def _read_jsonl(f, columns, types):
+    for line in f:
+        if not line.strip():
+            continue
+        try:
+            record = json.loads(line)
+        except json.JSONDecodeError:
+            raise ValueError("некорректная строка JSON")
+        if not isinstance(record, dict):
+            raise ValueError("ожидается объект JSON")
+        missing = [name for name in columns if name not in record]
+        if missing:
+            raise ValueError(f"нет значений для столбцов: {', '.join(missing)}")
+        yield [record[name] for name in columns]
+
+
+READERS = {".csv": _read_csv, ".jsonl": _read_jsonl}
+
+
+def read_records(path, record_type, report=None):
+    # Поток значений без ID в порядке схемы, уже приведенных к типам столбцов.
+    # Проверки record_type (core.RecordType) строятся один раз для всего файла.
+    extension = file_format(path)
+    columns = record_type.names
+    types = [record_type.schema[name] for name in columns]
+    progress = Progress("Импорт", report)
+
+    with open(path, encoding="utf-8", newline="") as f:
+        records = READERS[extension](f, columns, types)
+        while True:
+            try:
+                raw = next(records, None)
+                if raw is None:
+                    break
+                values = record_type.values(raw)
+            except ValueError as ve:
+                raise DataError(f"Ошибка в записи {progress.count + 1} файла "
+                                f"'{path}': {ve}")
+            progress.advance(1)
+            yield values
+    progress.finish()
+
+
+def write_records(path, table, positions=None, report=None):
+    # Записи выгружаются порциями по CHUNK_ROWS, чтобы не собирать в памяти
+    # весь результат в виде словарей.
+    extension = file_format(path)
+    if positions is None:
+        positions = range(len(table))
+    columns = list(table.schema)
+    progress = Progress("Экспорт", report)
+
+    with open(path, "w", encoding="utf-8", newline="") as f:
+        writer = None
+        if extension == ".csv":
+            writer = csv.writer(f)
+            writer.writerow(columns)
+        for start in range(0, len(positions), CHUNK_ROWS):
+            chunk = table.rows(positions[start:start + CHUNK_ROWS])
+            if writer is not None:
+                writer.writerows([row[name] for name in columns] for row in chunk)
+            else:
+                f.writelines(json.dumps(row, ensure_ascii=False) + "\n"
+                             for row in chunk)
+            progress.advance(len(chunk))
+    progress.finish()
+    return progress.count
@@ -0,0 +1,80 @@
+# src/primitive_db/cache.py
+
+from collections import OrderedDict
+
+from .metrics import count
+from .storage import table_signature
+from .utils import estimate_size
+
+CACHE_MAX_ENTRIES = 256
+CACHE_MAX_BYTES = 64 * 1024 * 1024
+
+
+class QueryCache:
+    # LRU-кеш результатов запросов. Ключ содержит поколение таблицы и подпись
+    # ее файлов, поэтому любая запись в таблицу делает старые результаты
+    # недоступными, даже если файл изменил другой процесс.
+    def __init__(self, data_dir, max_entries=CACHE_MAX_ENTRIES,
+                 max_bytes=CACHE_MAX_BYTES):
+        self.data_dir = data_dir
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.entries = OrderedDict()
+        self.generations = {}
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def _full_key(self, table_name, key):
+        return (table_name, self.generations.get(table_name, 0),
+                table_signature(self.data_dir, table_name), key)
+
+    def __call__(self, table_name, key, value_func):
+        full_key = self._full_key(table_name, key)
+        entry = self.entries.get(full_key)
+        if entry is not None:
+            self.hits += 1
+            count("cache_hits")
+            self.entries.move_to_end(full_key)
+            return entry[0]
+
+        self.misses += 1
+        count("cache_misses")
+        result = value_func()
+        if result is not None:
+            self._put(full_key, result)
+        return result
+
+    def _put(self, full_key, result):
+        size = estimate_size(result)
+        if size > self.max_bytes:
+            return
+        self.entries[full_key] = (result, size)
+        self.size += size
+        while len(self.entries) > self.max_entries or self.size > self.max_bytes:
+            _, (_, evicted_size) = self.entries.popitem(last=False)
+            self.size -= evicted_size
+            self.evictions += 1
+
+    def invalidate(self, table_name):
+        self.generations[table_name] = self.generations.get(table_name, 0) + 1
+        for full_key in [k for k in self.entries if k[0] == table_name]:
+            _, size = self.entries.pop(full_key)
+            self.size -= size
+            self.invalidations += 1
+
+    def stats(self):
+        requests = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / requests if requests else 0.0,
+            "evictions": self.evictions,
+            "invalidations": self.invalidations,
+            "entries": len(self.entries),
+            "bytes": self.size,
+            "max_entries": self.max_entries,
+            "max_bytes": self.max_bytes,
+        }
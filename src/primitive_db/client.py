@@ -0,0 +1,218 @@
+# src/primitive_db/client.py
+
+import contextlib
+import json
+import queue
+import socket
+import threading
+
+from . import errors
+from .errors import DatabaseError, OperationalError, ProgrammingError
+
+# Сколько запросов конвейер отправляет, не читая ответов. Ограничение не дает
+# клиенту и серверу одновременно ждать друг друга на заполненных буферах.
+PIPELINE_WINDOW = 128
+POOL_MAX_SIZE = 8
+
+
+class Result:
+    # Результат одного запроса: columns и rows для select, rowcount
+    # и lastrowid для изменений.
+    def __init__(self, response):
+        self.columns = tuple(response["columns"]) if response.get("columns") \
+            else None
+        self.rows = [tuple(row) for row in response.get("rows") or ()]
+        self.rowcount = response.get("rowcount", -1)
+        self.lastrowid = response.get("lastrowid")
+
+    def fetchall(self):
+        return self.rows
+
+
+def _raise(response):
+    # Ошибка сервера поднимается тем же классом из errors.py.
+    error_class = getattr(errors, response.get("error") or "", None)
+    if not (isinstance(error_class, type) and issubclass(error_class, DatabaseError)):
+        error_class = DatabaseError
+    raise error_class(response.get("message", ""))
+
+
+class Client:
+    # Одно подключение к серверу database serve: через Unix-сокет
+    # (socket_path) или TCP (host и port).
+    def __init__(self, socket_path=None, host="127.0.0.1", port=None, timeout=None):
+        if socket_path is None and port is None:
+            raise ProgrammingError("Укажите socket_path или port сервера")
+        try:
+            if socket_path is not None:
+                self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+                self.sock.settimeout(timeout)
+                self.sock.connect(socket_path)
+            else:
+                self.sock = socket.create_connection((host, port), timeout)
+                self.sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        except OSError as e:
+            raise OperationalError(f"Не удалось подключиться к серверу: {e}")
+        self.file = self.sock.makefile("rb")
+        self.next_id = 0
+        self.closed = False
+
+    def _send(self, requests):
+        data = b"".join(json.dumps(request, ensure_ascii=False).encode("utf-8") +
+                        b"\n" for request in requests)
+        try:
+            self.sock.sendall(data)
+        except OSError as e:
+            self.close()
+            raise OperationalError(f"Соединение с сервером потеряно: {e}")
+
+    def _receive(self):
+        try:
+            line = self.file.readline()
+        except OSError as e:
+            line = b""
+            reason = e
+        else:
+            reason = "сервер закрыл соединение"
+        if not line:
+            self.close()
+            raise OperationalError(f"Соединение с сервером потеряно: {reason}")
+        return json.loads(line)
+
+    def _request(self, **fields):
+        self.next_id += 1
+        return dict(fields, id=self.next_id)
+
+    def _roundtrip(self, requests):
+        # Запросы отправляются окнами по PIPELINE_WINDOW; ответы читаются
+        # в том же порядке. Ошибка поднимается после чтения всех ответов,
+        # чтобы следующие запросы не получили чужие ответы.
+        responses = []
+        for start in range(0, len(requests), PIPELINE_WINDOW):
+            window = requests[start:start + PIPELINE_WINDOW]
+            self._send(window)
+            responses.extend(self._receive() for _ in window)
+        for response in responses:
+            if not response.get("ok"):
+                _raise(response)
+        return responses
+
+    def execute(self, sql, params=()):
+        request = self._request(sql=sql, params=list(params))
+        return Result(self._roundtrip([request])[0])
+
+    def executemany(self, sql, seq_of_params):
+        request = self._request(sql=sql,
+                                many=[list(params) for params in seq_of_params])
+        return Result(self._roundtrip([request])[0])
+
+    def call(self, name, *args):
+        # Метод соединения на сервере: begin, commit, table_info и т. д.
+        return self._roundtrip([self._request(call=name, args=list(args))])[0]["result"]
+
+    def pipeline(self):
+        return Pipeline(self)
+
+    def close(self):
+        if self.closed:
+            return
+        self.closed = True
+        with contextlib.suppress(OSError):
+            self.file.close()
+            self.sock.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, traceback):
+        self.close()
+
+
+class Pipeline:
+    # Запросы копятся и отправляются вместе в run(): клиент не ждет ответа
+    # на каждый запрос перед отправкой следующего.
+    def __init__(self, client):
+        self.client = client
+        self.requests = []
+
+    def execute(self, sql, params=()):
+        self.requests.append(self.client._request(sql=sql, params=list(params)))
+        return self
+
+    def call(self, name, *args):
+        self.requests.append(self.client._request(call=name, args=list(args)))
+        return self
+
+    def run(self):
+        requests, self.requests = self.requests, []
+        return [response["result"] if "result" in response else Result(response)
+                for response in self.client._roundtrip(requests)]
+
+
+class ClientPool:
+    # Пул подключений для многопоточных программ: подключение берется
+    # из пула на время запроса и возвращается обратно. Одновременно открыто
+    # не больше max_size подключений; лишние потоки ждут свободного.
+    def __init__(self, socket_path=None, host="127.0.0.1", port=None,
+                 max_size=POOL_MAX_SIZE, timeout=None):
+        self.address = {"socket_path": socket_path, "host": host, "port": port,
+                        "timeout": timeout}
+        self.idle = queue.LifoQueue()
+        self.slots = threading.BoundedSemaphore(max_size)
+        self.closed = False
+
+    @contextlib.contextmanager
+    def connection(self):
+        if self.closed:
+            raise ProgrammingError("Пул подключений закрыт")
+        self.slots.acquire()
+        try:
+            try:
+                client = self.idle.get_nowait()
+            except queue.Empty:
+                client = Client(**self.address)
+            try:
+                yield client
+            except DatabaseError:
+                # Ответы на все запросы прочитаны, подключение исправно.
+                self._put(client)
+                raise
+            except BaseException:
+                # Прерванный обмен оставил бы в подключении чужие ответы.
+                client.close()
+                raise
+            self._put(client)
+        finally:
+            self.slots.release()
+
+    def _put(self, client):
+        if client.closed or self.closed:
+            client.close()
+        else:
+            self.idle.put(client)
+
+    def execute(self, sql, params=()):
+        with self.connection() as client:
+            return client.execute(sql, params)
+
+    def executemany(self, sql, seq_of_params):
+        with self.connection() as client:
+            return client.executemany(sql, seq_of_params)
+
+    def call(self, name, *args):
+        with self.connection() as client:
+            return client.call(name, *args)
+
+    def close(self):
+        self.closed = True
+        while True:
+            try:
+                self.idle.get_nowait().close()
+            except queue.Empty:
+                break
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, traceback):
+        self.close()
@@ -0,0 +1,505 @@
+# src/primitive_db/columnar.py
+
+import bisect
+import math
+import sys
+from array import array
+from itertools import compress
+
+from .errors import DataError
+
+PRIMARY_KEY = "ID"
+
+# Хранимые значения NULL: наименьшее 64-битное целое (поэтому оно не входит
+# в допустимый диапазон integer), NaN для float и код 2 для boolean.
+INT_NULL = -2 ** 63
+BOOL_NULL = 2
+
+# Функции приведения значения к типу столбца. NULL (None) проходит как есть:
+# ограничение NOT NULL проверяет core.RecordType.
+
+
+def to_integer(value, column_name):
+    if value is None:
+        return None
+    try:
+        # Дробное число не округляется молча: 1.5 в целом столбце - ошибка.
+        if isinstance(value, float) and not value.is_integer():
+            raise ValueError(value)
+        value = int(value)
+    except (TypeError, ValueError, OverflowError):
+        raise DataError(f"Неверное значение для столбца '{column_name}'. "
+                        f"Ожидается целое число")
+    if not INT_NULL < value < 2 ** 63:
+        raise DataError(f"Значение для столбца '{column_name}' "
+                        f"вне допустимого диапазона")
+    return value
+
+
+def to_float(value, column_name):
+    if value is None:
+        return None
+    try:
+        value = float(value)
+    except (TypeError, ValueError, OverflowError):
+        raise DataError(f"Неверное значение для столбца '{column_name}'. "
+                        f"Ожидается число")
+    if math.isnan(value):
+        raise DataError(f"Неверное значение для столбца '{column_name}'. "
+                        f"NaN не поддерживается")
+    return value
+
+
+def to_boolean(value, column_name):
+    if value is None or isinstance(value, bool):
+        return value
+    if isinstance(value, str):
+        if value.lower() == "true":
+            return True
+        if value.lower() == "false":
+            return False
+    raise DataError(f"Неверное значение для столбца '{column_name}'. "
+                    f"Ожидается true/false")
+
+
+def to_text(value, column_name):
+    return value if value is None or isinstance(value, str) else str(value)
+
+
+CONVERTERS = {"integer": to_integer, "float": to_float, "boolean": to_boolean,
+              "text": to_text}
+
+
+class Column:
+    # has_nulls - могут ли в столбце быть NULL. Флаг ставится при записи NULL
+    # и не снимается, пока столбец не прочитан заново, поэтому столбцы без
+    # NULL просматриваются по быстрому пути без проверки каждого значения.
+    has_nulls = False
+
+    def nulls(self, positions=None):
+        # Позиции строк со значением NULL (условие IS NULL).
+        if not self.has_nulls:
+            return []
+        if positions is None:
+            positions = range(len(self.buffer()))
+        get = self.get
+        return [position for position in positions if get(position) is None]
+
+    def not_nulls(self, positions=None):
+        # Позиции строк с непустым значением (условие IS NOT NULL).
+        if positions is None:
+            positions = range(len(self.buffer()))
+        if not self.has_nulls:
+            return list(positions)
+        get = self.get
+        return [position for position in positions if get(position) is not None]
+
+    def _scan_nullable(self, test, positions):
+        # NULL не проходит ни одну проверку значения.
+        if positions is None:
+            positions = range(len(self.buffer()))
+        get = self.get
+        return [position for position in positions
+                if (value := get(position)) is not None and test(value)]
+
+
+class IntColumn(Column):
+    type_name = "integer"
+    typecode = "q"
+    null = INT_NULL
+    coerce = staticmethod(to_integer)
+
+    def __init__(self):
+        self.data = array(self.typecode)
+
+    def append(self, value):
+        if value is None:
+            self.has_nulls = True
+            value = self.null
+        self.data.append(value)
+
+    def get(self, position):
+        value = self.data[position]
+        return None if value == INT_NULL else value
+
+    def buffer(self):
+        return self.data
+
+    def sliced(self, start, stop):
+        part = type(self)()
+        part.data = self.data[start:stop]
+        part.has_nulls = self.has_nulls
+        return part
+
+    def extend(self, other):
+        self.data.extend(other.data)
+        self.has_nulls = self.has_nulls or other.has_nulls
+
+    def encode(self, value):
+        if value is None:
+            self.has_nulls = True
+            return self.null
+        return value
+
+    def decode(self, stored):
+        return None if stored == INT_NULL else stored
+
+    def set(self, position, value):
+        self.data[position] = self.encode(value)
+
+    def values(self):
+        if self.has_nulls:
+            return list(map(self.get, range(len(self.data))))
+        return self.data
+
+    def scan(self, test, positions=None):
+        # Позиции строк, значения которых проходят проверку test.
+        if self.has_nulls:
+            return self._scan_nullable(test, positions)
+        data = self.data
+        if positions is None:
+            return list(compress(range(len(data)), map(test, data)))
+        return [i for i in positions if test(data[i])]
+
+    def null_codes(self):
+        return [self.null]
+
+    def keep(self, alive):
+        self.data = array(self.typecode, (item for item, keep in zip(self.data, alive)
+                                          if keep))
+
+    def nbytes(self):
+        return self.data.itemsize * len(self.data)
+
+
+class FloatColumn(IntColumn):
+    # NULL хранится как NaN: NaN не равен сам себе, поэтому проверяется
+    # сравнением value != value.
+    type_name = "float"
+    typecode = "d"
+    null = math.nan
+    coerce = staticmethod(to_float)
+
+    def get(self, position):
+        value = self.data[position]
+        return None if value != value else value
+
+    def decode(self, stored):
+        return None if stored != stored else stored
+
+
+class BoolColumn(Column):
+    type_name = "boolean"
+    coerce = staticmethod(to_boolean)
+
+    def __init__(self):
+        self.data = bytearray()
+
+    def append(self, value):
+        if value is None:
+            self.has_nulls = True
+            self.data.append(BOOL_NULL)
+        else:
+            self.data.append(1 if value else 0)
+
+    def get(self, position):
+        code = self.data[position]
+        return None if code == BOOL_NULL else code == 1
+
+    def buffer(self):
+        return self.data
+
+    def sliced(self, start, stop):
+        part = BoolColumn()
+        part.data = self.data[start:stop]
+        part.has_nulls = self.has_nulls
+        return part
+
+    def extend(self, other):
+        self.data.extend(other.data)
+        self.has_nulls = self.has_nulls or other.has_nulls
+
+    def encode(self, value):
+        if value is None:
+            self.has_nulls = True
+            return BOOL_NULL
+        return 1 if value else 0
+
+    def decode(self, stored):
+        return None if stored == BOOL_NULL else stored == 1
+
+    def set(self, position, value):
+        self.data[position] = self.encode(value)
+
+    def values(self):
+        if self.has_nulls:
+            return [None if item == BOOL_NULL else item == 1 for item in self.data]
+        return [item == 1 for item in self.data]
+
+    def matching_codes(self, test):
+        # Код NULL не проходит ни одну проверку значения.
+        return {code for code in (0, 1) if test(code == 1)}
+
+    def null_codes(self):
+        return [BOOL_NULL]
+
+    def scan(self, test, positions=None):
+        # У столбца всего два возможных значения: проверяем оба один раз.
+        accepted = self.matching_codes(test)
+        data = self.data
+        if positions is not None:
+            return [i for i in positions if data[i] in accepted]
+        if not accepted:
+            return []
+        if len(accepted) == 2:
+            if not self.has_nulls:
+                return list(range(len(data)))
+            # Подходят все строки, кроме NULL: собираем промежутки между ними.
+            found = []
+            start = 0
+            position = data.find(BOOL_NULL)
+            while position != -1:
+                found.extend(range(start, position))
+                start = position + 1
+                position = data.find(BOOL_NULL, start)
+            found.extend(range(start, len(data)))
+            return found
+        (code,) = accepted
+        found = []
+        position = data.find(code)
+        while position != -1:
+            found.append(position)
+            position = data.find(code, position + 1)
+        return found
+
+    def keep(self, alive):
+        self.data = bytearray(item for item, keep in zip(self.data, alive) if keep)
+
+    def nbytes(self):
+        return len(self.data)
+
+
+class TextColumn(Column):
+    # Словарное кодирование: каждая строка хранится один раз в пуле,
+    # а столбец - это массив кодов. Сравнение на равенство идет по кодам.
+    # NULL - значение None в пуле.
+    type_name = "text"
+    coerce = staticmethod(to_text)
+
+    def __init__(self):
+        self.codes = array("i")
+        self.pool = []
+        self.lookup = {}
+        self.pool_bytes = 0
+
+    def _code(self, value):
+        code = self.lookup.get(value)
+        if code is None:
+            if value is None:
+                self.has_nulls = True
+            code = len(self.pool)
+            self.pool.append(value)
+            self.lookup[value] = code
+            self.pool_bytes += sys.getsizeof(value)
+        return code
+
+    def append(self, value):
+        self.codes.append(self._code(value))
+
+    def get(self, position):
+        return self.pool[self.codes[position]]
+
+    def buffer(self):
+        return self.codes
+
+    def sliced(self, start, stop):
+        # Часть столбца с тем же пулом строк: коды в ней совпадают с кодами
+        # исходного столбца. Словарь lookup для чтения не нужен.
+        part = TextColumn()
+        part.codes = self.codes[start:stop]
+        part.pool = self.pool
+        part.has_nulls = self.has_nulls
+        return part
+
+    def set_pool(self, pool):
+        # Готовый словарь строк (например, прочитанный из двоичного сегмента).
+        self.pool = pool
+        self.lookup = {value: code for code, value in enumerate(pool)}
+        self.pool_bytes = sum(map(sys.getsizeof, pool))
+        self.has_nulls = None in self.lookup
+
+    def extend(self, other):
+        # Коды другого столбца переводятся в коды этого пула.
+        codes = [self._code(value) for value in other.pool]
+        self.codes.extend(array("i", map(codes.__getitem__, other.codes)))
+
+    def encode(self, value):
+        return self._code(value)
+
+    def decode(self, stored):
+        return self.pool[stored]
+
+    def set(self, position, value):
+        self.codes[position] = self._code(value)
+
+    def values(self):
+        pool = self.pool
+        return [pool[code] for code in self.codes]
+
+    def matching_codes(self, test):
+        # Проверка выполняется по пулу уникальных строк, а не по каждой строке.
+        return {code for code, value in enumerate(self.pool)
+                if value is not None and test(value)}
+
+    def null_codes(self):
+        return [code for code, value in enumerate(self.pool) if value is None]
+
+    def scan(self, test, positions=None):
+        accepted = self.matching_codes(test)
+        codes = self.codes
+        if not accepted:
+            return []
+        if positions is None:
+            return list(compress(range(len(codes)), map(accepted.__contains__, codes)))
+        return [i for i in positions if codes[i] in accepted]
+
+    def keep(self, alive):
+        self.codes = array("i", (code for code, keep in zip(self.codes, alive)
+                                 if keep))
+
+    def nbytes(self):
+        return self.codes.itemsize * len(self.codes) + self.pool_bytes
+
+
+COLUMN_TYPES = {"integer": IntColumn, "float": FloatColumn, "boolean": BoolColumn,
+                "text": TextColumn}
+
+
+class ColumnarTable:
+    # Таблица в памяти по столбцам. Строки упорядочены по ID, поэтому
+    # позиция записи по ID ищется двоичным поиском. Условия (predicates.py)
+    # проверяются по столбцу целиком и возвращают списки позиций строк.
+    def __init__(self, schema):
+        self.schema = dict(schema)
+        self.columns = {name: COLUMN_TYPES[column_type]()
+                        for name, column_type in self.schema.items()}
+        self.ids = self.columns[PRIMARY_KEY]
+        # Номер версии растет при каждом изменении; по нему внешние
+        # представления таблицы (например, массивы NumPy) понимают,
+        # что их нужно перестроить.
+        self.version = 0
+
+    @classmethod
+    def from_rows(cls, schema, rows):
+        table = cls(schema)
+        if any(rows[i]["ID"] >= rows[i + 1]["ID"] for i in range(len(rows) - 1)):
+            rows = sorted(rows, key=lambda row: row["ID"])
+        for row in rows:
+            table.append(row)
+        return table
+
+    def __len__(self):
+        return len(self.ids.data)
+
+    def __iter__(self):
+        for position in range(len(self)):
+            yield self.row(position)
+
+    def append(self, record):
+        if len(self) and record[PRIMARY_KEY] <= self.ids.data[-1]:
+            raise DataError(f"ID {record[PRIMARY_KEY]} меньше последнего в таблице")
+        self.append_values([column.coerce(record.get(name), name)
+                            for name, column in self.columns.items()])
+
+    def append_values(self, values):
+        # Быстрый путь: значения уже приведены и идут в порядке схемы, с ID.
+        for column, value in zip(self.columns.values(), values):
+            column.append(value)
+        self.version += 1
+
+    def extend(self, other):
+        # Строки другой таблицы с той же схемой и большими ID - в конец.
+        if len(self) and len(other) and other.ids.data[0] <= self.ids.data[-1]:
+            raise DataError(f"ID {other.ids.data[0]} меньше последнего в таблице")
+        for name, column in self.columns.items():
+            column.extend(other.columns[name])
+        self.version += 1
+
+    def truncate(self, length):
+        # Откат незавершенной пакетной вставки.
+        for column in self.columns.values():
+            del column.buffer()[length:]
+        self.version += 1
+
+    def row(self, position):
+        return {name: column.get(position) for name, column in self.columns.items()}
+
+    def rows(self, positions=None):
+        if positions is None:
+            positions = range(len(self))
+        columns = list(self.columns.items())
+        return [{name: column.get(position) for name, column in columns}
+                for position in positions]
+
+    def to_rows(self):
+        return self.rows()
+
+    def position_of(self, record_id):
+        ids = self.ids.data
+        position = bisect.bisect_left(ids, record_id)
+        if position < len(ids) and ids[position] == record_id:
+            return position
+        return None
+
+    def id_range(self, low=None, high=None, low_inclusive=True, high_inclusive=True):
+        # Позиции строк с ID в заданном диапазоне - срез упорядоченного столбца.
+        ids = self.ids.data
+        start = 0
+        if low is not None:
+            bisect_low = bisect.bisect_left if low_inclusive else bisect.bisect_right
+            start = bisect_low(ids, low)
+        end = len(ids)
+        if high is not None:
+            bisect_high = bisect.bisect_right if high_inclusive else bisect.bisect_left
+            end = bisect_high(ids, high)
+        return list(range(start, max(start, end)))
+
+    def positions_of(self, record_ids):
+        positions = (self.position_of(record_id) for record_id in record_ids)
+        return sorted(position for position in positions if position is not None)
+
+    def set_values(self, positions, changes):
+        # changes - значения, уже приведенные к типам столбцов
+        # (core.RecordType.changes): ошибка типа не оставит таблицу
+        # наполовину обновленной.
+        self.version += 1
+        old_values = {}
+        for name, value in changes.items():
+            column = self.columns[name]
+            old_values[name] = [column.get(position) for position in positions]
+            for position in positions:
+                column.set(position, value)
+        return changes, old_values
+
+    def delete_positions(self, positions):
+        if not positions:
+            return
+        alive = bytearray(b"\x01") * len(self)
+        for position in positions:
+            alive[position] = 0
+        for column in self.columns.values():
+            column.keep(alive)
+        self.version += 1
+
+    def slice(self, start, stop, names):
+        # Строки [start, stop) только со столбцами names (и ID) - для передачи
+        # в другой процесс.
+        names = [PRIMARY_KEY, *(name for name in names if name != PRIMARY_KEY)]
+        part = ColumnarTable({name: self.schema[name] for name in names})
+        for name in names:
+            part.columns[name] = self.columns[name].sliced(start, stop)
+        part.ids = part.columns[PRIMARY_KEY]
+        return part
+
+    def nbytes(self):
+        return sum(column.nbytes() for column in self.columns.values())
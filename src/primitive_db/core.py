@@ -1,177 +1,255 @@
 # src/primitive_db/core.py
+import heapq
 import os
-
-from .decorators import confirm_action, handle_db_errors, log_time
-from .utils import METADATA, save_table_data
-
-
-def create_table(metadata, table_name, columns):
-    TYPES = {'int': 'integer', 'str': 'text', 'bool': 'boolean'}
-    FILEPATH = f'data/{table_name}.json'
-
+from itertools import islice
+
+from .columnar import CONVERTERS, PRIMARY_KEY
+from .errors import DataError, ProgrammingError, TableNotFoundError
+from .execution import PythonExecutor
+from .metrics import count
+from .parser import DEFAULT
+from .storage import DEFAULT_STORAGE, JSON_EXT, LOG_EXT, get_storage, table_files
+from .utils import COLUMNS_KEY, INDEXES_KEY, METADATA, SERVICE_KEYS
+from .wal import commit
+
+TYPES = {'int': 'integer', 'float': 'float', 'str': 'text', 'bool': 'boolean'}
+# Ограничения столбца в третьем элементе кортежа (имя, тип, ограничения).
+CONSTRAINTS = ("not_null", "default")
+
+
+def _column_constraints(column_name, column_type, options):
+    if not isinstance(options, dict) or set(options) - set(CONSTRAINTS):
+        raise ProgrammingError(f"Ограничения столбца '{column_name}' задаются "
+                               f"словарем с ключами: {', '.join(CONSTRAINTS)}")
+    constraints = {}
+    if options.get("not_null"):
+        constraints["not_null"] = True
+    default = CONVERTERS[column_type](options.get("default"), column_name)
+    if default is not None:
+        constraints["default"] = default
+    return constraints
+
+
+def create_table(data_dir, metadata, table_name, columns, storage=DEFAULT_STORAGE):
     if table_name in metadata:
-        raise ValueError(f"Таблица '{table_name}' уже существует")
+        raise ProgrammingError(f"Таблица '{table_name}' уже существует")
 
-    if os.path.exists(FILEPATH):
-        raise ValueError(f"Файл для таблицы '{table_name}' уже существует")
+    if table_name in SERVICE_KEYS:
+        raise ProgrammingError(f"Имя '{table_name}' зарезервировано")
 
+    if table_files(data_dir, table_name):
+        raise ProgrammingError(f"Файл для таблицы '{table_name}' уже существует")
+
+    get_storage(storage)
     table_schema = {"ID": "integer"}  # ID всегда первый столбец
+    table_constraints = {}
 
     for column in columns:
-        if not isinstance(column, tuple) or len(column) != 2:
-            raise ValueError("Каждый столбец должен быть кортежем (имя, тип)")
+        if not isinstance(column, tuple) or len(column) not in (2, 3):
+            raise ProgrammingError("Каждый столбец должен быть кортежем "
+                                   "(имя, тип) или (имя, тип, ограничения)")
 
-        column_name, column_type = column
+        column_name, column_type = column[:2]
         if column_type not in TYPES:
-            raise ValueError(
+            raise ProgrammingError(
                 f"Тип '{column_type}' для столбца '{column_name}' не поддерживается. "
-                f"Используйте: int, str, bool")
+                f"Используйте: {', '.join(TYPES)}")
 
         table_schema[column_name] = TYPES[column_type]
+        if len(column) == 3:
+            constraints = _column_constraints(column_name, TYPES[column_type],
+                                              column[2])
+            if constraints:
+                table_constraints[column_name] = constraints
 
     metadata[table_name] = table_schema
-
-    save_table_data(table_name, [])
+    if table_constraints:
+        metadata.setdefault(COLUMNS_KEY, {})[table_name] = table_constraints
+    # Файл таблицы и метаданные записываются через журнал операций.
+    commit(data_dir, metadata, create={table_name: table_schema},
+           storage={table_name: storage})
 
     return metadata
 
 
-@handle_db_errors
-@confirm_action("удаление таблицы", None)
-def drop_table(metadata, table_name):
-    FILEPATH = f'data/{table_name}.json'
-    if not os.path.exists(FILEPATH):
-        raise ValueError(f"Ошибка: Таблица '{table_name}' не существует")
+def get_constraints(metadata, table_name):
+    # Ограничения столбцов таблицы {столбец: {"not_null", "default"}} или None.
+    return metadata.get(COLUMNS_KEY, {}).get(table_name)
+
+
+def drop_table(data_dir, metadata, table_name):
+    if table_name not in metadata or not table_files(data_dir, table_name):
+        raise TableNotFoundError(f"Ошибка: Таблица '{table_name}' не существует")
     del metadata[table_name]
-    os.remove(FILEPATH)
-    print(f"Таблица '{table_name}' успешно удалена.")
+    metadata.get(INDEXES_KEY, {}).pop(table_name, None)
+    metadata.get(COLUMNS_KEY, {}).pop(table_name, None)
+    commit(data_dir, metadata, remove=[table_name])
     return metadata
 
 
-def list_tables(directory):
-    files = os.listdir(directory)
-    if files:
-        for filename in files:
-            if filename != METADATA:
-                filename = os.path.splitext(filename)[0]
-                print(f"- '{filename}'")
-    else:
-        raise ValueError("Ошибка: Таблиц в файле не найдено!")
+def list_tables(data_dir):
+    names = []
+    for filename in sorted(os.listdir(data_dir.path)):
+        if filename != METADATA and filename.endswith((JSON_EXT, LOG_EXT)):
+            names.append(os.path.splitext(filename)[0])
+    return names
+
+
+class RecordType:
+    # Схема таблицы, скомпилированная один раз: функции приведения столбцов
+    # (кроме ID) в порядке схемы, значения по умолчанию и столбцы NOT NULL.
+    # Проверка строки - проход по готовым функциям без разбора типов;
+    # ею пользуются insert, update и импорт из файла.
+    def __init__(self, schema, constraints=None):
+        self.schema = schema
+        self.constraints = constraints
+        constraints = constraints or {}
+        self.names = tuple(name for name in schema if name != PRIMARY_KEY)
+        self.converters = tuple(CONVERTERS[schema[name]] for name in self.names)
+        self.defaults = tuple(constraints.get(name, {}).get("default")
+                              for name in self.names)
+        self.not_null = frozenset(name for name in self.names
+                                  if constraints.get(name, {}).get("not_null"))
+        self.positions = {name: i for i, name in enumerate(self.names)}
+        # Последние столбцы со значением по умолчанию можно не указывать.
+        self.required = len(self.names)
+        while self.required and self.defaults[self.required - 1] is not None:
+            self.required -= 1
+
+    def _check_not_null(self, row):
+        for name, value in zip(self.names, row):
+            if value is None and name in self.not_null:
+                raise DataError(f"Столбец '{name}' не может быть пустым (NOT NULL)")
+
+    def values(self, values):
+        # Значения строки без ID в порядке схемы, приведенные к типам столбцов.
+        names = self.names
+        if len(values) != len(names):
+            if not self.required <= len(values) < len(names):
+                expected = len(names) if self.required == len(names) else \
+                    f"от {self.required} до {len(names)}"
+                raise ProgrammingError(
+                    f"Неверное количество значений. Ожидается {expected} "
+                    f"({', '.join(names)}), получено {len(values)}")
+            values = [*values, *self.defaults[len(values):]]
+        if DEFAULT in values:
+            values = [default if value is DEFAULT else value
+                      for value, default in zip(values, self.defaults)]
+        row = [convert(value, name)
+               for convert, name, value in zip(self.converters, names, values)]
+        if self.not_null and None in row:
+            self._check_not_null(row)
+        return row
+
+    def record(self, values):
+        record = {PRIMARY_KEY: None}
+        record.update(zip(self.names, self.values(values)))
+        return record
+
+    def changes(self, set_clause):
+        # Новые значения столбцов для update, приведенные к типам столбцов.
+        changes = {}
+        for name, value in set_clause.items():
+            position = self.positions.get(name)
+            if position is None:
+                if name == PRIMARY_KEY:
+                    raise ProgrammingError(f"Столбец '{PRIMARY_KEY}' изменять нельзя")
+                raise ProgrammingError(f"Столбец '{name}' не найден")
+            if value is DEFAULT:
+                value = self.defaults[position]
+            value = self.converters[position](value, name)
+            if value is None and name in self.not_null:
+                raise DataError(f"Столбец '{name}' не может быть пустым (NOT NULL)")
+            changes[name] = value
+        return changes
+
+
+def insert(metadata, table_name, values, record_type=None):
+    if table_name not in metadata:
+        raise TableNotFoundError(f"Таблица '{table_name}' не существует")
 
+    if record_type is None:
+        record_type = RecordType(metadata[table_name],
+                                 get_constraints(metadata, table_name))
+    return record_type.record(values)
 
-@handle_db_errors
-def insert(metadata, table_name, values):
-    if table_name not in metadata:
-        raise ValueError(f"Таблица '{table_name}' не существует")
-
-    table_schema = metadata[table_name]
-    columns = [col for col in table_schema.keys() if col != "ID"]
-
-    if len(values) != len(columns):
-        raise ValueError(
-            f"Неверное количество значений. Ожидается {len(columns)} "
-            f"({', '.join(columns)}), получено {len(values)}")
-
-    validated_values = []
-    for i, col_name in enumerate(columns):
-        expected_type = table_schema[col_name]
-        value = values[i]
-
-        if expected_type == "integer":
-            try:
-                if isinstance(value, str):
-                    value = int(value) if value.isdigit() else value
-                if not isinstance(value, int):
-                    raise ValueError(f"Неверный тип для столбца '{col_name}'. "
-                                     f"Ожидается integer")
-            except ValueError:
-                raise ValueError(f"Неверное значение для столбца '{col_name}'. "
-                                 f"Ожидается целое число")
-
-        elif expected_type == "boolean":
-            if isinstance(value, str):
-                if value.lower() == "true":
-                    value = True
-                elif value.lower() == "false":
-                    value = False
-                else:
-                    raise ValueError(f"Неверное значение для столбца '{col_name}'. "
-                                     f"Ожидается true/false")
-            elif not isinstance(value, bool):
-                raise ValueError(f"Неверный тип для столбца '{col_name}'. "
-                                 f"Ожидается boolean")
-
-        elif expected_type == "text" and not isinstance(value, str):
-            value = str(value)
-
-        validated_values.append(value)
-
-    new_record = {"ID": None}
-    for i, col_name in enumerate(columns):
-        new_record[col_name] = validated_values[i]
-
-    return new_record
-
-
-@handle_db_errors
-@log_time
-def select(table_data, where_clause=None):
-    if where_clause is None:
-        return table_data
-
-    filtered_data = []
-    for record in table_data:
-        match = True
-        for column, value in where_clause.items():
-            if column not in record or str(record[column]) != str(value):
-                match = False
-                break
-
-        if match:
-            filtered_data.append(record)
-
-    return filtered_data
-
-
-@handle_db_errors
-def update(table_data, set_clause, where_clause):
-    updated_count = 0
-
-    for record in table_data:
-        match = True
-        for column, value in where_clause.items():
-            if column not in record or str(record[column]) != str(value):
-                match = False
-                break
-
-        if match:
-            for column, new_value in set_clause.items():
-                if column in record and column != "ID":
-                    record[column] = new_value
-            updated_count += 1
-
-    return table_data, updated_count
-
-
-@handle_db_errors
-@confirm_action("удаление записи", return_=(None, 0))
-def delete(table_data, where_clause):
-    if where_clause is None:
-        return table_data, 0
-
-    new_data = []
-    deleted_count = 0
-
-    for record in table_data:
-        match = True
-        for column, value in where_clause.items():
-            if column not in record or str(record[column]) != str(value):
-                match = False
-                break
-
-        if not match:
-            new_data.append(record)
-        else:
-            deleted_count += 1
-
-    return new_data, deleted_count
+
+DEFAULT_EXECUTOR = PythonExecutor()
+
+
+def select(table_data, predicate=None, positions=None, executor=DEFAULT_EXECUTOR):
+    # Позиции подходящих строк; сами строки читаются из таблицы по мере надобности.
+    if predicate is None and positions is None:
+        return range(len(table_data))
+
+    count("rows_scanned", len(table_data) if positions is None else len(positions))
+    return executor.filter(table_data, predicate, positions)
+
+
+# Порция строк, которую проверяет условие при ленивом просмотре.
+SCAN_CHUNK_ROWS = 4096
+
+
+def scan(table_data, predicate=None, positions=None, executor=DEFAULT_EXECUTOR,
+         chunk_rows=SCAN_CHUNK_ROWS):
+    # Ленивый вариант select: условие проверяется порциями строк, поэтому
+    # просмотр останавливается, как только потребителю хватило строк (LIMIT).
+    # Порядок позиций сохраняется: они могут идти в порядке индекса.
+    if positions is None:
+        positions = range(len(table_data))
+    if predicate is None:
+        yield from positions
+        return
+    positions = iter(positions)
+    chunk = list(islice(positions, chunk_rows))
+    while chunk:
+        count("rows_scanned", len(chunk))
+        matched = set(executor.filter(table_data, predicate, chunk))
+        yield from (position for position in chunk if position in matched)
+        chunk = list(islice(positions, chunk_rows))
+
+
+def order(table_data, positions, column, descending=False, count=None):
+    # Позиции, упорядоченные по столбцу. Если нужны только первые count
+    # строк, они отбираются кучей размера count за O(n log k) без полной
+    # сортировки. Строки с равными значениями остаются в порядке ID.
+    if column == PRIMARY_KEY:
+        # Строки таблицы и так упорядочены по ID.
+        ordered = positions[::-1] if descending else positions
+        return ordered if count is None else ordered[:count]
+    column = table_data.columns[column]
+    key = column.get
+    if column.has_nulls:
+        # NULL идет первым, как при сортировке результата агрегации.
+        get = column.get
+
+        def key(position):
+            value = get(position)
+            return (value is not None, value)
+    if count is None:
+        return sorted(positions, key=key, reverse=descending)
+    select_top = heapq.nlargest if descending else heapq.nsmallest
+    return select_top(count, positions, key=key)
+
+
+def update(table_data, changes, predicate, positions=None,
+           executor=DEFAULT_EXECUTOR):
+    # changes - значения, приведенные к типам столбцов (RecordType.changes).
+    count("rows_scanned", len(table_data) if positions is None else len(positions))
+    matched = executor.filter(table_data, predicate, positions)
+    updated_ids = [table_data.ids.get(position) for position in matched]
+
+    changes, old_values = executor.set_values(table_data, matched, changes)
+
+    return updated_ids, changes, old_values
+
+
+def delete(table_data, predicate, positions=None, executor=DEFAULT_EXECUTOR):
+    if predicate is None:
+        return table_data, []
+
+    count("rows_scanned", len(table_data) if positions is None else len(positions))
+    matched = executor.filter(table_data, predicate, positions)
+    deleted_ids = [table_data.ids.get(position) for position in matched]
+
+    return table_data, deleted_ids
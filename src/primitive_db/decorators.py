@@ -1,7 +1,35 @@
 # src/deco.py
 
 import functools
-import time
+import sys
+
+# Ответ на подтверждения в пакетном режиме: None - спрашивать пользователя,
+# True/False - отвечать "да"/"нет" без вопроса (флаг --yes).
+_confirm = {"answer": None}
+
+
+def set_auto_confirm(answer):
+    _confirm["answer"] = answer
+
+
+# Ошибки команд консоли. В пакетном режиме сообщения об ошибках пишутся
+# в отдельный поток (stderr, даже при --quiet) и подсчитываются, чтобы
+# вернуть ненулевой код выхода. output None - текущий sys.stdout.
+_errors = {"output": None, "count": 0, "prefix": ""}
+
+
+def set_error_output(output, prefix=""):
+    _errors["output"] = output
+    _errors["prefix"] = prefix
+
+
+def error_count():
+    return _errors["count"]
+
+
+def report_error(message):
+    _errors["count"] += 1
+    print(f"{_errors['prefix']}{message}", file=_errors["output"] or sys.stdout)
 
 
 def handle_db_errors(func):
@@ -10,13 +38,14 @@ def handle_db_errors(func):
         try:
             return func(*args, **kwargs)
         except KeyError as e:
-            print(f"Ошибка: Таблица или столбец '{e}' не найден.")
+            report_error(f"Ошибка: Таблица или столбец '{e}' не найден.")
         except ValueError as e:
-            print(f"Ошибка валидации: {e}")
+            report_error(f"Ошибка валидации: {e}")
         except FileNotFoundError:
-            print("Ошибка: Файл не найден. Возможно, база данных не инициализирована.")
+            report_error("Ошибка: Файл не найден. Возможно, база данных "
+                         "не инициализирована.")
         except Exception as e:
-            print(f"Произошла непредвиденная ошибка: {e}")
+            report_error(f"Произошла непредвиденная ошибка: {e}")
 
     return wrapper
 
@@ -25,9 +54,12 @@ def confirm_action(action_name, return_):
     def decorator(func):
         @functools.wraps(func)
         def wrapper(*args, **kwargs):
-            response = input(f'Вы уверены, что хотите выполнить "{action_name}"? '
-                             f'[y/n]: ')
-            if response.lower() != 'y':
+            answer = _confirm["answer"]
+            if answer is None:
+                response = input(f'Вы уверены, что хотите выполнить '
+                                 f'"{action_name}"? [y/n]: ')
+                answer = response.lower() == 'y'
+            if not answer:
                 print("Операция отменена.")
                 return return_
 
@@ -36,38 +68,3 @@ def confirm_action(action_name, return_):
         return wrapper
 
     return decorator
-
-
-def log_time(func):
-    @functools.wraps(func)
-    def wrapper(*args, **kwargs):
-        start_time = time.monotonic()
-        try:
-            result = func(*args, **kwargs)
-            end_time = time.monotonic()
-            execution_time = end_time - start_time
-            print(f'Функция "{func.__name__}" выполнилась за '
-                  f'{execution_time:.6f} секунд')
-        except Exception:
-            end_time = time.monotonic()
-            execution_time = end_time - start_time
-            print(f'Функция "{func.__name__}" выполнилась за '
-                  f'{execution_time:.6f} секунд')
-            return
-        return result
-
-    return wrapper
-
-
-def create_cacher():
-    cache = {}
-
-    def cache_result(key, value_func):
-        if key in cache:
-            return cache[key]
-        else:
-            result = value_func()
-            cache[key] = result
-            return result
-
-    return cache_result
@@ -1,323 +1,805 @@
 # src/primitive_db/engine.py
-import shlex
+import contextlib
+import io
+import itertools
+import sys
+import time
 
 from prettytable import PrettyTable
 
-from .core import create_table, delete, drop_table, insert, list_tables, select, update
-from .decorators import create_cacher, log_time
-from .parser import parse_set_clause, parse_values, parse_where_clause
-from .utils import load_metadata, load_table_data, save_metadata, save_table_data
-
-
-def print_help():
+from .api import connect, split_command
+from .decorators import (
+    confirm_action,
+    error_count,
+    handle_db_errors,
+    report_error,
+    set_error_output,
+)
+from .errors import ProgrammingError
+from .metrics import COUNTER_TITLES, STAGE_TITLES, stage
+from .output import OUTPUT_FORMATS, get_writer
+from .parser import parse_value, parse_values
+from .statements import STATEMENT_KINDS
+from .tables import WRITE_AT_EXIT, WRITE_IMMEDIATE
+from .utils import DURABILITY_LEVELS, DURABILITY_NORMAL
+
+
+def print_help(durability=DURABILITY_NORMAL):
     print("\n***Процесс работы с таблицей***")
     print("Функции:")
-    print("<command> create_table <имя_таблицы> <столбец1:тип> .. - создать таблицу")
+    print("<command> create_table <имя_таблицы> <столбец1:тип> .. "
+          "[format jsonl|binary] - создать таблицу")
+    print("    типы: int, float, str, bool; после типа можно указать "
+          ":not_null и :default=<значение>")
     print("<command> list_tables - показать список всех таблиц")
     print("<command> drop_table <имя_таблицы> - удалить таблицу")
     print("<command> insert into <имя_таблицы> values (<значение1>, <значение2>, ...) "
           "- создать запись.")
-    print("<command> select from <имя_таблицы> where <столбец> = <значение> - "
+    print("<command> select from <имя_таблицы> where <условие> - "
           "прочитать записи по условию.")
+    print("    условие: =, !=, <, <=, >, >=, IN (...), BETWEEN .. AND .., LIKE, "
+          "IS [NOT] NULL, AND, OR, NOT и скобки")
     print("<command> select from <имя_таблицы> - прочитать все записи.")
+    print("<command> select <столбец1>, <столбец2> from <имя_таблицы> ... - "
+          "прочитать только указанные столбцы.")
+    print("<command> select ... from <таблица1> join <таблица2> on "
+          "<таблица1>.<столбец> = <таблица2>.<столбец> [where ...] - соединение.")
+    print("<command> select <столбец>, count(*), sum(x), avg(x), min(x), max(x) "
+          "from <имя_таблицы> [where ...] group by <столбец> - агрегаты.")
+    print("    в конце select можно указать order by <столбец> [asc|desc], "
+          "затем limit <N> [offset <M>]")
     print("<command> update <имя_таблицы> set <столбец1> = <новое_значение1> "
           "where <столбец_условия> = <значение_условия> - обновить запись.")
+    print("    в values и set значение null - пустое значение, default - "
+          "значение столбца по умолчанию")
     print("<command> delete from <имя_таблицы> where <столбец> = <значение> - "
           "удалить запись.")
     print("<command> info <имя_таблицы> - вывести информацию о таблице.")
+    print("<command> compact <имя_таблицы> - сжать лог таблицы "
+          "(таблицу в формате .json перевести в лог).")
+    print("<command> convert <имя_таблицы> <jsonl|binary> - переписать таблицу "
+          "в другом формате хранения.")
+    print("<command> create_index <имя_таблицы> <столбец> [hash|sorted] - "
+          "создать индекс.")
+    print("<command> drop_index <имя_таблицы> <столбец> - удалить индекс.")
+    print("<command> cache_stats - статистика кеша запросов.")
+    print("<command> explain analyze <команда> - выполнить команду и показать "
+          "время ее этапов и счетчики.")
+    print("<command> stats [reset] - сводная статистика команд (после "
+          "set metrics on); reset - обнулить.")
+    print("<command> set write_back <immediate|exit|N> - когда записывать изменения "
+          "на диск: сразу, при выходе или каждые N операций.")
+    print("<command> set buffer_memory <байт> - бюджет памяти для таблиц.")
+    print("<command> set executor <auto|python|numpy> - способ вычисления "
+          "условий WHERE и SET.")
+    print("<command> set parallelism <N|auto> - число процессов для просмотра "
+          "больших таблиц (1 - без параллельности).")
+    print(f"<command> set output <{'|'.join(OUTPUT_FORMATS)}> - формат вывода "
+          f"select (tsv и jsonl - без рамок, для передачи в другие программы).")
+    print("<command> set metrics <on|off> - собирать статистику команд для stats.")
+    print("<command> set timing <on|off> - печатать время каждой команды "
+          "в stderr.")
+    print("<command> set metrics_file <путь|off> - дописывать замер каждой "
+          "команды строкой JSON в файл.")
+    print(f"<command> set durability <{'|'.join(DURABILITY_LEVELS)}> - "
+          f"надежность записи на диск (сейчас: {durability}).")
+    print("<command> flush - записать все изменения на диск.")
+    print("<command> prepare <имя> as <команда с параметрами ?> - подготовить "
+          "запрос insert/select/update/delete.")
+    print("<command> execute <имя> (<значение1>, ...) - выполнить подготовленный "
+          "запрос.")
+    print("<command> deallocate <имя> - удалить подготовленный запрос.")
+    print("<command> begin / commit / rollback - начать, зафиксировать или "
+          "отменить транзакцию.")
+    print("<command> import <имя_таблицы> from <файл.csv|файл.jsonl> - загрузить "
+          "записи из файла.")
+    print("<command> export <имя_таблицы> [where <условие>] to "
+          "<файл.csv|файл.jsonl> - выгрузить записи в файл.")
 
     print("\nОбщие команды:")
     print("<command> exit - выход из программы")
     print("<command> help - справочная информация\n")
 
 
-def run_create_table(metadata, args):
+def _column_definition(text):
+    # <столбец>:<тип>[:not_null][:default=<значение>]; значение по умолчанию
+    # записывается последним и может содержать двоеточия.
+    parts = text.split(":", 2)
+    if len(parts) < 2:
+        raise ProgrammingError(f"Ошибка в столбце '{text}'. Формат: "
+                               f"<column_name>:<type>[:not_null][:default=<value>]")
+    options = {}
+    rest = parts[2] if len(parts) == 3 else ""
+    while rest:
+        if rest.startswith("default="):
+            options["default"] = parse_value(rest[len("default="):])
+            break
+        modifier, _, rest = rest.partition(":")
+        if modifier.lower() != "not_null":
+            raise ProgrammingError(f"Ошибка в столбце '{text}': неизвестный "
+                                   f"модификатор '{modifier}'. Используйте not_null "
+                                   f"и default=<value>")
+        options["not_null"] = True
+    return (parts[0], parts[1], options) if options else (parts[0], parts[1])
+
+
+def run_create_table(connection, args):
     if len(args) < 3:
-        print("Использование: create_table <имя_таблицы> <столбец1:тип> ...")
+        report_error("Использование: create_table <имя_таблицы> <столбец1:тип> ...")
         return
 
     table_name = args[1]
-    columns = []
-
-    for column in args[2:]:
-        col_parts = column.split(':')
-        if len(col_parts) != 2:
-            print(f"Ошибка в столбце '{column}'. Формат: <column_name>:<type>")
-            return
-        columns.append((col_parts[0], col_parts[1]))
+    storage = "jsonl"
+    definitions = args[2:]
+    if len(definitions) >= 2 and definitions[-2].lower() == "format":
+        storage = definitions[-1]
+        definitions = definitions[:-2]
+    if not definitions:
+        report_error("Использование: create_table <имя_таблицы> <столбец1:тип> ...")
+        return
 
     try:
-        updated_metadata = create_table(metadata, table_name, columns)
-        save_metadata(updated_metadata)
-        column_descriptions = ', '.join([f"{col[0]}:{col[1]}" for col in columns])
+        columns = [_column_definition(column) for column in definitions]
+        connection.create_table(table_name, columns, storage)
+        column_descriptions = ', '.join(definitions)
         print(f"Таблица '{table_name}' успешно создана со столбцами: "
               f"{column_descriptions}")
     except ValueError as ve:
-        print(ve)
+        report_error(ve)
 
 
-def run_list_tables():
-    direct = "data"
-    try:
-        list_tables(direct)
-    except ValueError as ve:
-        print(ve)
+def run_list_tables(connection, args):
+    names = connection.list_tables()
+    if not names:
+        print("Ошибка: Таблиц в файле не найдено!")
+    for name in names:
+        print(f"- '{name}'")
+
+
+@confirm_action("удаление таблицы", None)
+def _drop_table(connection, table_name):
+    connection.drop_table(table_name)
+    print(f"Таблица '{table_name}' успешно удалена.")
 
 
-def run_drop_table(metadata, args):
+def run_drop_table(connection, args):
     if len(args) < 2:
-        print("Использование: drop_table <table_name>")
+        report_error("Использование: drop_table <table_name>")
         return
 
     table_name = args[1]
+    if table_name not in connection.metadata:
+        report_error(f"Ошибка: Таблица '{table_name}' не существует")
+        return
 
     try:
-        metadata = drop_table(metadata, table_name)
-        if metadata is not None:
-            save_metadata(metadata)
+        _drop_table(connection, table_name)
     except ValueError as ve:
-        print(ve)
+        report_error(ve)
 
 
-@log_time
-def run_insert(metadata, args):
-    if len(args) < 4 or args[1] != "into" or args[3] != "values":
-        print("Ошибка: Неверный формат команды INSERT. Используйте: "
-              "insert into <таблица> values (<значения>)")
-        return
+# Формат вывода select в консоли: table, tsv или jsonl.
+_output = {"format": "table"}
 
-    table_name = args[2]
-    values_str = " ".join(args[4:])
 
-    try:
-        values = parse_values(values_str)
-        table_data = load_table_data(table_name)
-        new_record = insert(metadata, table_name, values)
-
-        if table_data:
-            valid_ids = []
-
-            for record in table_data:
-                if record is not None and isinstance(record, dict) and "ID" in record:
-                    valid_ids.append(record["ID"])
-
-            if valid_ids:
-                max_id = max(valid_ids)
-                new_record["ID"] = max_id + 1
-            else:
-                new_record["ID"] = 1
-        else:
-            new_record["ID"] = 1
+def run_insert(connection, statement, params=()):
+    cursor = connection.execute(statement, params)
+    print(f'Запись с ID={cursor.lastrowid} успешно добавлена в '
+          f'таблицу "{statement.table_name}".')
 
-        table_data.append(new_record)
-        save_table_data(table_name, table_data)
 
-        print(f'Запись с ID={new_record["ID"]} успешно добавлена в '
-              f'таблицу "{table_name}".')
+def run_select(connection, statement, params=()):
+    # Строки выводятся порциями по мере чтения курсора, без сборки всего
+    # результата в памяти.
+    cursor = connection.execute(statement, params)
+    output_format = _output["format"]
+    if output_format == "table" and statement.where is None and \
+            statement.join is None and not statement.offset:
+        first = cursor.fetchone()
+        if first is None:
+            print(f"Данные в таблице: {statement.table_name} отсутствуют")
+            return
+        rows = itertools.chain([first], cursor)
+    else:
+        rows = cursor
+    with stage("render"):
+        get_writer(output_format)(sys.stdout, list(cursor.description), rows)
 
-    except ValueError as ve:
-        print(ve)
 
+def run_update(connection, statement, params=()):
+    cursor = connection.execute(statement, params)
+    print(f"Запись(и) в таблице '{statement.table_name}' успешно обновлена(ы). "
+          f"Обновлено записей: {cursor.rowcount}")
 
-def run_select(args, cache):
-    global cache_key, all_fields
-    metadata = load_metadata()
-    if len(args) < 3 or args[1] != "from":
-        print("Ошибка: Неверный формат команды SELECT. Используйте: "
-              "select from <таблица> [where <условие>]")
-        return
 
-    table_name = args[2]
-    if table_name not in metadata:
-        print(f"Таблицы {table_name} не существует")
+@confirm_action("удаление записи", None)
+def run_delete(connection, statement, params=()):
+    cursor = connection.execute(statement, params)
+    if cursor.rowcount:
+        print(f"Запись(и) успешно удалена(ы) из таблицы '{statement.table_name}'. "
+              f"Удалено записей: {cursor.rowcount}")
+
+
+STATEMENT_RUNNERS = {
+    "insert": run_insert,
+    "select": run_select,
+    "update": run_update,
+    "delete": run_delete,
+}
+
+
+@handle_db_errors
+def run_statement(connection, statement, params=()):
+    if statement.table_name not in connection.metadata:
+        report_error(f"Ошибка: Таблица '{statement.table_name}' не существует")
         return
+    STATEMENT_RUNNERS[statement.kind](connection, statement, params)
+
 
-    where_clause = None
+def run_prepare(connection, args):
+    if len(args) < 4 or args[2] != "as":
+        report_error("Использование: prepare <имя> as <команда с параметрами ?>")
+        return
 
+    name = args[1]
     try:
-        if "where" in args:
-            where_index = args.index("where")
-            where_condition = " ".join(args[where_index + 1:])
-            where_clause = parse_where_clause(where_condition)
+        statement = connection.prepare(name, " ".join(args[3:]))
     except ValueError as ve:
-        print(ve)
+        report_error(ve)
+        return
+    print(f"Запрос '{name}' подготовлен. Параметров: {statement.param_count}")
+
+
+def run_execute(connection, args):
+    if len(args) < 2:
+        report_error("Использование: execute <имя> (<значение1>, <значение2>, ...)")
         return
 
     try:
-        table_data = load_table_data(table_name)
+        statement = connection.prepared_statement(args[1])
+        params = parse_values(" ".join(args[2:]))
+    except ValueError as ve:
+        report_error(ve)
+        return
+    run_statement(connection, statement, params)
 
-        if len(table_data) == 0:
-            print(f"Данные в таблице: {table_name} отсутствуют")
-            return
 
-        if table_data:
-            cache_key = f"select.{table_name}.{str(where_clause)}"
+def run_deallocate(connection, args):
+    if len(args) < 2:
+        report_error("Использование: deallocate <имя>")
+        return
 
-        def get_selected_data():
-            result = select(table_data, where_clause)
-            return result
+    try:
+        connection.deallocate(args[1])
+        print(f"Запрос '{args[1]}' удален.")
+    except ValueError as ve:
+        report_error(ve)
 
-        result_data = cache(cache_key, get_selected_data)
 
-        if table_name in metadata:
-            table_meta = metadata[table_name]
-            all_fields = list(table_meta.keys())
-        else:
-            if result_data:
-                all_fields = list(result_data[0].keys())
-            if "ID" in all_fields:
-                all_fields.remove("ID")
-                all_fields = ["ID"] + all_fields
+def run_compact(connection, args):
+    if len(args) < 2:
+        report_error("Использование: compact <имя_таблицы>")
+        return
 
-        table = PrettyTable()
-        table.field_names = all_fields
+    table_name = args[1]
+    try:
+        state = connection.compact(table_name)
+        print(f"Таблица '{table_name}' сжата. Записей: {state['rows']}")
+    except ValueError as ve:
+        report_error(ve)
 
-        for record in result_data:
-            row = [record.get(field, "") for field in all_fields]
-            table.add_row(row)
-        print(table)
 
+def run_convert(connection, args):
+    if len(args) < 3:
+        report_error("Использование: convert <имя_таблицы> <jsonl|binary>")
+        return
+
+    table_name, storage = args[1], args[2]
+    try:
+        state = connection.convert(table_name, storage)
+        print(f"Таблица '{table_name}' переведена в формат {storage}. "
+              f"Записей: {state['rows']}")
     except ValueError as ve:
-        print(ve)
+        report_error(ve)
 
 
-def run_update(args, metadata):
-    if len(args) < 5 or args[2] != "set" or "where" not in args:
-        print(
-            "Ошибка: Неверный формат команды UPDATE. Используйте: update <таблица> set "
-            "<присваивания> where <условие>")
+def run_create_index(connection, args):
+    if len(args) < 3:
+        report_error("Использование: create_index <имя_таблицы> <столбец> "
+                     "[hash|sorted]")
         return
 
-    table_name = args[1]
-    if table_name not in metadata:
-        print(f"Таблицы {table_name} в базе нет")
+    table_name, column = args[1], args[2]
+    kind = args[3] if len(args) > 3 else "hash"
+
+    try:
+        connection.create_index(table_name, column, kind)
+        print(f"Индекс '{kind}' по столбцу '{column}' таблицы '{table_name}' "
+              f"создан.")
+    except ValueError as ve:
+        report_error(ve)
+
+
+def run_drop_index(connection, args):
+    if len(args) < 3:
+        report_error("Использование: drop_index <имя_таблицы> <столбец>")
         return
-    set_index = args.index("set")
-    where_index = args.index("where")
 
-    set_condition = " ".join(args[set_index + 1:where_index])
-    where_condition = " ".join(args[where_index + 1:])
+    table_name, column = args[1], args[2]
 
     try:
-        table_data = load_table_data(table_name)
+        connection.drop_index(table_name, column)
+        print(f"Индекс по столбцу '{column}' таблицы '{table_name}' удален.")
+    except ValueError as ve:
+        report_error(ve)
 
-        set_clause = parse_set_clause(set_condition)
-        where_clause = parse_where_clause(where_condition)
 
-        updated_data, updated_count = update(table_data, set_clause, where_clause)
+def _file_argument(arg):
+    # Путь можно взять в кавычки, если в нем есть пробелы.
+    if len(arg) >= 2 and arg[0] == arg[-1] and arg[0] in "\"'":
+        return arg[1:-1]
+    return arg
 
-        save_table_data(table_name, updated_data)
 
-        print(f"Запись(и) в таблице '{table_name}' успешно обновлена(ы). "
-              f"Обновлено записей: {updated_count}")
+def run_import(connection, args):
+    if len(args) != 4 or args[2] != "from":
+        report_error("Использование: import <имя_таблицы> from <файл.csv|файл.jsonl>")
+        return
+
+    table_name, path = args[1], _file_argument(args[3])
+    if table_name not in connection.metadata:
+        report_error(f"Ошибка: Таблица '{table_name}' не существует")
+        return
 
+    try:
+        with connection.metrics.measure("import"):
+            count = connection.import_file(table_name, path, report=print)
+        print(f"В таблицу '{table_name}' импортировано записей: {count}")
+    except OSError as e:
+        report_error(f"Ошибка: Не удалось прочитать файл '{path}': {e.strerror}")
     except ValueError as ve:
-        print(ve)
+        report_error(ve)
+        print("Импорт отменен, таблица не изменена.")
+
 
+def run_export(connection, args):
+    if len(args) < 4 or "to" not in args:
+        report_error("Использование: export <имя_таблицы> [where <условие>] to "
+                     "<файл.csv|файл.jsonl>")
+        return
 
-def run_delete(args):
-    if len(args) < 4 or args[1] != "from" or args[3] != "where":
-        print("Ошибка: Неверный формат команды DELETE. Используйте: "
-              "delete from <таблица> where <условие>")
+    table_name = args[1]
+    to_index = len(args) - 1 - args[::-1].index("to")
+    if to_index != len(args) - 2:
+        report_error("Ошибка: После 'to' укажите один файл")
         return
+    path = _file_argument(args[-1])
 
-    table_name = args[2]
-    where_condition = " ".join(args[4:])
+    where = None
+    if args[2] == "where":
+        where = " ".join(args[3:to_index])
+    elif to_index != 2:
+        report_error("Ошибка: Ожидается 'where' или 'to'")
+        return
 
     try:
-        table_data = load_table_data(table_name)
+        with connection.metrics.measure("export"):
+            count = connection.export_file(table_name, path, where, report=print)
+        print(f"Из таблицы '{table_name}' выгружено записей: {count}")
+    except OSError as e:
+        report_error(f"Ошибка: Не удалось записать файл '{path}': {e.strerror}")
+    except ValueError as ve:
+        report_error(ve)
 
-        where_clause = parse_where_clause(where_condition)
 
-        result = delete(table_data, where_clause)
-        if result is None:
-            return
-        new_data, deleted_count = result
-        if deleted_count > 0:
-            save_table_data(table_name, new_data)
-            print(f"Запись(и) успешно удалена(ы) из таблицы '{table_name}'. "
-                  f"Удалено записей: {deleted_count}")
+def run_begin(connection, args):
+    try:
+        connection.begin()
+        print("Транзакция начата.")
+    except ValueError as ve:
+        report_error(ve)
+
 
+def run_commit(connection, args):
+    try:
+        committed = connection.commit()
+        print(f"Транзакция зафиксирована. Изменено таблиц: {committed}")
     except ValueError as ve:
-        print(ve)
+        report_error(ve)
 
 
-def run_info(args):
-    if len(args) < 2:
-        print("Ошибка: Укажите имя таблицы. Используйте: info <таблица>")
+def run_rollback(connection, args):
+    try:
+        connection.rollback()
+        print("Транзакция отменена.")
+    except ValueError as ve:
+        report_error(ve)
+
+
+def run_cache_stats(connection, args):
+    all_stats = connection.stats()
+    stats = all_stats["cache"]
+    statement_stats = all_stats["statements"]
+    buffer_stats = all_stats["tables"]
+
+    stats_table = PrettyTable()
+    stats_table.field_names = ["Показатель", "Значение"]
+    stats_table.add_row(["Попадания", stats["hits"]])
+    stats_table.add_row(["Промахи", stats["misses"]])
+    stats_table.add_row(["Доля попаданий", f"{stats['hit_rate']:.2%}"])
+    stats_table.add_row(["Вытеснения", stats["evictions"]])
+    stats_table.add_row(["Инвалидации", stats["invalidations"]])
+    stats_table.add_row(["Записей в кеше", f"{stats['entries']} / "
+                                           f"{stats['max_entries']}"])
+    stats_table.add_row(["Объем, байт", f"{stats['bytes']} / {stats['max_bytes']}"])
+    stats_table.add_row(["Разобранных команд в кеше",
+                         f"{statement_stats['entries']} / "
+                         f"{statement_stats['max_entries']}"])
+    stats_table.add_row(["Повторно использовано разборов", statement_stats["hits"]])
+    stats_table.add_row(["Таблиц в памяти", buffer_stats["tables"]])
+    stats_table.add_row(["Таблиц с незаписанными изменениями",
+                         buffer_stats["dirty"]])
+    stats_table.add_row(["Память таблиц, байт", f"{buffer_stats['bytes']} / "
+                                                f"{buffer_stats['max_bytes']}"])
+    print(stats_table)
+
+
+def _ms(seconds):
+    return f"{seconds * 1000:.3f}"
+
+
+def _print_profile(stages, counters, total):
+    # Этапы в порядке выполнения команды; время вне этапов - "Прочее".
+    stages_table = PrettyTable()
+    stages_table.field_names = ["Этап", "Время, мс", "Доля"]
+    stages_table.align["Этап"] = "l"
+    other = total - sum(stages.values())
+    rows = [(STAGE_TITLES[name], stages[name]) for name in STAGE_TITLES
+            if name in stages]
+    for title, seconds in rows + [("Прочее", max(other, 0.0))]:
+        share = seconds / total if total > 0 else 0.0
+        stages_table.add_row([title, _ms(seconds), f"{share:.1%}"])
+    print(stages_table)
+
+    if counters:
+        counters_table = PrettyTable()
+        counters_table.field_names = ["Показатель", "Значение"]
+        counters_table.align["Показатель"] = "l"
+        for name, title in COUNTER_TITLES.items():
+            if name in counters:
+                counters_table.add_row([title, counters[name]])
+        print(counters_table)
+
+
+def run_explain(connection, user_input):
+    parts = user_input.split(None, 2)
+    if len(parts) < 3 or parts[1].lower() != "analyze":
+        report_error("Использование: explain analyze <команда>")
         return
 
-    table_name = args[1]
-
     try:
-        metadata = load_metadata()
+        profile = connection.explain_analyze(parts[2])
+    except ValueError as ve:
+        report_error(ve)
+        return
+    print(f"Команда {profile['kind']} выполнена за {_ms(profile['total'])} мс")
+    _print_profile(profile["stages"], profile["counters"], profile["total"])
+
 
-        if table_name not in metadata:
-            print(f"Ошибка: Таблица '{table_name}' не существует")
+def run_stats(connection, args):
+    metrics = connection.metrics
+    if len(args) > 1:
+        if args[1] != "reset":
+            report_error("Использование: stats [reset]")
             return
+        metrics.reset()
+        print("Статистика команд обнулена.")
+        return
 
-        table_schema = metadata[table_name]
-        table_data = load_table_data(table_name)
+    kinds = metrics.stats()
+    if not kinds:
+        if metrics.collect:
+            print("Статистика пуста: команды еще не выполнялись.")
+        else:
+            print("Статистика не собирается. Включите ее: set metrics on")
+        return
 
-        print(f"Информация о таблице '{table_name}':")
-        print(f"Количество записей: {len(table_data)}")
-        print("Структура таблицы:")
+    kinds_table = PrettyTable()
+    kinds_table.field_names = ["Команда", "Число", "Всего, мс", "Среднее, мс",
+                               "Макс, мс"]
+    stages, counters, total = {}, {}, 0.0
+    for kind, totals in sorted(kinds.items()):
+        kinds_table.add_row([kind, totals["count"], _ms(totals["total"]),
+                             _ms(totals["total"] / totals["count"]),
+                             _ms(totals["max"])])
+        total += totals["total"]
+        for name, seconds in totals["stages"].items():
+            stages[name] = stages.get(name, 0.0) + seconds
+        for name, value in totals["counters"].items():
+            counters[name] = counters.get(name, 0) + value
+    print(kinds_table)
+    _print_profile(stages, counters, total)
+
+
+def run_set(connection, args):
+    if len(args) < 3:
+        report_error("Использование: set <параметр> <значение>")
+        return
 
-        schema_table = PrettyTable()
-        schema_table.field_names = ["Столбец", "Тип данных"]
+    option, value = args[1], args[2]
 
-        for column, data_type in table_schema.items():
-            schema_table.add_row([column, data_type])
+    if option == "write_back":
+        if value in (WRITE_IMMEDIATE, WRITE_AT_EXIT):
+            connection.tables.write_back = value
+        elif value.isdigit() and int(value) > 0:
+            connection.tables.write_back = int(value)
+        else:
+            report_error("Ошибка: write_back принимает immediate, exit или число "
+                         "операций")
+            return
+        # Изменения, накопленные по старой политике, записываем сразу.
+        connection.flush()
+    elif option == "executor":
+        try:
+            value = connection.set_executor(value)
+        except ValueError as ve:
+            report_error(ve)
+            return
+    elif option == "parallelism":
+        try:
+            value = connection.set_parallelism(value)
+        except ValueError as ve:
+            report_error(ve)
+            return
+    elif option == "durability":
+        try:
+            connection.set_durability(value)
+        except ValueError as ve:
+            report_error(ve)
+            return
+    elif option == "output":
+        if value not in OUTPUT_FORMATS:
+            report_error(f"Ошибка: output принимает {', '.join(OUTPUT_FORMATS)}")
+            return
+        _output["format"] = value
+    elif option in ("metrics", "timing"):
+        if value not in ("on", "off"):
+            report_error(f"Ошибка: {option} принимает on или off")
+            return
+        setattr(connection.metrics, "collect" if option == "metrics" else option,
+                value == "on")
+    elif option == "metrics_file":
+        value = _file_argument(value)
+        try:
+            connection.metrics.open_file(None if value == "off" else value)
+        except OSError as e:
+            report_error(f"Ошибка: Не удалось открыть файл '{value}': {e.strerror}")
+            return
+    elif option == "buffer_memory":
+        if not value.isdigit():
+            report_error("Ошибка: buffer_memory принимает размер в байтах")
+            return
+        connection.tables.max_bytes = int(value)
+    else:
+        report_error(f"Ошибка: Параметра '{option}' нет")
+        return
 
-        print(schema_table)
+    print(f"Параметр '{option}' установлен: {value}")
 
-    except ValueError as ve:
-        print(ve)
 
+def run_info(connection, args):
+    if len(args) < 2:
+        report_error("Ошибка: Укажите имя таблицы. Используйте: info <таблица>")
+        return
 
-def run():
-    metadata = load_metadata()
-    cache = create_cacher()
+    table_name = args[1]
 
-    while True:
-        user_input = input("Введите команду: ")
-        args = shlex.split(user_input)
+    try:
+        info = connection.table_info(table_name)
+    except ValueError as ve:
+        report_error(ve)
+        return
 
-        if not args:
+    print(f"Информация о таблице '{table_name}':")
+    print(f"Количество записей: {info['rows']}")
+    print(f"Формат хранения: {info['storage']}")
+    if info["segments"] is not None:
+        print(f"Сегментов: {info['segments']}")
+    print("Структура таблицы:")
+
+    schema_table = PrettyTable()
+    schema_table.field_names = ["Столбец", "Тип данных", "Ограничения", "Мин",
+                                "Макс"]
+
+    # Неточные границы (после update и delete) помечаются знаком ~.
+    for column, data_type in info["schema"].items():
+        options = info["constraints"].get(column, {})
+        constraints = ", ".join(
+            (["NOT NULL"] if options.get("not_null") else []) +
+            ([f"DEFAULT {options['default']}"] if "default" in options else []))
+        bounds = info["statistics"].get(column)
+        if bounds is None:
+            schema_table.add_row([column, data_type, constraints, "", ""])
             continue
-        args = shlex.split(user_input)
-        command = args[0]
+        mark = "" if bounds["exact"] else "~"
+        schema_table.add_row([column, data_type, constraints,
+                              f"{mark}{bounds['min']}", f"{mark}{bounds['max']}"])
+
+    print(schema_table)
+
+    print("Индексы: " + ", ".join(f"{column}:{kind}"
+                                  for column, kind in info["indexes"].items()))
+
+
+def run_flush(connection, args):
+    connection.flush()
+    print("Изменения записаны на диск.")
+
+
+def run_help(connection, args):
+    print_help(connection.durability)
+
+
+COMMANDS = {
+    "create_table": run_create_table,
+    "list_tables": run_list_tables,
+    "drop_table": run_drop_table,
+    "info": run_info,
+    "compact": run_compact,
+    "convert": run_convert,
+    "create_index": run_create_index,
+    "drop_index": run_drop_index,
+    "import": run_import,
+    "export": run_export,
+    "cache_stats": run_cache_stats,
+    "stats": run_stats,
+    "set": run_set,
+    "begin": run_begin,
+    "commit": run_commit,
+    "rollback": run_rollback,
+    "flush": run_flush,
+    "prepare": run_prepare,
+    "execute": run_execute,
+    "deallocate": run_deallocate,
+    "help": run_help,
+}
+
+
+# Размер буфера вывода в пакетном режиме.
+OUTPUT_BUFFER_SIZE = 1024 * 1024
+
+
+def execute(connection, user_input):
+    # Выполняет одну команду. Возвращает False, если получена команда exit.
+    # Команды insert/select/update/delete разбираются один раз и дальше
+    # берутся из кеша соединения по тексту команды.
+    command = user_input.split(None, 1)[0] if user_input.strip() else ""
+    if command in STATEMENT_KINDS:
+        # Замер включает разбор команды и вывод результата.
+        with connection.metrics.measure(command):
+            try:
+                statement = connection.statement(user_input)
+            except ValueError as ve:
+                report_error(ve)
+                return True
+            run_statement(connection, statement)
+        return True
+    if command == "explain":
+        run_explain(connection, user_input)
+        return True
+
+    try:
+        args = split_command(user_input)
+    except ValueError as ve:
+        report_error(ve)
+        return True
 
-        if command == "create_table":
-            run_create_table(metadata, args)
+    if not args:
+        return True
+    command = args[0]
 
-        elif command == "list_tables":
-            run_list_tables()
+    if command == "exit":
+        print("Выход из программы.")
+        return False
 
-        elif command == "drop_table":
-            run_drop_table(metadata, args)
+    handler = COMMANDS.get(command)
+    if handler is None:
+        report_error(f"Ошибка: Функции '{command}' нет. Попробуйте снова!")
+    else:
+        handler(connection, args)
+    return True
 
-        elif command == "insert":
-            run_insert(metadata, args)
 
-        elif command == "select":
-            run_select(args, cache)
+def _open_connection():
+    try:
+        connection = connect()
+    except ValueError as ve:
+        report_error(ve)
+        return None
+    if connection.recovered:
+        print(f"Восстановлено незавершенных операций: {connection.recovered}")
+    return connection
 
-        elif command == "update":
-            run_update(args, metadata)
 
-        elif command == "delete":
-            run_delete(args)
+def _close_connection(connection):
+    if connection.in_transaction:
+        print("Незавершенная транзакция отменена.")
+    connection.close()
 
-        elif command == "info":
-            run_info(args)
 
-        elif command == "help":
-            print_help()
+def run():
+    connection = _open_connection()
+    if connection is None:
+        return
 
-        elif command == "exit":
-            print("Выход из программы.")
-            break
+    try:
+        while execute(connection, input("Введите команду: ")):
+            pass
+    finally:
+        _close_connection(connection)
 
-        else:
-            print(f"Ошибка: Функции '{command}' нет. Попробуйте снова!")
+
+class _NullOutput(io.TextIOBase):
+    def write(self, text):
+        return len(text)
+
+
+def _script_statements(lines):
+    # Пустые строки и комментарии (-- или #) пропускаются,
+    # завершающая точка с запятой необязательна.
+    for line in lines:
+        statement = line.strip()
+        if not statement or statement.startswith(("--", "#")):
+            continue
+        yield statement.rstrip(";").rstrip()
+
+
+def run_batch(lines, quiet=False, stop_on_error=False):
+    # Пакетный режим: команды из файла или stdin без приглашения ввода.
+    # Вывод копится в большом буфере, а при quiet отбрасывается; сообщения
+    # об ошибках всегда идут в stderr с номером команды. В конце печатается
+    # общее время и число команд в секунду. Возвращает код выхода: 1, если
+    # хотя бы одна команда завершилась ошибкой (при stop_on_error пакет
+    # останавливается на первой такой команде).
+    connection = _open_connection()
+    if connection is None:
+        return 1
+
+    if quiet:
+        output = _NullOutput()
+    else:
+        output = io.TextIOWrapper(
+            io.BufferedWriter(io.FileIO(sys.stdout.fileno(), "w", closefd=False),
+                              buffer_size=OUTPUT_BUFFER_SIZE),
+            encoding=sys.stdout.encoding or "utf-8")
+
+    sys.stdout.flush()
+    count = 0
+    failed = 0
+    start_time = time.perf_counter()
+    try:
+        with contextlib.redirect_stdout(output):
+            try:
+                for statement in _script_statements(lines):
+                    count += 1
+                    errors = error_count()
+                    set_error_output(sys.stderr, f"Команда {count}: ")
+                    running = execute(connection, statement)
+                    if error_count() > errors:
+                        failed += 1
+                        if stop_on_error:
+                            report_error("выполнение пакета остановлено")
+                            break
+                    if not running:
+                        break
+            finally:
+                set_error_output(None)
+                _close_connection(connection)
+    finally:
+        output.flush()
+
+    elapsed = time.perf_counter() - start_time
+    rate = count / elapsed if elapsed > 0 else 0.0
+    print(f"Выполнено команд: {count} за {elapsed:.3f} с ({rate:.0f} команд/с)"
+          + (f", с ошибкой: {failed}" if failed else ""))
+    return 1 if failed else 0
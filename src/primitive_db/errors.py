@@ -0,0 +1,26 @@
+# src/primitive_db/errors.py
+
+
+# Все ошибки базы наследуют ValueError, поэтому код, который ловит
+# ValueError, продолжает работать.
+class DatabaseError(ValueError):
+    pass
+
+
+class ProgrammingError(DatabaseError):
+    # Неверная команда, условие, параметры или состояние транзакции.
+    pass
+
+
+class TableNotFoundError(ProgrammingError):
+    pass
+
+
+class DataError(DatabaseError):
+    # Значение не подходит типу столбца.
+    pass
+
+
+class OperationalError(DatabaseError):
+    # Поврежденные файлы и изменения таблиц другим процессом.
+    pass
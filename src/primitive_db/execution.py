@@ -0,0 +1,172 @@
+# src/primitive_db/execution.py
+
+import weakref
+
+from .aggregates import aggregate
+from .errors import ProgrammingError
+from .predicates import COMPARISONS, NUMERIC_TYPES, Condition
+
+try:
+    import numpy as np
+except ImportError:  # NumPy - необязательная зависимость
+    np = None
+
+# Ниже этого числа строк массивы NumPy не окупают затрат на их построение.
+NUMPY_MIN_ROWS = 2048
+
+
+class PythonExecutor:
+    # Исполнитель по умолчанию: фильтры и SET на чистом Python.
+    name = "python"
+
+    def filter(self, table, predicate, positions=None):
+        if predicate is None:
+            return list(range(len(table))) if positions is None else list(positions)
+        return predicate.evaluate(table, positions)
+
+    def set_values(self, table, positions, changes):
+        return table.set_values(positions, changes)
+
+    def aggregate(self, table, positions, items, group_by):
+        return aggregate(table, positions, items, group_by)
+
+
+def _dtype(buffer):
+    if isinstance(buffer, bytearray):
+        return np.uint8
+    if buffer.typecode == "d":
+        return np.float64
+    return np.dtype(f"i{buffer.itemsize}")
+
+
+def _view(buffer):
+    # Представление буфера столбца без копирования; его нужно освободить
+    # до следующего изменения размера столбца.
+    if not len(buffer):
+        return np.empty(0, dtype=_dtype(buffer))
+    return np.frombuffer(buffer, dtype=_dtype(buffer))
+
+
+class NumpyExecutor:
+    # Столбцы копируются в массивы NumPy один раз на версию таблицы,
+    # условия WHERE вычисляются как булевы маски, SET - присваиванием по маске.
+    name = "numpy"
+
+    def __init__(self, min_rows=NUMPY_MIN_ROWS):
+        self.min_rows = min_rows
+        self.fallback = PythonExecutor()
+        self.arrays = weakref.WeakKeyDictionary()
+
+    def column_array(self, table, name):
+        cached = self.arrays.get(table)
+        if cached is None or cached[0] != table.version:
+            cached = (table.version, {})
+            self.arrays[table] = cached
+
+        arrays = cached[1]
+        if name not in arrays:
+            arrays[name] = _view(table.columns[name].buffer()).copy()
+        return arrays[name]
+
+    def _mask(self, node, table, subset):
+        if isinstance(node, Condition):
+            values = self.column_array(table, node.column)
+            if subset is not None:
+                values = values[subset]
+            return self._condition_mask(node, table, values)
+
+        kind = node[0]
+        left = self._mask(node[1], table, subset)
+        if kind == "and":
+            if not left.any():
+                return left
+            return left & self._mask(node[2], table, subset)
+        return left | self._mask(node[2], table, subset)
+
+    def _null_mask(self, column, values):
+        if not column.has_nulls:
+            return np.zeros(len(values), dtype=bool)
+        if column.type_name == "float":
+            return np.isnan(values)
+        codes = column.null_codes()
+        return np.isin(values, np.array(codes, dtype=values.dtype))
+
+    def _condition_mask(self, condition, table, values):
+        column = table.columns[condition.column]
+        if condition.kind == "null":
+            mask = self._null_mask(column, values)
+            return ~mask if condition.negated else mask
+        if condition.column_type not in NUMERIC_TYPES:
+            # Строки и логические значения сравниваются по кодам: условие
+            # проверяется на словаре значений, затем код ищется в массиве.
+            # Коды NULL в число подходящих не входят; test уже учитывает
+            # отрицание.
+            codes = column.matching_codes(condition.test)
+            return np.isin(values, np.fromiter(codes, dtype=values.dtype,
+                                               count=len(codes)))
+        if condition.kind == "cmp":
+            op, value = condition.params
+            mask = COMPARISONS[op](values, value)
+        elif condition.kind == "in":
+            accepted = condition.params[0]
+            mask = np.isin(values, np.fromiter(accepted, dtype=values.dtype,
+                                               count=len(accepted)))
+        else:
+            low, high = condition.params
+            mask = (values >= low) & (values <= high)
+        if condition.negated:
+            mask = ~mask
+        if column.has_nulls:
+            mask &= ~self._null_mask(column, values)
+        return mask
+
+    def filter(self, table, predicate, positions=None):
+        size = len(table) if positions is None else len(positions)
+        if predicate is None or size < self.min_rows:
+            return self.fallback.filter(table, predicate, positions)
+
+        subset = None if positions is None else np.asarray(positions, dtype=np.intp)
+        mask = self._mask(predicate.node, table, subset)
+        if subset is not None:
+            return subset[mask].tolist()
+        return np.flatnonzero(mask).tolist()
+
+    def set_values(self, table, positions, changes):
+        if len(positions) < self.min_rows:
+            return self.fallback.set_values(table, positions, changes)
+
+        table.version += 1
+        subset = np.asarray(positions, dtype=np.intp)
+
+        old_values = {}
+        for name, value in changes.items():
+            column = table.columns[name]
+            encoded = column.encode(value)
+            view = _view(column.buffer())
+            old = view[subset].tolist()
+            view[subset] = encoded
+            del view
+            old_values[name] = [column.decode(stored) for stored in old]
+        return changes, old_values
+
+    def aggregate(self, table, positions, items, group_by):
+        return self.fallback.aggregate(table, positions, items, group_by)
+
+
+EXECUTORS = {"python": PythonExecutor, "numpy": NumpyExecutor}
+
+
+def numpy_available():
+    return np is not None
+
+
+def get_executor(name="auto"):
+    if name == "auto":
+        name = "numpy" if numpy_available() else "python"
+    if name not in EXECUTORS:
+        raise ProgrammingError(f"Исполнитель '{name}' не поддерживается. "
+                               f"Используйте: auto, {', '.join(EXECUTORS)}")
+    if name == "numpy" and not numpy_available():
+        raise ProgrammingError("NumPy не установлен, доступен только "
+                               "исполнитель python")
+    return EXECUTORS[name]()
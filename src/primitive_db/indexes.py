@@ -0,0 +1,270 @@
+# src/primitive_db/indexes.py
+
+import bisect
+import math
+from itertools import chain, groupby
+
+from .columnar import PRIMARY_KEY
+from .errors import ProgrammingError, TableNotFoundError
+from .metrics import count
+from .storage import table_signature
+from .utils import INDEXES_KEY, SERVICE_KEYS
+
+
+class HashIndex:
+    kind = "hash"
+
+    def __init__(self, column, column_type):
+        self.column = column
+        self.column_type = column_type
+        self.entries = {}
+
+    def build(self, pairs):
+        self.entries = {}
+        for record_id, value in pairs:
+            self.add(record_id, value)
+
+    def add(self, record_id, value):
+        # NULL не попадает в индекс: условия на значение его не находят.
+        if value is not None:
+            self.entries.setdefault(value, set()).add(record_id)
+
+    def remove(self, record_id, value):
+        ids = self.entries.get(value)
+        if ids is not None:
+            ids.discard(record_id)
+            if not ids:
+                del self.entries[value]
+
+    def lookup(self, value):
+        return self.entries.get(value, set())
+
+
+class SortedIndex:
+    kind = "sorted"
+
+    def __init__(self, column, column_type):
+        self.column = column
+        self.column_type = column_type
+        self.keys = []
+
+    def build(self, pairs):
+        self.keys = sorted((value, record_id) for record_id, value in pairs
+                           if value is not None)
+
+    def add(self, record_id, value):
+        if value is not None:
+            bisect.insort(self.keys, (value, record_id))
+
+    def remove(self, record_id, value):
+        if value is None:
+            return
+        position = bisect.bisect_left(self.keys, (value, record_id))
+        if position < len(self.keys) and self.keys[position] == (value, record_id):
+            del self.keys[position]
+
+    def lookup(self, value):
+        return set(self.range(value, value))
+
+    def descending(self):
+        # ID по убыванию значения; при равных значениях - по возрастанию ID,
+        # как при сортировке в core.order.
+        for _, group in groupby(reversed(self.keys), key=lambda key: key[0]):
+            for _, record_id in reversed(list(group)):
+                yield record_id
+
+    def range(self, low=None, high=None, low_inclusive=True, high_inclusive=True):
+        # (значение, inf) больше любой пары с этим значением: так находится
+        # граница сразу за всеми записями с равным ключом.
+        keys = self.keys
+        start = 0
+        if low is not None:
+            start = bisect.bisect_left(keys, (low,)) if low_inclusive else \
+                bisect.bisect_right(keys, (low, math.inf))
+        end = len(keys)
+        if high is not None:
+            end = bisect.bisect_right(keys, (high, math.inf)) if high_inclusive else \
+                bisect.bisect_left(keys, (high,))
+        return [record_id for _, record_id in keys[start:end]]
+
+
+INDEX_KINDS = {"hash": HashIndex, "sorted": SortedIndex}
+
+
+def get_index_defs(metadata, table_name):
+    return metadata.get(INDEXES_KEY, {}).get(table_name, {})
+
+
+def create_index(metadata, table_name, column, kind="hash"):
+    if table_name not in metadata or table_name in SERVICE_KEYS:
+        raise TableNotFoundError(f"Таблица '{table_name}' не существует")
+    if column not in metadata[table_name]:
+        raise ProgrammingError(f"Столбец '{column}' в таблице '{table_name}' не найден")
+    if column == PRIMARY_KEY:
+        raise ProgrammingError(f"Столбец '{PRIMARY_KEY}' индексируется всегда")
+    if kind not in INDEX_KINDS:
+        raise ProgrammingError(f"Тип индекса '{kind}' не поддерживается. "
+                               f"Используйте: {', '.join(INDEX_KINDS)}")
+
+    table_indexes = metadata.setdefault(INDEXES_KEY, {}).setdefault(table_name, {})
+    if column in table_indexes:
+        raise ProgrammingError(f"Индекс по столбцу '{column}' уже существует")
+    table_indexes[column] = kind
+    return metadata
+
+
+def drop_index(metadata, table_name, column):
+    table_indexes = metadata.get(INDEXES_KEY, {}).get(table_name, {})
+    if column not in table_indexes:
+        raise ProgrammingError(f"Индекса по столбцу '{column}' в таблице "
+                               f"'{table_name}' нет")
+    del table_indexes[column]
+    if not table_indexes:
+        del metadata[INDEXES_KEY][table_name]
+    return metadata
+
+
+class TableIndexes:
+    # Индексы одной таблицы. Содержимое строится лениво при первом запросе
+    # и хранит ID записей; первичный ключ - это сам упорядоченный столбец ID.
+    def __init__(self, table_name, schema, index_defs):
+        self.table_name = table_name
+        self.definitions = dict(index_defs)
+        self.indexes = {column: INDEX_KINDS[kind](column, schema[column])
+                        for column, kind in index_defs.items()}
+        self.signature = None
+
+    def build(self, table_data, signature):
+        ids = table_data.ids.values()
+        for column, index in self.indexes.items():
+            index.build(zip(ids, table_data.columns[column].values()))
+        self.signature = signature
+
+
+def _range_arguments(constraint):
+    return {"low": constraint.get("low"), "high": constraint.get("high"),
+            "low_inclusive": constraint.get("low_inclusive", True),
+            "high_inclusive": constraint.get("high_inclusive", True)}
+
+
+class IndexRegistry:
+    def __init__(self, data_dir):
+        self.data_dir = data_dir
+        self.tables = {}
+
+    def _get(self, metadata, table_name, table_data):
+        index_defs = get_index_defs(metadata, table_name)
+        table_indexes = self.tables.get(table_name)
+
+        signature = table_signature(self.data_dir, table_name)
+        if table_indexes is None or table_indexes.definitions != index_defs or \
+                table_indexes.signature != signature:
+            table_indexes = TableIndexes(table_name, metadata[table_name], index_defs)
+            table_indexes.build(table_data, signature)
+            self.tables[table_name] = table_indexes
+        return table_indexes
+
+    def lookup(self, metadata, table_name, table_data, predicate):
+        # Планировщик: по ограничениям скомпилированного условия выбирает
+        # индекс и возвращает позиции строк-кандидатов; None - нужен полный
+        # просмотр. Условие целиком все равно проверяется на кандидатах.
+        positions = self._candidates(metadata, table_name, table_data, predicate)
+        if positions is not None:
+            count("index_hits")
+        return positions
+
+    def _candidates(self, metadata, table_name, table_data, predicate):
+        if predicate is None or not predicate.constraints:
+            return None
+        constraints = predicate.constraints
+
+        primary = constraints.get(PRIMARY_KEY, {})
+        if "eq" in primary:
+            return table_data.positions_of([primary["eq"]])
+        if "in" in primary:
+            return table_data.positions_of(primary["in"])
+
+        table_indexes = self._get(metadata, table_name, table_data)
+        for column, constraint in constraints.items():
+            index = table_indexes.indexes.get(column)
+            if index is None:
+                continue
+            if "eq" in constraint:
+                return table_data.positions_of(index.lookup(constraint["eq"]))
+            if "in" in constraint:
+                ids = set()
+                for value in constraint["in"]:
+                    ids |= index.lookup(value)
+                return table_data.positions_of(ids)
+
+        if "low" in primary or "high" in primary:
+            return table_data.id_range(**_range_arguments(primary))
+
+        for column, constraint in constraints.items():
+            index = table_indexes.indexes.get(column)
+            if isinstance(index, SortedIndex) and \
+                    ("low" in constraint or "high" in constraint):
+                return table_data.positions_of(
+                    index.range(**_range_arguments(constraint)))
+        return None
+
+    def probe(self, metadata, table_name, table_data, column):
+        # Функция значение -> позиции строк с этим значением столбца или None,
+        # если по столбцу нет индекса. ID индексирован всегда.
+        if column == PRIMARY_KEY:
+            def by_id(value):
+                position = table_data.position_of(value)
+                return [] if position is None else [position]
+            return by_id
+        index = self._get(metadata, table_name, table_data).indexes.get(column)
+        if index is None:
+            return None
+        return lambda value: table_data.positions_of(index.lookup(value))
+
+    def ordered(self, metadata, table_name, table_data, column, descending=False):
+        # Позиции всех строк в порядке отсортированного индекса по столбцу
+        # или None, если такого индекса нет. NULL в индекс не попадает:
+        # такие строки идут первыми (последними по убыванию), как в core.order.
+        index = self._get(metadata, table_name, table_data).indexes.get(column)
+        if not isinstance(index, SortedIndex):
+            return None
+        ids = index.descending() if descending else \
+            (record_id for _, record_id in index.keys)
+        positions = (table_data.position_of(record_id) for record_id in ids)
+        nulls = table_data.columns[column].nulls()
+        if not nulls:
+            return positions
+        return chain(positions, nulls) if descending else chain(nulls, positions)
+
+    def on_insert(self, table_name, row):
+        table_indexes = self.tables.get(table_name)
+        if table_indexes is None:
+            return
+        for index in table_indexes.indexes.values():
+            index.add(row[PRIMARY_KEY], row.get(index.column))
+        table_indexes.signature = table_signature(self.data_dir, table_name)
+
+    def on_update(self, table_name, updated_ids, changes, old_values):
+        table_indexes = self.tables.get(table_name)
+        if table_indexes is None:
+            return
+        for column, old_column_values in old_values.items():
+            index = table_indexes.indexes.get(column)
+            if index is None:
+                continue
+            for record_id, old_value in zip(updated_ids, old_column_values):
+                index.remove(record_id, old_value)
+                index.add(record_id, changes[column])
+        table_indexes.signature = table_signature(self.data_dir, table_name)
+
+    def on_delete(self, table_name, rows):
+        table_indexes = self.tables.get(table_name)
+        if table_indexes is None:
+            return
+        for row in rows:
+            for index in table_indexes.indexes.values():
+                index.remove(row[PRIMARY_KEY], row.get(index.column))
+        table_indexes.signature = table_signature(self.data_dir, table_name)
+
+    def invalidate(self, table_name):
+        self.tables.pop(table_name, None)
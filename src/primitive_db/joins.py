@@ -0,0 +1,145 @@
+# src/primitive_db/joins.py
+
+import re
+
+from .errors import DataError, ProgrammingError
+from .predicates import compile_where
+
+_JOIN_CONDITION = re.compile(r"^\s*([^\s=]+)\s*=\s*([^\s=]+)\s*$")
+
+
+def parse_join_condition(text):
+    # "a.x = b.y" -> ("a.x", "b.y"); таблицы сторон проверяются при выполнении.
+    match = _JOIN_CONDITION.match(text)
+    if match is None:
+        raise ProgrammingError("Ошибка: Неверное условие соединения. Используйте: "
+                               "on <таблица1>.<столбец> = <таблица2>.<столбец>")
+    return match.group(1), match.group(2)
+
+
+class JoinColumns:
+    # Имена столбцов в запросе с join: "таблица.столбец" или просто
+    # "столбец", если он есть только в одной из таблиц.
+    def __init__(self, schemas):
+        self.schemas = schemas
+
+    def resolve(self, name):
+        if "." in name:
+            table_name, column = name.split(".", 1)
+            if column in self.schemas.get(table_name, {}):
+                return table_name, column
+            raise ProgrammingError(f"Столбец '{name}' не найден")
+        tables = [table_name for table_name, schema in self.schemas.items()
+                  if name in schema]
+        if not tables:
+            raise ProgrammingError(f"Столбец '{name}' не найден")
+        if len(tables) > 1:
+            raise ProgrammingError(f"Столбец '{name}' есть в обеих таблицах, "
+                                   f"укажите таблицу: {tables[0]}.{name}")
+        return tables[0], name
+
+    def qualified(self, name):
+        return "{}.{}".format(*self.resolve(name))
+
+    def all_columns(self):
+        return [f"{table_name}.{column}" for table_name, schema in self.schemas.items()
+                for column in schema]
+
+    def combined_schema(self):
+        return {f"{table_name}.{column}": column_type
+                for table_name, schema in self.schemas.items()
+                for column, column_type in schema.items()}
+
+
+def _conjuncts(node):
+    if node is None:
+        return []
+    if node[0] == "and":
+        return _conjuncts(node[1]) + _conjuncts(node[2])
+    return [node]
+
+
+def _both(left, right):
+    return right if left is None else ("and", left, right)
+
+
+def _rename(node, rename):
+    # Копия дерева условия с переименованными столбцами.
+    kind = node[0]
+    if kind in ("and", "or"):
+        return (kind, _rename(node[1], rename), _rename(node[2], rename))
+    if kind == "not":
+        return ("not", _rename(node[1], rename))
+    if kind == "cmp":
+        return ("cmp", node[1], rename(node[2]), node[3])
+    return (kind, rename(node[1]), *node[2:])
+
+
+def _tables(node, columns):
+    kind = node[0]
+    if kind in ("and", "or"):
+        return _tables(node[1], columns) | _tables(node[2], columns)
+    if kind == "not":
+        return _tables(node[1], columns)
+    return {columns.resolve(node[2] if kind == "cmp" else node[1])[0]}
+
+
+def split_where(where, columns):
+    # Условия, соединенные через AND на верхнем уровне и касающиеся одной
+    # таблицы, проверяются на ее строках до соединения. Остальные условия
+    # компилируются по столбцам "таблица.столбец" и проверяются на
+    # соединенных строках. Возвращает ({таблица: условие}, остаток).
+    pushed = dict.fromkeys(columns.schemas)
+    residual = None
+    for node in _conjuncts(where):
+        tables = _tables(node, columns)
+        if len(tables) == 1:
+            table_name = tables.pop()
+            pushed[table_name] = _both(pushed[table_name], _rename(
+                node, lambda name: columns.resolve(name)[1]))
+        else:
+            residual = _both(residual, _rename(node, columns.qualified))
+    return pushed, compile_where(residual, columns.combined_schema())
+
+
+def check_join_types(columns, left, right):
+    left_type = columns.schemas[left[0]][left[1]]
+    right_type = columns.schemas[right[0]][right[1]]
+    if left_type != right_type:
+        raise DataError(f"Нельзя соединить столбцы разных типов: "
+                        f"{'.'.join(left)} ({left_type}) и "
+                        f"{'.'.join(right)} ({right_type})")
+
+
+def hash_join(build_table, build_positions, build_column, probe_table,
+              probe_positions, probe_column):
+    # Хеш-соединение: по строкам меньшей стороны строится словарь
+    # значение -> позиции, строки большей стороны проверяются по нему
+    # потоком. Выдает пары (позиция build, позиция probe).
+    get = build_table.columns[build_column].get
+    hashed = {}
+    for position in build_positions:
+        value = get(position)
+        if value is not None:
+            hashed.setdefault(value, []).append(position)
+
+    get = probe_table.columns[probe_column].get
+    for position in probe_positions:
+        for match in hashed.get(get(position), ()):
+            yield match, position
+
+
+def index_join(outer_table, outer_positions, outer_column, lookup, inner_filter=None):
+    # Соединение вложенными циклами по индексу: для каждой строки внешней
+    # стороны строки внутренней находятся поиском в индексе lookup(значение).
+    # inner_filter проверяет на найденных строках условие внутренней стороны.
+    get = outer_table.columns[outer_column].get
+    for position in outer_positions:
+        value = get(position)
+        if value is None:
+            continue
+        matches = lookup(value)
+        if matches and inner_filter is not None:
+            matches = inner_filter(matches)
+        for match in matches:
+            yield position, match
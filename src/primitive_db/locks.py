@@ -0,0 +1,91 @@
+# src/primitive_db/locks.py
+
+import contextlib
+import os
+import threading
+
+from .errors import OperationalError
+from .utils import METADATA
+
+try:
+    import fcntl
+except ImportError:  # Windows: блокировки flock недоступны, процессы не согласуются
+    fcntl = None
+
+LOCK_EXT = ".lock"
+
+# Блокировки, которые держит текущий поток: путь -> [дескриптор, exclusive,
+# счетчик]. У каждого потока свои дескрипторы, а flock на разных открытых
+# файлах исключает друг друга и внутри одного процесса: потоки с разными
+# соединениями с одной базой согласуются так же, как разные процессы.
+_local = threading.local()
+
+
+def _held():
+    held = getattr(_local, "held", None)
+    if held is None:
+        held = _local.held = {}
+    return held
+
+
+def lock_path(data_dir, name):
+    return data_dir.file(f"{name}{LOCK_EXT}")
+
+
+@contextlib.contextmanager
+def file_lock(data_dir, name, exclusive=True):
+    # Блокировка fcntl.flock на файле data/<name>.lock: exclusive - для записи,
+    # shared - для чтения. Блокируется отдельный файл, а не файл данных: файлы
+    # таблиц атомарно заменяются при сжатии. Повторный вход в том же потоке
+    # только увеличивает счетчик. Повысить shared до exclusive нельзя: flock
+    # делает это не атомарно, отпуская блокировку, и другой процесс мог бы
+    # успеть изменить защищенные ею файлы. Такую блокировку берут сразу
+    # как exclusive.
+    if fcntl is None:
+        yield
+        return
+    path = lock_path(data_dir, name)
+    held_locks = _held()
+    held = held_locks.get(path)
+    if held is None:
+        data_dir.ensure()
+        fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+        except BaseException:
+            os.close(fd)
+            raise
+        held = held_locks[path] = [fd, exclusive, 0]
+    elif exclusive and not held[1]:
+        raise OperationalError(f"Блокировка '{name}' удерживается для чтения, "
+                               f"повысить ее до записи нельзя")
+    held[2] += 1
+    try:
+        yield
+    finally:
+        held[2] -= 1
+        if not held[2]:
+            del held_locks[path]
+            fcntl.flock(held[0], fcntl.LOCK_UN)
+            os.close(held[0])
+
+
+def table_lock(data_dir, table_name, exclusive=True):
+    # Запись в файлы таблицы: лог, сегменты, старый формат .json.
+    return file_lock(data_dir, table_name, exclusive)
+
+
+def metadata_lock(data_dir, exclusive=True):
+    # db_meta.json и журнал операций wal.jsonl. Порядок захвата во всех
+    # процессах: сначала эта блокировка, затем блокировки таблиц по имени.
+    return file_lock(data_dir, METADATA, exclusive)
+
+
+@contextlib.contextmanager
+def table_locks(data_dir, table_names):
+    # Блокировки нескольких таблиц в порядке имен: так два процесса не могут
+    # ждать друг друга по кругу.
+    with contextlib.ExitStack() as stack:
+        for table_name in sorted(table_names):
+            stack.enter_context(table_lock(data_dir, table_name))
+        yield
@@ -1,7 +1,79 @@
 #!/usr/bin/env python3
 
-from .engine import run
+import argparse
+import sys
 
+from .decorators import set_auto_confirm
+from .engine import run, run_batch
+from .server import serve
+from .utils import DATA_DIR
 
-def main():
-    run()
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(
+        prog="database",
+        description="Примитивная база данных. Без аргументов запускается "
+                    "интерактивный режим, database serve --help - режим сервера.")
+    parser.add_argument("-f", "--file", metavar="SCRIPT",
+                        help="выполнить команды из файла (- читает stdin)")
+    parser.add_argument("-y", "--yes", action="store_true",
+                        help="подтверждать удаление без вопроса")
+    parser.add_argument("-q", "--quiet", action="store_true",
+                        help="не выводить результаты команд (ошибки идут в stderr)")
+    parser.add_argument("-e", "--stop-on-error", action="store_true",
+                        help="остановить пакет на первой команде с ошибкой")
+    return parser.parse_args(argv)
+
+
+def parse_serve_args(argv):
+    parser = argparse.ArgumentParser(
+        prog="database serve",
+        description="Сервер: таблицы остаются в памяти между запросами клиентов.")
+    address = parser.add_mutually_exclusive_group(required=True)
+    address.add_argument("--socket", metavar="PATH", help="путь Unix-сокета")
+    address.add_argument("--port", type=int, metavar="N",
+                         help="TCP-порт (0 - любой свободный)")
+    parser.add_argument("--host", default="127.0.0.1",
+                        help="адрес для --port (по умолчанию 127.0.0.1)")
+    parser.add_argument("--data", default=DATA_DIR, metavar="DIR",
+                        help=f"каталог базы (по умолчанию {DATA_DIR})")
+    parser.add_argument("--workers", type=int, default=1, metavar="N",
+                        help="процессов для просмотра больших таблиц")
+    return parser.parse_args(argv)
+
+
+def run_serve(argv):
+    args = parse_serve_args(argv)
+    try:
+        serve(args.data, args.socket, args.host, args.port, args.workers)
+    except (ValueError, OSError) as e:
+        print(f"Ошибка: {e}")
+        sys.exit(1)
+
+
+def main(argv=None):
+    if argv is None:
+        argv = sys.argv[1:]
+    if argv and argv[0] == "serve":
+        run_serve(argv[1:])
+        return
+
+    args = parse_args(argv)
+
+    if args.file is None:
+        if args.yes:
+            set_auto_confirm(True)
+        run()
+        return
+
+    # В пакетном режиме подтверждения не запрашиваются: без --yes
+    # удаление таблиц и записей отменяется.
+    set_auto_confirm(args.yes)
+    if args.file == "-":
+        sys.exit(run_batch(sys.stdin, args.quiet, args.stop_on_error))
+    try:
+        with open(args.file, encoding="utf-8") as f:
+            sys.exit(run_batch(f, args.quiet, args.stop_on_error))
+    except OSError as e:
+        print(f"Ошибка: Не удалось открыть файл '{args.file}': {e.strerror}")
+        sys.exit(1)
@@ -0,0 +1,194 @@
+# src/primitive_db/metrics.py
+
+import contextlib
+import json
+import os
+import sys
+import threading
+import time
+
+# Замеры выполнения команд. Пока замер не включен, stage() возвращает
+# готовый пустой контекст, а count() только проверяет, есть ли текущий
+# замер, поэтому точки замера в коде почти ничего не стоят. Текущий замер
+# свой у каждого потока: соединения из разных потоков не пишут в чужой.
+_NULL = contextlib.nullcontext()
+
+
+class _State(threading.local):
+    profile = None
+
+
+_state = _State()
+
+STAGE_TITLES = {
+    "parse": "Разбор команды",
+    "load": "Чтение таблицы",
+    "filter": "Проверка условия",
+    "aggregate": "Агрегаты",
+    "sort": "Сортировка",
+    "render": "Вывод результата",
+    "save": "Запись на диск",
+}
+COUNTER_TITLES = {
+    "rows_loaded": "Строк прочитано с диска",
+    "rows_scanned": "Строк проверено условием",
+    "rows_returned": "Строк в результате",
+    "bytes_read": "Байт прочитано",
+    "bytes_written": "Байт записано",
+    "cache_hits": "Попаданий в кеш запросов",
+    "cache_misses": "Промахов кеша запросов",
+    "index_hits": "Поисков по индексу",
+    "statement_cache_hits": "Разборов из кеша команд",
+}
+
+
+class Profile:
+    # Замер одной команды: собственное время этапов в секундах и счетчики.
+    def __init__(self, kind):
+        self.kind = kind
+        self.stages = {}
+        self.counters = {}
+        self.total = 0.0
+        # Открытые этапы: [имя, начало, время вложенных этапов].
+        self.open = []
+
+    def to_dict(self):
+        return {"kind": self.kind, "total": self.total, "stages": dict(self.stages),
+                "counters": dict(self.counters)}
+
+
+def current():
+    return _state.profile
+
+
+def stage(name):
+    profile = _state.profile
+    if profile is None:
+        return _NULL
+    return _stage(profile, name)
+
+
+@contextlib.contextmanager
+def _stage(profile, name):
+    # Время вложенного этапа (чтение таблицы внутри проверки условия)
+    # не входит во время внешнего: сумма этапов не больше общего времени.
+    frame = [name, time.perf_counter(), 0.0]
+    profile.open.append(frame)
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - frame[1]
+        profile.open.pop()
+        profile.stages[name] = profile.stages.get(name, 0.0) + elapsed - frame[2]
+        if profile.open:
+            profile.open[-1][2] += elapsed
+
+
+def count(name, value=1):
+    profile = _state.profile
+    if profile is not None:
+        profile.counters[name] = profile.counters.get(name, 0) + value
+
+
+def count_file(name, path):
+    # Размер прочитанного или записанного файла: stat только во время замера.
+    if _state.profile is not None:
+        count(name, os.path.getsize(path))
+
+
+def counted(rows, name="rows_returned"):
+    # Подсчет строк результата, который выдается лениво.
+    profile = _state.profile
+    if profile is None:
+        return rows
+    return _count_rows(rows, profile, name)
+
+
+def _count_rows(rows, profile, name):
+    for row in rows:
+        profile.counters[name] = profile.counters.get(name, 0) + 1
+        yield row
+
+
+@contextlib.contextmanager
+def profiling(profile):
+    # Замер команды целиком: внутри блока точки замера пишут в profile.
+    previous = _state.profile
+    _state.profile = profile
+    started = time.perf_counter()
+    try:
+        yield profile
+    finally:
+        profile.total += time.perf_counter() - started
+        _state.profile = previous
+
+
+class Metrics:
+    # Сводная статистика команд соединения по видам (select, insert, ...).
+    # collect - копить статистику для команды stats, path - дописывать
+    # замер каждой команды строкой JSON в файл, timing - печатать время
+    # команды в stderr. Пока все выключено, команды не замеряются.
+    def __init__(self):
+        self.collect = False
+        self.timing = False
+        self.path = None
+        self.file = None
+        self.kinds = {}
+
+    @property
+    def enabled(self):
+        return self.collect or self.timing or self.file is not None
+
+    def measure(self, kind=None):
+        # Замер команды, если он включен и команда не внутри другого замера
+        # (например, select внутри команды консоли, которая выводит результат).
+        if not self.enabled or _state.profile is not None:
+            return _NULL
+        return self._measure(kind)
+
+    @contextlib.contextmanager
+    def _measure(self, kind):
+        profile = Profile(kind)
+        with profiling(profile):
+            yield profile
+        self.record(profile)
+
+    def record(self, profile):
+        if self.collect:
+            totals = self.kinds.setdefault(profile.kind or "other", {
+                "count": 0, "total": 0.0, "max": 0.0, "stages": {}, "counters": {}})
+            totals["count"] += 1
+            totals["total"] += profile.total
+            totals["max"] = max(totals["max"], profile.total)
+            for name, seconds in profile.stages.items():
+                totals["stages"][name] = totals["stages"].get(name, 0.0) + seconds
+            for name, value in profile.counters.items():
+                totals["counters"][name] = totals["counters"].get(name, 0) + value
+        if self.file is not None:
+            self.file.write(json.dumps(dict(profile.to_dict(), time=time.time()),
+                                       ensure_ascii=False) + "\n")
+        if self.timing:
+            stages = ", ".join(f"{name} {seconds * 1000:.3f}"
+                               for name, seconds in profile.stages.items())
+            print(f"Время {profile.kind}: {profile.total * 1000:.3f} мс"
+                  + (f" ({stages})" if stages else ""), file=sys.stderr)
+
+    def open_file(self, path):
+        # None - перестать писать замеры в файл.
+        self.close()
+        if path is not None:
+            self.file = open(path, "a", encoding="utf-8", buffering=1)
+        self.path = path
+
+    def stats(self):
+        return {kind: dict(totals, stages=dict(totals["stages"]),
+                           counters=dict(totals["counters"]))
+                for kind, totals in self.kinds.items()}
+
+    def reset(self):
+        self.kinds = {}
+
+    def close(self):
+        if self.file is not None:
+            self.file.close()
+            self.file = None
@@ -0,0 +1,101 @@
+# src/primitive_db/output.py
+
+import json
+from itertools import islice
+
+from prettytable import PrettyTable
+
+from .errors import ProgrammingError
+
+# Строки результата выводятся порциями: первая порция появляется на экране,
+# не дожидаясь конца просмотра таблицы.
+OUTPUT_CHUNK_ROWS = 1000
+
+
+def _chunks(rows, size=OUTPUT_CHUNK_ROWS):
+    rows = iter(rows)
+    chunk = list(islice(rows, size))
+    while chunk:
+        yield chunk
+        chunk = list(islice(rows, size))
+
+
+def _shown(row):
+    # Пустое значение (NULL) выводится словом NULL, а не None.
+    if None not in row:
+        return row
+    return ["NULL" if value is None else value for value in row]
+
+
+def _widths(border):
+    # Ширина содержимого столбцов по линии рамки "+----+-------+".
+    return [len(segment) - 2 for segment in border.split("+")[1:-1]]
+
+
+def write_table(out, field_names, rows):
+    # Таблица PrettyTable по порциям. Ширина столбцов берется из предыдущих
+    # порций и только растет, поэтому столбцы порций совпадают, пока не
+    # встретится более длинное значение; тогда выводится новая линия рамки.
+    widths = None
+    border = None
+    count = 0
+    for chunk in _chunks(rows):
+        table = PrettyTable()
+        table.field_names = field_names
+        table.header = widths is None
+        if widths is not None:
+            table.min_width = dict(zip(field_names, widths))
+        table.add_rows([_shown(row) for row in chunk])
+        lines = table.get_string().split("\n")
+        if border is not None and lines[0] == border:
+            lines = lines[1:]
+        border = lines[-1]
+        widths = _widths(border)
+        out.write("\n".join(lines[:-1]) + "\n")
+        count += len(chunk)
+    if border is None:
+        # Пустой результат: только заголовок.
+        table = PrettyTable()
+        table.field_names = field_names
+        out.write(table.get_string() + "\n")
+    else:
+        out.write(border + "\n")
+    return count
+
+
+def _tsv_value(value):
+    if value is None:
+        return "\\N"
+    return str(value).replace("\\", "\\\\").replace("\t", "\\t").replace("\n", "\\n")
+
+
+def write_tsv(out, field_names, rows):
+    # Заголовок и строки через табуляцию, без рамок: для передачи в другие
+    # программы. Табуляции и переводы строк в значениях экранируются,
+    # NULL выводится как \N.
+    out.write("\t".join(field_names) + "\n")
+    count = 0
+    for chunk in _chunks(rows):
+        out.writelines("\t".join(map(_tsv_value, row)) + "\n" for row in chunk)
+        count += len(chunk)
+    return count
+
+
+def write_jsonl(out, field_names, rows):
+    # Одна запись JSON на строку, как в файлах экспорта .jsonl.
+    count = 0
+    for chunk in _chunks(rows):
+        out.writelines(json.dumps(dict(zip(field_names, row)), ensure_ascii=False)
+                       + "\n" for row in chunk)
+        count += len(chunk)
+    return count
+
+
+OUTPUT_FORMATS = {"table": write_table, "tsv": write_tsv, "jsonl": write_jsonl}
+
+
+def get_writer(name):
+    if name not in OUTPUT_FORMATS:
+        raise ProgrammingError(f"Формат вывода '{name}' не поддерживается. "
+                               f"Используйте: {', '.join(OUTPUT_FORMATS)}")
+    return OUTPUT_FORMATS[name]
@@ -0,0 +1,122 @@
+# src/primitive_db/parallel.py
+
+import os
+from array import array
+from concurrent.futures import ProcessPoolExecutor
+
+from .aggregates import Aggregate, finish_groups, merge_states, partial_states
+from .errors import ProgrammingError
+from .execution import get_executor
+from .predicates import compile_where
+
+# Меньшие таблицы (или наборы строк-кандидатов) просматриваются в одном
+# процессе: передача столбцов в другие процессы дороже самой проверки.
+PARALLEL_MIN_ROWS = 200000
+
+
+def _parts(positions, size, count):
+    # Делит строки на count непрерывных диапазонов. Возвращает тройки
+    # (начало, конец, позиции внутри диапазона от его начала или None,
+    # если нужны все строки диапазона).
+    if positions is None:
+        step = -(-size // count)
+        return [(start, min(start + step, size), None)
+                for start in range(0, size, step)]
+    positions = list(positions)
+    step = -(-len(positions) // count)
+    parts = []
+    for index in range(0, len(positions), step):
+        # Позиции могут идти не по возрастанию (в порядке индекса).
+        chunk = positions[index:index + step]
+        start = min(chunk)
+        parts.append((start, max(chunk) + 1, [position - start for position in chunk]))
+    return parts
+
+
+def get_workers(value):
+    # Число процессов из команды set parallelism: целое число или auto.
+    if value == "auto":
+        return os.cpu_count() or 1
+    if not str(value).isdigit() or int(value) < 1:
+        raise ProgrammingError("parallelism принимает auto или целое число "
+                               "процессов не меньше 1")
+    return int(value)
+
+
+# Задачи для процессов пула. Им передается часть таблицы и исходное дерево
+# условия: скомпилированные условия содержат замыкания и не сериализуются.
+
+def _filter_part(executor_name, part, where, start, positions):
+    predicate = compile_where(where, part.schema)
+    matched = get_executor(executor_name).filter(part, predicate, positions)
+    return array("q", (start + position for position in matched))
+
+
+def _aggregate_part(part, positions, items, group_by):
+    if positions is None:
+        positions = range(len(part))
+    return partial_states(part, positions, items, group_by)
+
+
+class ParallelExecutor:
+    # Обертка над исполнителем python или numpy. Условия WHERE и агрегаты на
+    # больших наборах строк вычисляются в пуле процессов: строки делятся на
+    # диапазоны по числу процессов, результаты объединяются в порядке ID.
+    # SET и небольшие наборы строк выполняет исходный исполнитель.
+    def __init__(self, executor, workers, min_rows=PARALLEL_MIN_ROWS):
+        self.executor = executor
+        self.workers = workers
+        self.min_rows = min_rows
+        self.pool = None
+
+    @property
+    def name(self):
+        return self.executor.name
+
+    def _parallel(self, table, positions):
+        size = len(table) if positions is None else len(positions)
+        return self.workers > 1 and size >= self.min_rows
+
+    def _submit(self, function, *args):
+        if self.pool is None:
+            self.pool = ProcessPoolExecutor(max_workers=self.workers)
+        return self.pool.submit(function, *args)
+
+    def filter(self, table, predicate, positions=None):
+        if predicate is None or not self._parallel(table, positions):
+            return self.executor.filter(table, predicate, positions)
+        if isinstance(positions, range) and positions == range(len(table)):
+            positions = None
+        futures = [self._submit(_filter_part, self.executor.name,
+                                table.slice(start, stop, predicate.columns),
+                                predicate.where, start, part_positions)
+                   for start, stop, part_positions in
+                   _parts(positions, len(table), self.workers)]
+        matched = []
+        for future in futures:
+            matched.extend(future.result())
+        return matched
+
+    def set_values(self, table, positions, changes):
+        return self.executor.set_values(table, positions, changes)
+
+    def aggregate(self, table, positions, items, group_by):
+        if not self._parallel(table, positions):
+            return self.executor.aggregate(table, positions, items, group_by)
+        names = {*group_by, *(item.column for item in items
+                              if isinstance(item, Aggregate) and item.column)}
+        if isinstance(positions, range) and positions == range(len(table)):
+            positions = None
+        futures = [self._submit(_aggregate_part, table.slice(start, stop, names),
+                                part_positions, items, group_by)
+                   for start, stop, part_positions in
+                   _parts(positions, len(table), self.workers)]
+        groups = {}
+        for future in futures:
+            merge_states(items, groups, future.result())
+        return finish_groups(table, groups, items, group_by)
+
+    def close(self):
+        if self.pool is not None:
+            self.pool.shutdown()
+            self.pool = None
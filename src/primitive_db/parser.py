@@ -1,22 +1,181 @@
 # src/primitive_db/parser.py
 
-def parse_where_clause(where_condition):
-    if not where_condition:
-        return None
+import re
+
+from .errors import ProgrammingError
+
+_TOKEN_RE = re.compile(r"""
+    \s*(?:
+        (?P<string>"(?:[^"\\]|\\.)*"|'(?:[^'\\]|\\.)*')
+      | (?P<op><=|>=|!=|<>|=|<|>)
+      | (?P<punct>[(),])
+      | (?P<word>[^\s(),=<>!'"]+)
+    )""", re.VERBOSE)
+
+KEYWORDS = {"and", "or", "not", "in", "between", "like", "is", "null"}
+
+
+class Placeholder:
+    # Параметр подготовленного запроса (?), значение подставляется при execute.
+    def __repr__(self):
+        return "?"
+
+
+PLACEHOLDER = Placeholder()
+
 
-    condition = where_condition.strip()
+class Default:
+    # Значение по умолчанию столбца (default в values и set).
+    def __repr__(self):
+        return "DEFAULT"
 
-    if "=" not in condition:
-        raise ValueError("Некорректный формат условия WHERE. Используйте: "
-                            "столбец = значение")
 
-    parts = condition.split("=", 1)
-    column = parts[0].strip()
-    value_str = parts[1].strip()
+DEFAULT = Default()
+
+
+def tokenize(text):
+    tokens = []
+    position = 0
+    text = text.rstrip()
+    while position < len(text):
+        match = _TOKEN_RE.match(text, position)
+        if match is None or match.end() == position:
+            raise ProgrammingError(f"Некорректный символ в условии: "
+                                   f"'{text[position:].strip()[:10]}'")
+        position = match.end()
+        kind = match.lastgroup
+        value = match.group(kind)
+        if kind == "string":
+            tokens.append(("literal", value[1:-1].replace("\\" + value[0], value[0])))
+        elif kind == "word" and value.lower() in KEYWORDS:
+            tokens.append(("keyword", value.lower()))
+        elif kind == "op":
+            tokens.append(("op", "!=" if value == "<>" else value))
+        else:
+            tokens.append((kind, value))
+    return tokens
+
+
+class _WhereParser:
+    # Рекурсивный спуск по грамматике:
+    #   expr := and_expr (OR and_expr)*
+    #   and_expr := not_expr (AND not_expr)*
+    #   not_expr := NOT not_expr | '(' expr ')' | condition
+    #   condition := column (op literal | [NOT] IN (literal, ...)
+    #                | [NOT] BETWEEN literal AND literal | [NOT] LIKE literal
+    #                | IS [NOT] NULL)
+    def __init__(self, tokens):
+        self.tokens = tokens
+        self.position = 0
+
+    def peek(self):
+        if self.position < len(self.tokens):
+            return self.tokens[self.position]
+        return (None, None)
+
+    def take(self):
+        token = self.peek()
+        self.position += 1
+        return token
+
+    def accept(self, kind, value=None):
+        token_kind, token_value = self.peek()
+        if token_kind == kind and (value is None or token_value == value):
+            self.position += 1
+            return True
+        return False
 
-    value = parse_value(value_str)
+    def expect(self, kind, value=None):
+        if not self.accept(kind, value):
+            found = self.peek()[1]
+            expected = value or kind
+            found = found if found is not None else 'конец'
+            raise ProgrammingError(f"Ожидается '{expected}' в условии WHERE, "
+                                   f"получено '{found}'")
 
-    return {column: value}
+    def parse(self):
+        node = self.parse_or()
+        if self.position < len(self.tokens):
+            raise ProgrammingError(f"Лишний фрагмент в условии WHERE: "
+                                   f"'{self.peek()[1]}'")
+        return node
+
+    def parse_or(self):
+        node = self.parse_and()
+        while self.accept("keyword", "or"):
+            node = ("or", node, self.parse_and())
+        return node
+
+    def parse_and(self):
+        node = self.parse_not()
+        while self.accept("keyword", "and"):
+            node = ("and", node, self.parse_not())
+        return node
+
+    def parse_not(self):
+        if self.accept("keyword", "not"):
+            return ("not", self.parse_not())
+        if self.accept("punct", "("):
+            node = self.parse_or()
+            self.expect("punct", ")")
+            return node
+        return self.parse_condition()
+
+    def parse_literal(self):
+        kind, value = self.take()
+        if kind == "literal":
+            return value
+        if kind == "word":
+            return parse_value(value)
+        raise ProgrammingError(f"Ожидается значение в условии WHERE, получено "
+                               f"'{value if value is not None else 'конец'}'")
+
+    def parse_condition(self):
+        kind, column = self.take()
+        if kind != "word":
+            raise ProgrammingError(f"Ожидается имя столбца в условии WHERE, получено "
+                                   f"'{column if column is not None else 'конец'}'")
+
+        kind, value = self.peek()
+        if kind == "op":
+            self.take()
+            return ("cmp", value, column, self.parse_literal())
+
+        if self.accept("keyword", "is"):
+            negated = self.accept("keyword", "not")
+            self.expect("keyword", "null")
+            node = ("null", column)
+            return ("not", node) if negated else node
+
+        negated = self.accept("keyword", "not")
+        if self.accept("keyword", "in"):
+            self.expect("punct", "(")
+            values = [self.parse_literal()]
+            while self.accept("punct", ","):
+                values.append(self.parse_literal())
+            self.expect("punct", ")")
+            node = ("in", column, values)
+        elif self.accept("keyword", "between"):
+            low = self.parse_literal()
+            self.expect("keyword", "and")
+            node = ("between", column, low, self.parse_literal())
+        elif self.accept("keyword", "like"):
+            node = ("like", column, self.parse_literal())
+        else:
+            raise ProgrammingError("Некорректный формат условия WHERE. Используйте: "
+                                   "столбец = значение")
+        return ("not", node) if negated else node
+
+
+def parse_where_clause(where_condition):
+    # Разбирает условие WHERE в дерево выражения из кортежей:
+    # ("cmp", op, столбец, значение), ("in", столбец, [значения]),
+    # ("between", столбец, от, до), ("like", столбец, шаблон), ("null", столбец),
+    # ("and", a, b), ("or", a, b), ("not", a).
+    if not where_condition or not where_condition.strip():
+        return None
+
+    return _WhereParser(tokenize(where_condition)).parse()
 
 
 def parse_set_clause(set_condition):
@@ -29,19 +188,22 @@ def parse_set_clause(set_condition):
     for assignment in assignments:
         assignment = assignment.strip()
         if "=" not in assignment:
-            raise ValueError(f"Некорректный формат присваивания: {assignment}")
+            raise ProgrammingError(f"Некорректный формат присваивания: {assignment}")
 
         parts = assignment.split("=", 1)
         column = parts[0].strip()
         value_str = parts[1].strip()
 
-        value = parse_value(value_str)
+        value = _parse_assigned(value_str)
         set_dict[column] = value
 
     return set_dict
 
 
 def parse_value(value_str):
+    if value_str == "?":
+        return PLACEHOLDER
+
     if (value_str.startswith('"') and value_str.endswith('"')) or \
             (value_str.startswith("'") and value_str.endswith("'")):
         return value_str[1:-1]
@@ -50,6 +212,8 @@ def parse_value(value_str):
         return True
     elif value_str.lower() == "false":
         return False
+    elif value_str.lower() == "null":
+        return None
 
     try:
         return int(value_str)
@@ -62,6 +226,13 @@ def parse_value(value_str):
     return value_str
 
 
+def _parse_assigned(value_str):
+    # Значение в values и set: кроме литералов допускается default.
+    if value_str.lower() == "default":
+        return DEFAULT
+    return parse_value(value_str)
+
+
 def parse_values(values_str):
     values_str = values_str.strip()
     if values_str.startswith("(") and values_str.endswith(")"):
@@ -89,4 +260,4 @@ def parse_values(values_str):
     if current_value:
         values.append(current_value.strip())
 
-    return [parse_value(val) for val in values]
\ No newline at end of file
+    return [_parse_assigned(val) for val in values]
\ No newline at end of file
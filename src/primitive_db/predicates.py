@@ -0,0 +1,291 @@
+# src/primitive_db/predicates.py
+
+import operator
+import re
+
+from .errors import DataError, ProgrammingError
+
+COMPARISONS = {
+    "=": operator.eq,
+    "!=": operator.ne,
+    "<": operator.lt,
+    "<=": operator.le,
+    ">": operator.gt,
+    ">=": operator.ge,
+}
+# Сравнение "значение_столбца op литерал" через метод литерала:
+# x < 5 равносильно (5).__gt__(x), что работает быстрее лямбды в map().
+_REFLECTED = {"=": "__eq__", "!=": "__ne__", "<": "__gt__", "<=": "__ge__",
+              ">": "__lt__", ">=": "__le__"}
+# Отрицание сравнения: NOT (x < 5) равносильно x >= 5 для непустых x.
+_NEGATED = {"=": "!=", "!=": "=", "<": ">=", "<=": ">", ">": "<=", ">=": "<"}
+
+NUMERIC_TYPES = ("integer", "float")
+_LITERAL_TYPES = {"integer": "целое число", "float": "число",
+                  "boolean": "true/false", "text": "строка"}
+
+
+def _check_literal(value, column, column_type):
+    if value is None:
+        raise DataError(f"Сравнение столбца '{column}' с NULL всегда ложно. "
+                        f"Используйте: {column} IS [NOT] NULL")
+    if column_type == "integer":
+        valid = isinstance(value, int) and not isinstance(value, bool)
+    elif column_type == "float":
+        valid = isinstance(value, (int, float)) and not isinstance(value, bool)
+        value = float(value) if valid else value
+    elif column_type == "boolean":
+        valid = isinstance(value, bool)
+    else:
+        valid = isinstance(value, str)
+    if not valid:
+        raise DataError(f"Неверное значение {value!r} в условии для столбца "
+                        f"'{column}'. Ожидается {_LITERAL_TYPES[column_type]}")
+    return value
+
+
+def like_to_regex(pattern):
+    parts = []
+    for char in pattern:
+        if char == "%":
+            parts.append(".*")
+        elif char == "_":
+            parts.append(".")
+        else:
+            parts.append(re.escape(char))
+    return re.compile("".join(parts), re.DOTALL)
+
+
+class Condition:
+    # Лист выражения: проверка одного столбца. Поле test - функция от значения
+    # столбца; kind и params нужны исполнителям и выбору индекса. negated -
+    # проверка с отрицанием (NOT IN, NOT BETWEEN, NOT LIKE, IS NOT NULL):
+    # test уже учитывает отрицание, params описывают исходную проверку.
+    def __init__(self, column, column_type, kind, params, test, negated=False):
+        self.column = column
+        self.column_type = column_type
+        self.kind = kind
+        self.params = params
+        self.test = test
+        self.negated = negated
+
+
+def _negate(condition):
+    if condition.kind == "cmp":
+        op, value = condition.params
+        op = _NEGATED[op]
+        return Condition(condition.column, condition.column_type, "cmp", (op, value),
+                         getattr(value, _REFLECTED[op]))
+    test = condition.test
+    return Condition(condition.column, condition.column_type, condition.kind,
+                     condition.params, lambda value: not test(value),
+                     not condition.negated)
+
+
+def _bind(node, schema, negate=False):
+    # Проверяет столбцы и типы литералов по схеме и заменяет листья дерева
+    # на объекты Condition. NOT опускается до листьев по законам де Моргана,
+    # поэтому в дереве остаются только AND и OR. Логика трехзначная: проверка
+    # значения на NULL не выполняется ни с отрицанием, ни без него, так что
+    # NOT (a = 3) и a != 3 одинаково не находят строки с пустым a.
+    kind = node[0]
+    if kind in ("and", "or"):
+        if negate:
+            kind = "or" if kind == "and" else "and"
+        return (kind, _bind(node[1], schema, negate),
+                _bind(node[2], schema, negate))
+    if kind == "not":
+        return _bind(node[1], schema, not negate)
+    condition = _bind_condition(node, schema)
+    return _negate(condition) if negate else condition
+
+
+def _bind_condition(node, schema):
+    kind = node[0]
+
+    column = node[2] if kind == "cmp" else node[1]
+    if column not in schema:
+        raise ProgrammingError(f"Столбец '{column}' не найден")
+    column_type = schema[column]
+
+    if kind == "cmp":
+        op = node[1]
+        value = _check_literal(node[3], column, column_type)
+        test = getattr(value, _REFLECTED[op])
+        return Condition(column, column_type, "cmp", (op, value), test)
+
+    if kind == "in":
+        values = frozenset(_check_literal(value, column, column_type)
+                           for value in node[2])
+        return Condition(column, column_type, "in", (values,), values.__contains__)
+
+    if kind == "between":
+        low = _check_literal(node[2], column, column_type)
+        high = _check_literal(node[3], column, column_type)
+        return Condition(column, column_type, "between", (low, high),
+                         lambda value: low <= value <= high)
+
+    if kind == "like":
+        if column_type != "text":
+            raise ProgrammingError(f"LIKE применим только к строковым столбцам, "
+                                   f"'{column}' имеет тип {column_type}")
+        regex = like_to_regex(_check_literal(node[2], column, column_type))
+        return Condition(column, column_type, "like", (regex,),
+                         lambda value: regex.fullmatch(value) is not None)
+
+    if kind == "null":
+        return Condition(column, column_type, "null", (),
+                         lambda value: value is None)
+
+    raise ProgrammingError(f"Неизвестный узел условия: {kind}")
+
+
+def _compile_row(node):
+    # Замыкание для проверки одной записи-словаря. NULL не проходит
+    # ни одну проверку значения.
+    if isinstance(node, Condition):
+        column, test = node.column, node.test
+        if node.kind == "null":
+            return lambda row: test(row.get(column))
+        return lambda row: (value := row.get(column)) is not None and test(value)
+    kind = node[0]
+    left, right = _compile_row(node[1]), _compile_row(node[2])
+    if kind == "and":
+        return lambda row: left(row) and right(row)
+    return lambda row: left(row) or right(row)
+
+
+def _compile_columnar(node):
+    # Функция (таблица, позиции) -> позиции для столбцового исполнения.
+    # AND проверяет правую часть только на строках, прошедших левую.
+    if isinstance(node, Condition):
+        column, test = node.column, node.test
+        if node.kind == "null" and node.negated:
+            return lambda table, positions: table.columns[column].not_nulls(positions)
+        if node.kind == "null":
+            return lambda table, positions: table.columns[column].nulls(positions)
+        return lambda table, positions: table.columns[column].scan(test, positions)
+
+    kind = node[0]
+    left, right = _compile_columnar(node[1]), _compile_columnar(node[2])
+    if kind == "and":
+        def evaluate_and(table, positions):
+            matched = left(table, positions)
+            return right(table, matched) if matched else []
+        return evaluate_and
+
+    def evaluate_or(table, positions):
+        return sorted(set(left(table, positions)) | set(right(table, positions)))
+    return evaluate_or
+
+
+def _conjuncts(node):
+    if isinstance(node, tuple) and node[0] == "and":
+        return _conjuncts(node[1]) + _conjuncts(node[2])
+    return [node]
+
+
+def _constraints(node):
+    # Ограничения столбцов из условий, соединенных через AND на верхнем уровне:
+    # {"eq": значение} / {"in": значения} / {"low", "high", ...} для диапазона.
+    constraints = {}
+    for condition in _conjuncts(node):
+        if not isinstance(condition, Condition) or condition.negated:
+            continue
+        current = constraints.setdefault(condition.column, {})
+        if condition.kind == "cmp":
+            op, value = condition.params
+            if op == "=":
+                current["eq"] = value
+            elif op in (">", ">="):
+                current["low"], current["low_inclusive"] = value, op == ">="
+            elif op in ("<", "<="):
+                current["high"], current["high_inclusive"] = value, op == "<="
+        elif condition.kind == "in":
+            current["in"] = condition.params[0]
+        elif condition.kind == "between":
+            low, high = condition.params
+            current.update(low=low, low_inclusive=True, high=high,
+                           high_inclusive=True)
+    return {column: constraint for column, constraint in constraints.items()
+            if constraint}
+
+
+def _in_bounds(constraint, low, high):
+    if "eq" in constraint:
+        return low <= constraint["eq"] <= high
+    if "in" in constraint:
+        return any(low <= value <= high for value in constraint["in"])
+    if "low" in constraint:
+        value = constraint["low"]
+        if value > high or (value == high and not constraint["low_inclusive"]):
+            return False
+    if "high" in constraint:
+        value = constraint["high"]
+        if value < low or (value == low and not constraint["high_inclusive"]):
+            return False
+    return True
+
+
+def may_match(constraints, bounds):
+    # Проверка по зонной карте {столбец: (минимум, максимум)}: False, если
+    # ни одна строка с такими границами значений не подходит под условие.
+    # Столбцы без границ считаются подходящими.
+    for column, constraint in constraints.items():
+        if column in bounds and not _in_bounds(constraint, *bounds[column]):
+            return False
+    return True
+
+
+def _columns(node):
+    if isinstance(node, Condition):
+        return {node.column}
+    columns = set()
+    for child in node[1:]:
+        columns |= _columns(child)
+    return columns
+
+
+def _describe_param(param):
+    if isinstance(param, frozenset):
+        return repr(sorted(param))
+    if isinstance(param, re.Pattern):
+        return repr(param.pattern)
+    return repr(param)
+
+
+def _describe(node):
+    if isinstance(node, Condition):
+        params = ", ".join(_describe_param(param) for param in node.params)
+        described = f"{node.kind}({node.column}, {params})"
+        return f"not({described})" if node.negated else described
+    return f"{node[0]}(" + ", ".join(_describe(child) for child in node[1:]) + ")"
+
+
+class Predicate:
+    # Условие WHERE, скомпилированное один раз для схемы таблицы.
+    # matches - проверка записи-словаря, evaluate - столбцовое вычисление,
+    # columns и constraints - сведения для выбора индекса. where - исходное
+    # дерево условия: в отличие от скомпилированного его можно передать
+    # в другой процесс.
+    def __init__(self, node, schema):
+        self.where = node
+        self.node = _bind(node, schema)
+        self.matches = _compile_row(self.node)
+        self._evaluate = _compile_columnar(self.node)
+        self.columns = _columns(self.node)
+        self.constraints = _constraints(self.node)
+        self.key = _describe(self.node)
+
+    def evaluate(self, table, positions=None):
+        result = self._evaluate(table, positions)
+        return result if isinstance(result, list) else list(result)
+
+    def __str__(self):
+        return self.key
+
+
+def compile_where(where_node, schema):
+    if where_node is None:
+        return None
+    return Predicate(where_node, schema)
@@ -0,0 +1,253 @@
+# src/primitive_db/server.py
+
+import asyncio
+import contextlib
+import json
+import os
+import signal
+import socket
+import sys
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+
+from .api import connect
+from .errors import DatabaseError, ProgrammingError
+from .utils import DATA_DIR
+
+# Протокол - строки JSON, по одному объекту на строку в обе стороны.
+# Запрос:
+#   {"id": 1, "sql": "select ...", "params": [...]}  - один запрос;
+#   {"id": 2, "sql": "insert ...", "many": [[...], ...]} - executemany;
+#   {"id": 3, "call": "begin", "args": []} - метод соединения из CALLS.
+# Ответ: {"id": 1, "ok": true, "columns": [...], "rows": [[...]],
+# "rowcount": N, "lastrowid": ID}, для call - {"id": 3, "ok": true,
+# "result": ...}, при ошибке - {"id": 1, "ok": false, "error": "DataError",
+# "message": "..."}. Ответы приходят в порядке запросов одного клиента,
+# поэтому клиент может отправить несколько запросов, не дожидаясь ответов.
+CALLS = frozenset({
+    "begin", "commit", "rollback", "flush", "stats", "list_tables", "table_info",
+    "create_table", "drop_table", "create_index", "drop_index", "compact",
+    "convert", "explain_analyze",
+})
+TRANSACTION_END = frozenset({"commit", "rollback"})
+
+# Ограничение длины одной строки запроса (executemany с большим пакетом).
+MAX_REQUEST_BYTES = 64 * 1024 * 1024
+
+
+def _error(request_id, error):
+    name = type(error).__name__ if isinstance(error, DatabaseError) \
+        else DatabaseError.__name__
+    return {"id": request_id, "ok": False, "error": name, "message": str(error)}
+
+
+def _encode(response):
+    return (json.dumps(response, ensure_ascii=False, separators=(",", ":"),
+                       default=list) + "\n").encode("utf-8")
+
+
+class Session:
+    # Подключенный клиент. Транзакция соединения одна на весь сервер, поэтому
+    # пока клиент держит открытую транзакцию, запросы других клиентов ждут.
+    def __init__(self, number):
+        self.number = number
+
+
+class Server:
+    # Сервер держит одно соединение с базой: метаданные, таблицы в памяти,
+    # индексы и кеш запросов живут между запросами всех клиентов. Запросы
+    # выполняются по одному в отдельном потоке, а цикл asyncio тем временем
+    # принимает и отправляет данные других клиентов. Запись сериализована
+    # для всего сервера, а не по таблицам: соединение не рассчитано на
+    # одновременные вызовы из нескольких потоков, а из-за GIL потоки все
+    # равно не выполняли бы код на Python параллельно. Параллельная запись
+    # в разные таблицы - это несколько процессов с одной базой (блокировки
+    # берутся на каждую таблицу). Просмотр больших таблиц выполняется
+    # в пуле процессов, если задано workers > 1.
+    def __init__(self, path=DATA_DIR, workers=1):
+        self.path = path
+        self.workers = workers
+        self.connection = None
+        self.engine = None
+        self.server = None
+        self.socket_path = None
+        self.owner = None
+        self.turn = None
+        self.sessions = 0
+
+    # Выполнение в потоке базы
+
+    def _execute(self, request):
+        request_id = request.get("id")
+        try:
+            if "call" in request:
+                result = self._call(request["call"], request.get("args", []))
+                return _encode({"id": request_id, "ok": True, "result": result})
+            sql = request.get("sql")
+            if not isinstance(sql, str):
+                raise ProgrammingError("В запросе нет поля sql или call")
+            if "many" in request:
+                cursor = self.connection.executemany(sql, request["many"])
+            else:
+                cursor = self.connection.execute(sql, request.get("params", []))
+            rows = cursor.fetchall() if cursor.description is not None else None
+            return _encode({"id": request_id, "ok": True,
+                            "columns": cursor.description, "rows": rows,
+                            "rowcount": cursor.rowcount,
+                            "lastrowid": cursor.lastrowid})
+        except ValueError as e:
+            return _encode(_error(request_id, e))
+        except Exception as e:
+            traceback.print_exc(file=sys.stderr)
+            return _encode(_error(request_id, e))
+
+    def _call(self, name, args):
+        if name not in CALLS:
+            raise ProgrammingError(f"Метода '{name}' нет. Доступны: "
+                                   f"{', '.join(sorted(CALLS))}")
+        if not isinstance(args, list):
+            raise ProgrammingError("Поле args должно быть списком")
+        if name == "create_table" and len(args) > 1 and isinstance(args[1], list):
+            # В JSON нет кортежей: столбцы приходят списками [имя, тип].
+            args = [args[0], [tuple(column) if isinstance(column, list) else column
+                              for column in args[1]], *args[2:]]
+        return getattr(self.connection, name)(*args)
+
+    def _rollback(self):
+        if self.connection.in_transaction:
+            self.connection.rollback()
+
+    # Цикл asyncio
+
+    async def _run(self, function, *args):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.engine, function, *args)
+
+    async def _submit(self, session, request):
+        # Очередь на выполнение: запрос отправляется в поток базы сразу после
+        # проверки владельца транзакции, без промежуточных await, поэтому
+        # чужой begin не может вклиниться между проверкой и выполнением.
+        call = request.get("call")
+        loop = asyncio.get_running_loop()
+        async with self.turn:
+            await self.turn.wait_for(lambda: self.owner in (None, session))
+            future = loop.run_in_executor(self.engine, self._execute, request)
+        response = await future
+        if call == "begin" or call in TRANSACTION_END:
+            async with self.turn:
+                self.owner = session if self.connection.in_transaction else None
+                self.turn.notify_all()
+        return response
+
+    async def _release(self, session):
+        # Клиент отключился посреди транзакции: она отменяется.
+        async with self.turn:
+            if self.owner is not session:
+                return
+            await self._run(self._rollback)
+            self.owner = None
+            self.turn.notify_all()
+
+    async def _handle(self, reader, writer):
+        self.sessions += 1
+        session = Session(self.sessions)
+        try:
+            while True:
+                try:
+                    line = await reader.readline()
+                except (ValueError, asyncio.LimitOverrunError):
+                    writer.write(_encode(_error(None, ProgrammingError(
+                        "Слишком длинный запрос"))))
+                    break
+                if not line:
+                    break
+                if not line.strip():
+                    continue
+                try:
+                    request = json.loads(line)
+                    if not isinstance(request, dict):
+                        raise ValueError("ожидается объект JSON")
+                except ValueError as e:
+                    writer.write(_encode(_error(None, ProgrammingError(
+                        f"Неверный запрос: {e}"))))
+                    continue
+                writer.write(await self._submit(session, request))
+                await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            await self._release(session)
+            writer.close()
+            with contextlib.suppress(ConnectionError):
+                await writer.wait_closed()
+
+    async def start(self, socket_path=None, host="127.0.0.1", port=None):
+        # Порт 0 - любой свободный; адрес можно узнать через address().
+        self.engine = ThreadPoolExecutor(max_workers=1,
+                                         thread_name_prefix="primitive_db")
+        self.connection = await self._run(connect, self.path)
+        if self.workers > 1:
+            await self._run(self.connection.set_parallelism, self.workers)
+        self.turn = asyncio.Condition()
+        if socket_path is not None:
+            _remove_stale_socket(socket_path)
+            self.socket_path = socket_path
+            self.server = await asyncio.start_unix_server(
+                self._handle, socket_path, limit=MAX_REQUEST_BYTES)
+        else:
+            self.server = await asyncio.start_server(
+                self._handle, host, port or 0, limit=MAX_REQUEST_BYTES)
+        return self
+
+    def address(self):
+        return self.server.sockets[0].getsockname()
+
+    async def close(self):
+        if self.server is not None:
+            self.server.close()
+            await self.server.wait_closed()
+        if self.socket_path is not None:
+            with contextlib.suppress(OSError):
+                os.remove(self.socket_path)
+        if self.connection is not None:
+            await self._run(self.connection.close)
+        if self.engine is not None:
+            self.engine.shutdown()
+
+
+def _remove_stale_socket(socket_path):
+    # Файл сокета остается после аварийной остановки сервера. Если на нем
+    # никто не слушает, он удаляется; иначе адрес занят.
+    if not os.path.exists(socket_path):
+        return
+    probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        probe.connect(socket_path)
+    except (ConnectionRefusedError, FileNotFoundError):
+        os.remove(socket_path)
+        return
+    finally:
+        probe.close()
+    raise ProgrammingError(f"Сокет '{socket_path}' занят другим сервером")
+
+
+async def _serve(path, socket_path, host, port, workers):
+    server = await Server(path, workers).start(socket_path, host, port)
+    address = socket_path if socket_path is not None else \
+        "{}:{}".format(*server.address()[:2])
+    print(f"Сервер запущен: {address}", flush=True)
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for signum in (signal.SIGINT, signal.SIGTERM):
+        with contextlib.suppress(NotImplementedError):
+            loop.add_signal_handler(signum, stop.set)
+    try:
+        await stop.wait()
+    finally:
+        await server.close()
+    print("Сервер остановлен.")
+
+
+def serve(path=DATA_DIR, socket_path=None, host="127.0.0.1", port=None,
+          workers=1):
+    asyncio.run(_serve(path, socket_path, host, port, workers))
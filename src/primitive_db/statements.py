@@ -0,0 +1,253 @@
+# src/primitive_db/statements.py
+
+from collections import OrderedDict
+
+from .aggregates import is_aggregate, parse_select_item
+from .errors import ProgrammingError
+from .joins import parse_join_condition
+from .parser import (
+    PLACEHOLDER,
+    parse_set_clause,
+    parse_values,
+    parse_where_clause,
+)
+from .predicates import compile_where
+
+STATEMENT_CACHE_MAX_ENTRIES = 256
+
+STATEMENT_KINDS = ("insert", "select", "update", "delete")
+
+
+def _count_params(node):
+    if node is PLACEHOLDER:
+        return 1
+    if isinstance(node, (tuple, list)):
+        return sum(_count_params(child) for child in node)
+    if isinstance(node, dict):
+        return sum(_count_params(value) for value in node.values())
+    return 0
+
+
+def _bind(node, params):
+    # Подставляет параметры вместо ? в порядке их появления в тексте.
+    if node is PLACEHOLDER:
+        return next(params)
+    if isinstance(node, tuple):
+        return tuple(_bind(child, params) for child in node)
+    if isinstance(node, list):
+        return [_bind(child, params) for child in node]
+    if isinstance(node, dict):
+        return {key: _bind(value, params) for key, value in node.items()}
+    return node
+
+
+def _schema_key(schema):
+    return tuple(schema.items())
+
+
+class Statement:
+    # Разобранная команда insert/select/update/delete. Не зависит от схемы
+    # таблицы: скомпилированное условие строится при первом выполнении
+    # и хранится, пока схема не изменится.
+    def __init__(self, kind, table_name, values=None, set_clause=None, where=None,
+                 limit=None, offset=0, columns=None, order_by=None, group_by=None,
+                 join=None):
+        self.kind = kind
+        self.table_name = table_name
+        self.values = values
+        self.set_clause = set_clause
+        self.where = where
+        self.limit = limit
+        self.offset = offset
+        # columns - выбранные столбцы и агрегатные функции select (None -
+        # все столбцы), order_by - (столбец, по убыванию) или None,
+        # group_by - столбцы группировки или None.
+        self.columns = columns
+        self.order_by = order_by
+        self.group_by = group_by
+        self.aggregate = is_aggregate(columns, group_by)
+        # join - (вторая таблица, столбец слева от "=", столбец справа).
+        self.join = join
+        self.values_params = _count_params(values)
+        self.set_params = _count_params(set_clause)
+        self.where_params = _count_params(where)
+        self.param_count = self.values_params + self.set_params + self.where_params
+        self._compiled = {}
+
+    def _cached(self, name, schema, build):
+        key = (name, _schema_key(schema))
+        if key not in self._compiled:
+            self._compiled[key] = build()
+        return self._compiled[key]
+
+    def bind(self, params=()):
+        # Возвращает (values, set_clause, where) с подставленными параметрами.
+        params = list(params)
+        if len(params) != self.param_count:
+            raise ProgrammingError(f"Неверное количество параметров. Ожидается "
+                                   f"{self.param_count}, получено {len(params)}")
+        iterator = iter(params)
+        return (_bind(self.values, iterator), _bind(self.set_clause, iterator),
+                _bind(self.where, iterator))
+
+    def predicate(self, schema, where):
+        # Условие без параметров компилируется один раз на схему.
+        if self.where_params:
+            return compile_where(where, schema)
+        return self._cached("predicate", schema,
+                            lambda: compile_where(where, schema))
+
+
+def _insert(args):
+    if len(args) < 4 or args[1] != "into" or args[3] != "values":
+        raise ProgrammingError("Ошибка: Неверный формат команды INSERT. Используйте: "
+                               "insert into <таблица> values (<значения>)")
+    return Statement("insert", args[2], values=parse_values(" ".join(args[4:])))
+
+
+def _count(word, clause):
+    if not word.isdigit():
+        raise ProgrammingError(f"Ошибка: {clause} принимает неотрицательное целое "
+                               f"число, получено {word}")
+    return int(word)
+
+
+def _pagination(args):
+    # Хвост "limit N offset M" (обе части необязательны) в конце команды.
+    limit, offset = None, 0
+    if len(args) >= 2 and args[-2] == "offset":
+        offset = _count(args[-1], "OFFSET")
+        args = args[:-2]
+    if len(args) >= 2 and args[-2] == "limit":
+        limit = _count(args[-1], "LIMIT")
+        args = args[:-2]
+    return args, limit, offset
+
+
+SORT_DIRECTIONS = ("asc", "desc")
+
+
+def _order_by(args):
+    # Хвост "order by <столбец> [asc|desc]" перед LIMIT и OFFSET.
+    if len(args) >= 4 and args[-4:-2] == ["order", "by"] and \
+            args[-1] in SORT_DIRECTIONS:
+        return args[:-4], (args[-2], args[-1] == "desc")
+    if len(args) >= 3 and args[-3:-1] == ["order", "by"]:
+        return args[:-3], (args[-1], False)
+    return args, None
+
+
+def _column_list(words):
+    text = " ".join(words)
+    columns = tuple(name.strip() for name in text.split(","))
+    if not all(columns):
+        raise ProgrammingError(f"Ошибка: Неверный список столбцов: {text}")
+    return columns
+
+
+def _projection(words):
+    # Столбцы и агрегатные функции между select и from; пустой список
+    # или * - все столбцы.
+    if " ".join(words) in ("", "*"):
+        return None
+    return tuple(parse_select_item(item) for item in _column_list(words))
+
+
+def _group_by(args, from_index):
+    # Хвост "group by <столбец1>, ..." перед ORDER BY.
+    for index in range(from_index, len(args) - 2):
+        if args[index] == "group" and args[index + 1] == "by":
+            return args[:index], _column_list(args[index + 2:])
+    return args, None
+
+
+def _join(words):
+    # Слова между первой таблицей и where: "join <таблица> on <a.x> = <b.y>".
+    if not words:
+        return None
+    if len(words) < 4 or words[0] != "join" or words[2] != "on":
+        raise ProgrammingError("Ошибка: Неверный формат JOIN. Используйте: "
+                               "select ... from <таблица1> join <таблица2> "
+                               "on <таблица1>.<столбец> = <таблица2>.<столбец>")
+    return (words[1], *parse_join_condition(" ".join(words[3:])))
+
+
+def _select(args):
+    args, limit, offset = _pagination(args)
+    args, order_by = _order_by(args)
+    if "from" not in args or args.index("from") + 1 >= len(args):
+        raise ProgrammingError("Ошибка: Неверный формат команды SELECT. Используйте: "
+                               "select [<столбцы>] from <таблица> [where <условие>] "
+                               "[group by <столбцы>] [order by <столбец> [desc]] "
+                               "[limit <N>] [offset <M>]")
+    from_index = args.index("from")
+    columns = _projection(args[1:from_index])
+    args, group_by = _group_by(args, from_index)
+    where = None
+    where_index = len(args)
+    if "where" in args[from_index:]:
+        where_index = args.index("where", from_index)
+        where = parse_where_clause(" ".join(args[where_index + 1:]))
+    join = _join(args[from_index + 2:where_index])
+    return Statement("select", args[from_index + 1], where=where, limit=limit,
+                     offset=offset, columns=columns, order_by=order_by,
+                     group_by=group_by, join=join)
+
+
+def _update(args):
+    if len(args) < 5 or args[2] != "set" or "where" not in args:
+        raise ProgrammingError("Ошибка: Неверный формат команды UPDATE. Используйте: "
+                               "update <таблица> set <присваивания> where <условие>")
+    set_index = args.index("set")
+    where_index = args.index("where")
+    set_clause = parse_set_clause(" ".join(args[set_index + 1:where_index]))
+    where = parse_where_clause(" ".join(args[where_index + 1:]))
+    return Statement("update", args[1], set_clause=set_clause, where=where)
+
+
+def _delete(args):
+    if len(args) < 4 or args[1] != "from" or args[3] != "where":
+        raise ProgrammingError("Ошибка: Неверный формат команды DELETE. Используйте: "
+                               "delete from <таблица> where <условие>")
+    return Statement("delete", args[2], where=parse_where_clause(" ".join(args[4:])))
+
+
+PARSERS = {"insert": _insert, "select": _select, "update": _update,
+           "delete": _delete}
+
+
+def parse_statement(args):
+    # args - слова команды после shlex.split(..., posix=False).
+    if not args or args[0] not in PARSERS:
+        raise ProgrammingError(f"Подготовить можно только команды: "
+                               f"{', '.join(STATEMENT_KINDS)}")
+    return PARSERS[args[0]](args)
+
+
+class StatementCache:
+    # LRU-кеш разобранных команд по их тексту: повторная команда
+    # не проходит ни shlex.split, ни разбор условий и значений.
+    def __init__(self, max_entries=STATEMENT_CACHE_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, text):
+        statement = self.entries.get(text)
+        if statement is None:
+            return None
+        self.hits += 1
+        self.entries.move_to_end(text)
+        return statement
+
+    def put(self, text, statement):
+        self.misses += 1
+        self.entries[text] = statement
+        self.entries.move_to_end(text)
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+
+    def stats(self):
+        return {"hits": self.hits, "misses": self.misses,
+                "entries": len(self.entries), "max_entries": self.max_entries}
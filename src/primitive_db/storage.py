@@ -0,0 +1,678 @@
+# src/primitive_db/storage.py
+
+import bisect
+import json
+import os
+import shutil
+
+from .binary import read_segment, write_segment
+from .columnar import PRIMARY_KEY, ColumnarTable
+from .errors import OperationalError, ProgrammingError, TableNotFoundError
+from .locks import table_lock
+from .metrics import count, count_file
+from .utils import atomic_write, load_table_data, save_table_data
+
+LOG_EXT = ".jsonl"
+JSON_EXT = ".json"
+SEGMENTS_EXT = ".segments"
+LOG_FORMAT_VERSION = 2
+
+# Форматы файлов сегментов (выбираются для таблицы при create_table и
+# меняются командой convert): jsonl - строка JSON на запись, binary -
+# столбцы в двоичном виде (binary.py). Значение - расширение файла.
+STORAGE_FORMATS = {"jsonl": LOG_EXT, "binary": ".bin"}
+DEFAULT_STORAGE = "jsonl"
+
+# Строки таблицы хранятся сегментами по SEGMENT_ROWS строк в каталоге
+# data/<таблица>.segments, лог содержит заголовок со списком сегментов и
+# изменения, сделанные после последнего переноса в сегменты.
+SEGMENT_ROWS = 65536
+
+# Автоматический перенос лога в сегменты: когда в логе накопилось
+# SEGMENT_ROWS записей или "мусорных" записей (update/delete) больше,
+# чем живых строк, и не меньше минимального порога.
+COMPACT_MIN_GARBAGE = 1000
+COMPACT_GARBAGE_RATIO = 1.0
+
+# Чтение таблицы без блокировки повторяется, если другой процесс за это время
+# перенес лог в сегменты и удалил прочитанные по старому заголовку файлы.
+READ_ATTEMPTS = 5
+
+OP_INSERT = "i"
+OP_UPDATE = "u"
+OP_DELETE = "d"
+
+
+def log_path(data_dir, table_name):
+    return data_dir.file(f"{table_name}{LOG_EXT}")
+
+
+def json_path(data_dir, table_name):
+    return data_dir.file(f"{table_name}{JSON_EXT}")
+
+
+def segments_path(data_dir, table_name):
+    return data_dir.file(f"{table_name}{SEGMENTS_EXT}")
+
+
+def segment_path(data_dir, table_name, meta):
+    return os.path.join(segments_path(data_dir, table_name), meta["file"])
+
+
+def table_files(data_dir, table_name):
+    return [path for path in (log_path(data_dir, table_name),
+                              json_path(data_dir, table_name))
+            if os.path.exists(path)]
+
+
+def table_signature(data_dir, table_name):
+    # (путь, inode, mtime, размер) файлов таблицы: меняется при любой записи
+    # в таблицу. inode отличает лог, атомарно замененный другим процессом,
+    # от прежнего с тем же размером и временем в пределах точности часов.
+    signature = []
+    for path in table_files(data_dir, table_name):
+        stat = os.stat(path)
+        signature.append((path, stat.st_ino, stat.st_mtime_ns, stat.st_size))
+    return tuple(signature)
+
+
+def is_log_table(data_dir, table_name):
+    return os.path.exists(log_path(data_dir, table_name))
+
+
+def _dump_line(record):
+    return json.dumps(record, ensure_ascii=False, separators=(",", ":")) + "\n"
+
+
+def _empty_state(next_id=1, rows=0):
+    # tail - число записей в логе после последнего переноса в сегменты.
+    return {"next_id": next_id, "rows": rows, "garbage": 0, "tail": 0}
+
+
+def _column_stats(table):
+    # Границы значений каждого столбца: {"min", "max", "exact"}. После
+    # update и delete границы остаются верными, но могут быть шире
+    # настоящих (exact = False); сжатие лога пересчитывает их точно.
+    # NULL в границы не входит; у столбца из одних NULL границ нет.
+    stats = {}
+    if not len(table):
+        return stats
+    for name, column in table.columns.items():
+        values = column.values()
+        if column.has_nulls:
+            values = [value for value in values if value is not None]
+            if not values:
+                continue
+        stats[name] = {"min": min(values), "max": max(values), "exact": True}
+    return stats
+
+
+def _widen(stats, name, value):
+    if value is None:
+        return
+    bounds = stats.get(name)
+    if bounds is None:
+        stats[name] = {"min": value, "max": value, "exact": True}
+    elif value < bounds["min"]:
+        bounds["min"] = value
+    elif value > bounds["max"]:
+        bounds["max"] = value
+
+
+def _update_stats(stats, record):
+    op = record["op"]
+    if op == OP_INSERT:
+        for name, value in record["row"].items():
+            _widen(stats, name, value)
+    elif op == OP_UPDATE:
+        for name, value in record["set"].items():
+            _widen(stats, name, value)
+            if name in stats:
+                stats[name]["exact"] = False
+    else:
+        for bounds in stats.values():
+            bounds["exact"] = False
+
+
+def _merge_stats(segments):
+    # Статистика таблицы из зонных карт сегментов.
+    stats = {}
+    for meta in segments:
+        for name, bounds in meta["stats"].items():
+            current = stats.get(name)
+            if current is None:
+                stats[name] = dict(bounds)
+                continue
+            current["min"] = min(current["min"], bounds["min"])
+            current["max"] = max(current["max"], bounds["max"])
+            current["exact"] = current["exact"] and bounds["exact"]
+    return stats
+
+
+def _next_segment_number(data_dir, table_name):
+    # Измененный сегмент записывается в новый файл: старый остается верным,
+    # пока заголовок лога не заменен атомарно.
+    names = os.listdir(segments_path(data_dir, table_name))
+    numbers = [int(name.split(".")[0]) for name in names
+               if name.split(".")[0].isdigit()]
+    return max(numbers, default=0) + 1
+
+
+def get_storage(name):
+    if name not in STORAGE_FORMATS:
+        raise ProgrammingError(f"Формат хранения '{name}' не поддерживается. "
+                               f"Используйте: {', '.join(STORAGE_FORMATS)}")
+    return name
+
+
+def _write_segment(data_dir, table_name, number, part, storage):
+    # Файл сегмента с заголовком: диапазон ID, число строк и зонная карта
+    # (минимум и максимум каждого столбца). В формате jsonl заголовок -
+    # первая строка, за ним по строке JSON на запись.
+    ids = part.ids.data
+    meta = {"file": f"{number:06d}{STORAGE_FORMATS[storage]}", "first_id": ids[0],
+            "last_id": ids[-1], "rows": len(part), "stats": _column_stats(part)}
+    header = {key: value for key, value in meta.items() if key != "file"}
+
+    if storage == "binary":
+        def write(f):
+            write_segment(f, part, header)
+    else:
+        def write(f):
+            f.write(_dump_line({"segment": header}))
+            f.writelines(_dump_line(row) for row in part)
+
+    atomic_write(data_dir, segment_path(data_dir, table_name, meta), write,
+                 binary=storage == "binary")
+    return meta
+
+
+def _write_segments(data_dir, table_name, table, number, storage):
+    return [_write_segment(data_dir, table_name, number + i,
+                           table.slice(start, start + SEGMENT_ROWS, table.schema),
+                           storage)
+            for i, start in enumerate(range(0, len(table), SEGMENT_ROWS))]
+
+
+def _write_manifest(data_dir, table_name, schema, storage, segments, state):
+    # Лог из одной строки: заголовок со схемой, форматом и списком сегментов
+    # и состояние таблицы, которое читает read_state.
+    def write(f):
+        f.write(_dump_line({"header": {"format": LOG_FORMAT_VERSION,
+                                       "schema": schema, "storage": storage,
+                                       "segments": segments},
+                            "state": state}))
+
+    atomic_write(data_dir, log_path(data_dir, table_name), write)
+    remove_unused_segments(data_dir, table_name, segments)
+
+
+def remove_unused_segments(data_dir, table_name, segments=None):
+    # Файлы сегментов, на которые не ссылается заголовок лога: старые версии
+    # переписанных сегментов и остатки записи, прерванной сбоем.
+    directory = segments_path(data_dir, table_name)
+    if not os.path.isdir(directory):
+        return
+    if segments is None:
+        segments = read_header(data_dir, table_name).get("segments", [])
+    used = {meta["file"] for meta in segments}
+    removed = False
+    for name in os.listdir(directory):
+        if name not in used:
+            os.remove(os.path.join(directory, name))
+            removed = True
+    if removed:
+        data_dir.sync_dir(directory)
+
+
+def _write_log(data_dir, table_name, schema, table, next_id,
+               storage=DEFAULT_STORAGE):
+    # Полная перезапись таблицы: строки делятся на сегменты заново, лог
+    # сводится к заголовку.
+    data_dir.ensure()
+    os.makedirs(segments_path(data_dir, table_name), exist_ok=True)
+    segments = _write_segments(data_dir, table_name, table,
+                               _next_segment_number(data_dir, table_name), storage)
+    state = dict(_empty_state(next_id, len(table)), stats=_merge_stats(segments))
+    _write_manifest(data_dir, table_name, schema, storage, segments, state)
+    return state
+
+
+def create_table_log(data_dir, table_name, schema, storage=DEFAULT_STORAGE):
+    return _write_log(data_dir, table_name, schema, ColumnarTable(schema), 1,
+                      storage)
+
+
+def _read_last_line(path):
+    with open(path, "rb") as f:
+        f.seek(0, os.SEEK_END)
+        end = f.tell()
+        block = 4096
+        buffer = b""
+        position = end
+        while position > 0:
+            step = min(block, position)
+            position -= step
+            f.seek(position)
+            buffer = f.read(step) + buffer
+            lines = buffer.rstrip(b"\n").split(b"\n")
+            if len(lines) > 1 or position == 0:
+                return lines[-1].decode("utf-8")
+    return ""
+
+
+def _last_state(data_dir, table_name):
+    # Состояние из последней строки лога или None, если строка оборвана
+    # или на ней не заканчивается пачка записей.
+    last_line = _read_last_line(log_path(data_dir, table_name))
+    if not last_line:
+        raise OperationalError(f"Лог таблицы '{table_name}' поврежден: пустой файл")
+    try:
+        state = json.loads(last_line)["state"]
+    except (json.JSONDecodeError, KeyError):
+        return None
+    first_state = _read_first_record(data_dir, table_name)["state"]
+    if "stats" in state or "stats" not in first_state:
+        return state
+    return None
+
+
+def read_state(data_dir, table_name):
+    # Состояние (следующий ID, число строк, мусор) дублируется в последней
+    # строке лога, поэтому для вставки не нужно читать весь файл.
+    state = _last_state(data_dir, table_name)
+    if state is not None:
+        return state
+    # Последняя пачка записей не дописана: ее дописывает другой процесс или
+    # запись прервана сбоем. Под блокировкой таблицы пишущих процессов нет,
+    # и незаконченная пачка отбрасывается перезаписью лога.
+    with table_lock(data_dir, table_name):
+        state = _last_state(data_dir, table_name)
+        if state is None:
+            state = compact_table(data_dir, table_name)
+    return state
+
+
+def _read_first_record(data_dir, table_name):
+    with open(log_path(data_dir, table_name), "r", encoding="utf-8") as f:
+        line = f.readline()
+    try:
+        record = json.loads(line)
+        record["header"]
+    except (json.JSONDecodeError, KeyError):
+        raise OperationalError(f"Лог таблицы '{table_name}' поврежден: нет заголовка")
+    return record
+
+
+def read_header(data_dir, table_name):
+    return _read_first_record(data_dir, table_name)["header"]
+
+
+def _apply_record(record, inserted, changed):
+    op = record["op"]
+    if op == OP_INSERT:
+        row = record["row"]
+        inserted[row["ID"]] = row
+    elif op == OP_UPDATE:
+        row = inserted.get(record["ID"])
+        if row is not None:
+            row.update(record["set"])
+        else:
+            changes = changed.setdefault(record["ID"], {})
+            if changes is not None:
+                changes.update(record["set"])
+    elif op == OP_DELETE:
+        if inserted.pop(record["ID"], None) is None:
+            changed[record["ID"]] = None
+
+
+def _read_tail(data_dir, table_name):
+    # Разбор лога без чтения сегментов. Возвращает заголовок, строки,
+    # вставленные после переноса в сегменты, изменения строк сегментов
+    # {ID: новые значения или None для удаленной строки} и состояние.
+    # Записи применяются пачками (одна команда или транзакция): пачка
+    # заканчивается записью, в состоянии которой есть статистика. Пачка,
+    # которую другой процесс еще дописывает, не видна - это снимок таблицы
+    # на момент последней завершенной записи.
+    path = log_path(data_dir, table_name)
+    header = None
+    state = _empty_state()
+    inserted = {}
+    changed = {}
+    batch = []
+    # В логах без статистики (созданных до ее появления) пачки не отмечены.
+    marked = True
+
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                # Оборванная последняя строка после сбоя: все до нее валидно.
+                break
+
+            if "header" in record:
+                header = record["header"]
+                state = record.get("state", state)
+                marked = "stats" in state
+                continue
+            if "op" in record:
+                batch.append(record)
+            line_state = record.get("state")
+            if line_state is not None and ("stats" in line_state or not marked):
+                for op_record in batch:
+                    _apply_record(op_record, inserted, changed)
+                batch = []
+                state = line_state
+    if not marked:
+        for op_record in batch:
+            _apply_record(op_record, inserted, changed)
+
+    if header is None:
+        raise OperationalError(f"Лог таблицы '{table_name}' поврежден: нет заголовка")
+
+    count_file("bytes_read", path)
+    return header, inserted, changed, state
+
+
+def _columns(schema, names):
+    if names is None:
+        return schema
+    return {name: column_type for name, column_type in schema.items()
+            if name == PRIMARY_KEY or name in names}
+
+
+def _read_segment(data_dir, table_name, meta, schema, names=None):
+    # Сегмент в виде таблицы ColumnarTable со столбцами names (и ID).
+    # Если файла нет, FileNotFoundError обрабатывает вызывающий код.
+    path = segment_path(data_dir, table_name, meta)
+    count_file("bytes_read", path)
+    if path.endswith(STORAGE_FORMATS["binary"]):
+        return read_segment(path, schema, names)[1]
+    with open(path, "r", encoding="utf-8") as f:
+        f.readline()  # заголовок сегмента
+        rows = [json.loads(line) for line in f]
+    return ColumnarTable.from_rows(_columns(schema, names), rows)
+
+
+def _missing_segment(table_name, error):
+    return OperationalError(f"Сегмент '{os.path.basename(error.filename)}' таблицы "
+                            f"'{table_name}' не найден")
+
+
+def _apply_changes(table, changed):
+    # Изменения и удаления строк из лога, относящиеся к строкам table.
+    deleted = []
+    for record_id, changes in changed.items():
+        position = table.position_of(record_id)
+        if position is None:
+            continue
+        if changes is None:
+            deleted.append(position)
+            continue
+        for name, value in changes.items():
+            column = table.columns.get(name)
+            if column is not None:
+                column.set(position, value)
+    table.delete_positions(sorted(deleted))
+    return table
+
+
+def _touched_segments(segments, record_ids):
+    # Номера сегментов, в диапазоны ID которых попадают record_ids.
+    first_ids = [meta["first_id"] for meta in segments]
+    touched = set()
+    for record_id in record_ids:
+        index = bisect.bisect_right(first_ids, record_id) - 1
+        if index >= 0 and record_id <= segments[index]["last_id"]:
+            touched.add(index)
+    return touched
+
+
+def read_table_log(data_dir, table_name, keep=None, names=None):
+    # Таблица ColumnarTable из сегментов и изменений из лога. keep(сегмент)
+    # отбирает сегменты для чтения по заголовку; сегменты, строки которых
+    # изменены в логе, читаются всегда, иначе измененная строка могла бы
+    # пропасть из результата по устаревшей зонной карте. names - столбцы,
+    # которые нужно прочитать (ID читается всегда), None - все. Читается
+    # без блокировок: сегменты не изменяются после записи.
+    for attempt in range(READ_ATTEMPTS):
+        try:
+            return _read_table(data_dir, table_name, keep, names)
+        except FileNotFoundError as error:
+            missing = error
+    raise _missing_segment(table_name, missing)
+
+
+def _read_table(data_dir, table_name, keep, names):
+    header, inserted, changed, state = _read_tail(data_dir, table_name)
+    schema = header["schema"]
+    segments = header.get("segments", [])
+    updated = _touched_segments(segments, [record_id for record_id, changes
+                                           in changed.items() if changes])
+    table = None
+    for index, meta in enumerate(segments):
+        if keep is None or keep(meta) or index in updated:
+            part = _apply_changes(
+                _read_segment(data_dir, table_name, meta, schema, names), changed)
+            if table is None:
+                table = part
+            else:
+                table.extend(part)
+    if table is None:
+        table = ColumnarTable(_columns(schema, names))
+    for row in inserted.values():
+        table.append(row)
+    return header, table, state
+
+
+def fold_log(data_dir, table_name):
+    # Перенос лога в сегменты: переписываются только сегменты, строки
+    # которых изменены или удалены, и последний сегмент, в который
+    # дописываются новые строки. Остальные файлы сегментов не трогаются.
+    header, inserted, changed, state = _read_tail(data_dir, table_name)
+    schema = header["schema"]
+    storage = header.get("storage", DEFAULT_STORAGE)
+    segments = header.get("segments", [])
+    os.makedirs(segments_path(data_dir, table_name), exist_ok=True)
+    number = _next_segment_number(data_dir, table_name)
+    touched = _touched_segments(segments, changed)
+    # Неполный последний сегмент дополняется новыми строками.
+    top_up = len(segments) - 1 if inserted and segments and \
+        segments[-1]["rows"] < SEGMENT_ROWS else None
+
+    result = []
+    tail = ColumnarTable(schema)
+    for index, meta in enumerate(segments):
+        if index not in touched and index != top_up:
+            result.append(meta)
+            continue
+        try:
+            part = _apply_changes(_read_segment(data_dir, table_name, meta, schema),
+                                  changed)
+        except FileNotFoundError as error:
+            raise _missing_segment(table_name, error)
+        if index == top_up:
+            tail = part
+        elif len(part):
+            result.append(_write_segment(data_dir, table_name, number, part, storage))
+            number += 1
+
+    for row in inserted.values():
+        tail.append(row)
+    result.extend(_write_segments(data_dir, table_name, tail, number, storage))
+
+    state = dict(_empty_state(state["next_id"],
+                              sum(meta["rows"] for meta in result)),
+                 stats=_merge_stats(result))
+    _write_manifest(data_dir, table_name, schema, storage, result, state)
+    return state
+
+
+def _append(data_dir, table_name, records):
+    with open(log_path(data_dir, table_name), "a", encoding="utf-8") as f:
+        start = f.tell()
+        f.writelines(_dump_line(record) for record in records)
+        data_dir.sync_file(f, append=True)
+        count("bytes_written", f.tell() - start)
+
+
+def _next_state(state, record):
+    op = record["op"]
+    tail = state.get("tail", 0) + 1
+    if op == OP_INSERT:
+        return dict(state, next_id=max(state["next_id"], record["row"]["ID"] + 1),
+                    rows=state["rows"] + 1, tail=tail)
+    if op == OP_UPDATE:
+        return dict(state, garbage=state["garbage"] + 1, tail=tail)
+    return dict(state, rows=state["rows"] - 1, garbage=state["garbage"] + 2,
+                tail=tail)
+
+
+def insert_record(row):
+    return {"op": OP_INSERT, "row": row}
+
+
+def update_record(record_id, changes):
+    return {"op": OP_UPDATE, "ID": record_id, "set": changes}
+
+
+def delete_record(record_id):
+    return {"op": OP_DELETE, "ID": record_id}
+
+
+def merge_records(rows, records):
+    # Записи лога поверх строк таблицы в старом формате .json: так свои
+    # изменения применяются к файлу, который переписал другой процесс.
+    merged = {row["ID"]: row for row in rows}
+    for record in records:
+        _apply_record(record, merged, {})
+    return list(merged.values())
+
+
+def truncate_log(data_dir, table_name, size):
+    with open(log_path(data_dir, table_name), "r+b") as f:
+        f.truncate(size)
+
+
+def append_log(data_dir, table_name, records, compact=True):
+    # Дописывает пачку записей (список или поток) с одним сбросом в ОС
+    # в конце; fsync после него - только при надежности full.
+    # Статистика столбцов добавляется только к состоянию последней записи:
+    # read_state читает именно ее.
+    state = read_state(data_dir, table_name)
+    stats = state.pop("stats", None)
+    final = [state]
+
+    def with_state():
+        previous = None
+        for record in records:
+            final[0] = _next_state(final[0], record)
+            if stats is not None:
+                _update_stats(stats, record)
+            if previous is not None:
+                yield previous
+            previous = dict(record, state=final[0])
+        if previous is not None:
+            if stats is not None:
+                previous["state"] = dict(final[0], stats=stats)
+            yield previous
+
+    _append(data_dir, table_name, with_state())
+    if compact and final[0] is not state:
+        maybe_compact(data_dir, table_name, final[0])
+    return final[0]
+
+
+def append_insert(data_dir, table_name, new_record):
+    new_record["ID"] = read_state(data_dir, table_name)["next_id"]
+    append_log(data_dir, table_name, [insert_record(new_record)])
+    return new_record["ID"]
+
+
+def append_updates(data_dir, table_name, records, set_clause):
+    changes = {column: value for column, value in set_clause.items()
+               if column != "ID"}
+    append_log(data_dir, table_name,
+               [update_record(record["ID"], changes) for record in records])
+
+
+def append_deletes(data_dir, table_name, record_ids):
+    append_log(data_dir, table_name,
+               [delete_record(record_id) for record_id in record_ids])
+
+
+def maybe_compact(data_dir, table_name, state):
+    garbage = state["garbage"]
+    if state.get("tail", 0) >= SEGMENT_ROWS or \
+            (garbage >= COMPACT_MIN_GARBAGE and
+             garbage > state["rows"] * COMPACT_GARBAGE_RATIO):
+        fold_log(data_dir, table_name)
+        return True
+    return False
+
+
+def compact_table(data_dir, table_name, schema=None, storage=None):
+    # Переписывает таблицу целиком, заново деля строки на сегменты (в формате
+    # storage или в текущем формате таблицы), а таблицу в старом формате
+    # .json переводит в лог.
+    if is_log_table(data_dir, table_name):
+        header, table, state = read_table_log(data_dir, table_name)
+        schema = header["schema"]
+        storage = storage or header.get("storage", DEFAULT_STORAGE)
+        next_id = state["next_id"]
+        legacy = False
+    elif os.path.exists(json_path(data_dir, table_name)):
+        if schema is None:
+            raise ProgrammingError(f"Для конвертации таблицы '{table_name}' "
+                                   f"нужна ее схема")
+        rows = load_table_data(data_dir, table_name)
+        table = ColumnarTable.from_rows(schema, rows)
+        next_id = max((row["ID"] for row in rows), default=0) + 1
+        legacy = True
+    else:
+        raise TableNotFoundError(f"Таблица '{table_name}' не существует")
+
+    state = _write_log(data_dir, table_name, schema, table, next_id,
+                       storage or DEFAULT_STORAGE)
+    if legacy:
+        os.remove(json_path(data_dir, table_name))
+        data_dir.sync_dir()
+    return state
+
+
+def table_storage(data_dir, table_name):
+    # Формат сегментов таблицы или None для таблицы в старом формате .json.
+    if not is_log_table(data_dir, table_name):
+        return None
+    return read_header(data_dir, table_name).get("storage", DEFAULT_STORAGE)
+
+
+def load_table(data_dir, table_name):
+    if is_log_table(data_dir, table_name):
+        return read_table_log(data_dir, table_name)[1].to_rows()
+    return load_table_data(data_dir, table_name)
+
+
+def save_table(data_dir, table_name, data):
+    # Полная перезапись таблицы в ее текущем формате.
+    if is_log_table(data_dir, table_name):
+        header = read_header(data_dir, table_name)
+        schema = header["schema"]
+        next_id = max([read_state(data_dir, table_name)["next_id"]] +
+                      [row["ID"] + 1 for row in data])
+        _write_log(data_dir, table_name, schema, ColumnarTable.from_rows(schema, data),
+                   next_id, header.get("storage", DEFAULT_STORAGE))
+    else:
+        save_table_data(data_dir, table_name, data)
+
+
+def remove_table(data_dir, table_name):
+    for path in table_files(data_dir, table_name):
+        os.remove(path)
+    if os.path.isdir(segments_path(data_dir, table_name)):
+        shutil.rmtree(segments_path(data_dir, table_name))
+    data_dir.sync_dir()
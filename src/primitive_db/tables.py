@@ -0,0 +1,368 @@
+# src/primitive_db/tables.py
+
+import os
+from collections import OrderedDict
+
+from .columnar import ColumnarTable
+from .errors import OperationalError, ProgrammingError
+from .locks import metadata_lock, table_locks
+from .metrics import count, stage
+from .predicates import may_match
+from .storage import (
+    append_log,
+    delete_record,
+    insert_record,
+    is_log_table,
+    load_table,
+    log_path,
+    merge_records,
+    read_header,
+    read_state,
+    read_table_log,
+    save_table,
+    table_signature,
+    update_record,
+)
+from .wal import commit_changes, write_locks
+
+BUFFER_MAX_BYTES = 256 * 1024 * 1024
+
+WRITE_IMMEDIATE = "immediate"
+WRITE_AT_EXIT = "exit"
+
+
+class TableEntry:
+    def __init__(self, data_dir, table_name, table, next_id):
+        self.table_name = table_name
+        self.table = table
+        self.next_id = next_id
+        self.size = table.nbytes()
+        self.signature = table_signature(data_dir, table_name)
+        self.log = is_log_table(data_dir, table_name)
+        self.pending = []
+        self.dirty = False
+
+
+class TableManager:
+    # Пул буферов: держит разобранные таблицы в памяти в пределах бюджета,
+    # вытесняет давно не использованные (LRU) и записывает изменения на диск
+    # по выбранной политике: сразу, каждые N операций или при выходе.
+    def __init__(self, data_dir, metadata, max_bytes=BUFFER_MAX_BYTES,
+                 write_back=WRITE_IMMEDIATE):
+        self.data_dir = data_dir
+        self.metadata = metadata
+        self.max_bytes = max_bytes
+        self.write_back = write_back
+        self.entries = OrderedDict()
+        self.size = 0
+        self.ops_since_flush = 0
+        # Имена таблиц, измененных в открытой транзакции, или None вне ее.
+        # Изменения таких таблиц не пишутся на диск и не вытесняются до commit.
+        self.transaction = None
+        # Сколько строк прочитали частичные загрузки таблиц (read_part).
+        self.partial_rows = {}
+
+    def _in_transaction(self, table_name):
+        return self.transaction is not None and table_name in self.transaction
+
+    def _load(self, table_name):
+        with stage("load"):
+            if is_log_table(self.data_dir, table_name):
+                _, table, state = read_table_log(self.data_dir, table_name)
+                next_id = state["next_id"]
+            else:
+                rows = load_table(self.data_dir, table_name)
+                next_id = max((row["ID"] for row in rows), default=0) + 1
+                table = ColumnarTable.from_rows(self.metadata[table_name], rows)
+        count("rows_loaded", len(table))
+        return TableEntry(self.data_dir, table_name, table, next_id)
+
+    def _entry(self, table_name):
+        entry = self.entries.get(table_name)
+
+        if entry is not None and \
+                entry.signature != table_signature(self.data_dir, table_name):
+            if self._in_transaction(table_name):
+                raise OperationalError(f"Таблица '{table_name}' изменена другим "
+                                       f"процессом во время транзакции. "
+                                       f"Выполните rollback")
+            # Файл изменен другим процессом: свои изменения дописываем
+            # (для журнала это безопасно), затем перечитываем таблицу.
+            self._flush_entry(entry)
+            self._discard(table_name)
+            entry = None
+
+        if entry is None:
+            entry = self._load(table_name)
+            self.entries[table_name] = entry
+            self.size += entry.size
+            self._evict(keep=table_name)
+        else:
+            self.entries.move_to_end(table_name)
+        return entry
+
+    def get(self, table_name):
+        return self._entry(table_name).table
+
+    def read_part(self, table_name, predicate, names=None):
+        # Часть таблицы для одного запроса на чтение: только сегменты, которые
+        # по зонным картам могут содержать строки, подходящие под условие,
+        # и только столбцы names (None - все).
+        # None - запрос читает всю таблицу через get: она уже в памяти,
+        # условие не отсекает ни одного сегмента или частичные загрузки
+        # в сумме прочитали больше строк, чем есть в таблице, и таблицу
+        # выгоднее загрузить целиком.
+        if predicate is None or not predicate.constraints or \
+                table_name in self.entries or \
+                not is_log_table(self.data_dir, table_name):
+            return None
+        segments = read_header(self.data_dir, table_name).get("segments", [])
+        if len(segments) < 2:
+            return None
+
+        def keep(meta):
+            bounds = {name: (stats["min"], stats["max"])
+                      for name, stats in meta["stats"].items()}
+            bounds["ID"] = (meta["first_id"], meta["last_id"])
+            return may_match(predicate.constraints, bounds)
+
+        kept = [meta for meta in segments if keep(meta)]
+        if len(kept) == len(segments):
+            return None
+        loaded = self.partial_rows.get(table_name, 0) + \
+            sum(meta["rows"] for meta in kept)
+        if loaded > sum(meta["rows"] for meta in segments):
+            return None
+        self.partial_rows[table_name] = loaded
+        if names is not None:
+            names = {*names, *predicate.columns}
+        with stage("load"):
+            table = read_table_log(self.data_dir, table_name, keep, names)[1]
+        count("rows_loaded", len(table))
+        return table
+
+    def statistics(self, table_name):
+        # Число строк и границы значений столбцов из состояния в конце лога,
+        # без чтения строк. Для таблицы с незаписанными изменениями число
+        # строк берется из памяти, а границы неизвестны.
+        entry = self.entries.get(table_name)
+        if entry is not None and entry.dirty:
+            return {"rows": len(entry.table), "columns": {}, "segments": None}
+        if not is_log_table(self.data_dir, table_name):
+            return {"rows": len(self.get(table_name)), "columns": {},
+                    "segments": None}
+        state = read_state(self.data_dir, table_name)
+        segments = read_header(self.data_dir, table_name).get("segments", [])
+        return {"rows": state["rows"], "columns": state.get("stats", {}),
+                "segments": len(segments)}
+
+    def _evict(self, keep):
+        for table_name in list(self.entries):
+            if self.size <= self.max_bytes:
+                break
+            if table_name != keep and not self._in_transaction(table_name):
+                self._flush_entry(self.entries[table_name])
+                self._discard(table_name)
+
+    def _discard(self, table_name):
+        self.partial_rows.pop(table_name, None)
+        entry = self.entries.pop(table_name, None)
+        if entry is not None:
+            self.size -= entry.size
+
+    def _resize(self, entry):
+        size = entry.table.nbytes()
+        self.size += size - entry.size
+        entry.size = size
+
+    def _changed(self, entry, records):
+        entry.pending.extend(records)
+        entry.dirty = True
+        if self.transaction is not None:
+            self.transaction.add(entry.table_name)
+            self._evict(keep=entry.table_name)
+            return
+        self.ops_since_flush += 1
+
+        if self.write_back == WRITE_IMMEDIATE:
+            self._flush_entry(entry)
+        elif isinstance(self.write_back, int) and \
+                self.ops_since_flush >= self.write_back:
+            self.flush()
+        self._evict(keep=entry.table_name)
+
+    def insert(self, table_name, new_record):
+        # Вызывается под блокировкой таблицы (write_locks). ID новой строки
+        # сразу возвращается вызывающему коду, поэтому вне транзакции строка
+        # записывается при любой политике записи, пока блокировка не
+        # отпущена: иначе тот же ID мог бы выдать себе другой процесс.
+        entry = self._entry(table_name)
+        new_record["ID"] = entry.next_id
+        entry.table.append(new_record)
+        entry.next_id += 1
+        self._resize(entry)
+        self._changed(entry, [insert_record(dict(new_record))])
+        if not self._in_transaction(table_name):
+            self._flush_entry(entry)
+        return new_record["ID"]
+
+    def insert_many(self, table_name, records):
+        # Пакетная вставка: records - значения без ID в порядке схемы. ID
+        # выдаются счетчиком, а на диск строки пишутся одним проходом в конце.
+        # При ошибке в любой строке таблица откатывается целиком.
+        entry = self._entry(table_name)
+        if not self._in_transaction(table_name):
+            self._flush_entry(entry)
+        table = entry.table
+        start = len(table)
+        next_id = entry.next_id
+        try:
+            for values in records:
+                table.append_values([next_id, *values])
+                next_id += 1
+        except BaseException:
+            table.truncate(start)
+            raise
+
+        entry.next_id = next_id
+        self._resize(entry)
+        if self.transaction is not None:
+            self._changed(entry, [insert_record(table.row(position))
+                                  for position in range(start, len(table))])
+            return len(table) - start
+
+        with write_locks(self.data_dir, [table_name]), stage("save"):
+            if entry.log:
+                append_log(self.data_dir, table_name,
+                           (insert_record(table.row(position))
+                            for position in range(start, len(table))))
+            else:
+                save_table(self.data_dir, table_name, table.to_rows())
+            entry.signature = table_signature(self.data_dir, table_name)
+        self._evict(keep=table_name)
+        return len(table) - start
+
+    def update(self, table_name, updated_ids, changes):
+        # Сами значения уже изменены в столбцах функцией core.update.
+        if not updated_ids or not changes:
+            return
+        entry = self._entry(table_name)
+        self._resize(entry)
+        self._changed(entry, [update_record(record_id, changes)
+                              for record_id in updated_ids])
+
+    def delete(self, table_name, deleted_ids):
+        if not deleted_ids:
+            return
+        entry = self._entry(table_name)
+        entry.table.delete_positions(entry.table.positions_of(deleted_ids))
+        self._resize(entry)
+        self._changed(entry, [delete_record(record_id) for record_id in deleted_ids])
+
+    def _flush_entry(self, entry):
+        if not entry.dirty:
+            return
+        table_name = entry.table_name
+        with write_locks(self.data_dir, [table_name]), stage("save"):
+            # Пока изменения копились в памяти, таблицу мог изменить другой
+            # процесс. Вставки среди них нет (insert пишется сразу), а update
+            # и delete дописывать в лог безопасно; таблица после записи
+            # перечитывается. Файл .json переписывается целиком, поэтому
+            # свои изменения применяются к строкам, записанным другим
+            # процессом, а не к устаревшей копии в памяти.
+            stale = entry.signature != table_signature(self.data_dir, table_name)
+            if entry.log:
+                append_log(self.data_dir, table_name, entry.pending)
+            elif stale:
+                rows = load_table(self.data_dir, table_name)
+                save_table(self.data_dir, table_name,
+                           merge_records(rows, entry.pending))
+            else:
+                save_table(self.data_dir, table_name, entry.table.to_rows())
+            entry.pending = []
+            entry.dirty = False
+            entry.signature = table_signature(self.data_dir, table_name)
+        if stale:
+            self._discard(table_name)
+
+    def flush(self, table_name=None):
+        # Изменения открытой транзакции записываются только при commit.
+        names = [table_name] if table_name is not None else list(self.entries)
+        for name in names:
+            entry = self.entries.get(name)
+            if entry is not None and not self._in_transaction(name):
+                self._flush_entry(entry)
+        if table_name is None:
+            self.ops_since_flush = 0
+
+    def begin(self):
+        if self.transaction is not None:
+            raise ProgrammingError("Транзакция уже начата")
+        # На диске должно оказаться состояние до транзакции: к нему
+        # вернет rollback.
+        self.flush()
+        self.transaction = set()
+
+    def commit(self):
+        # Все изменения транзакции записываются одной операцией журнала:
+        # после сбоя они либо применяются полностью, либо не применяются.
+        if self.transaction is None:
+            raise ProgrammingError("Транзакция не начата")
+        with metadata_lock(self.data_dir), \
+                table_locks(self.data_dir, self.transaction), stage("save"):
+            changes = {}
+            for table_name in self.transaction:
+                entry = self.entries[table_name]
+                # Транзакция читала таблицу до изменений другого процесса:
+                # ее результат мог бы противоречить им.
+                if entry.signature != table_signature(self.data_dir, table_name):
+                    raise OperationalError(f"Таблица '{table_name}' изменена другим "
+                                           f"процессом во время транзакции. "
+                                           f"Выполните rollback")
+                if entry.log:
+                    changes[table_name] = {
+                        "offset": os.path.getsize(log_path(self.data_dir, table_name)),
+                        "records": entry.pending}
+                else:
+                    changes[table_name] = {"rows": entry.table.to_rows()}
+            commit_changes(self.data_dir, changes)
+
+        for table_name in self.transaction:
+            entry = self.entries[table_name]
+            entry.pending = []
+            entry.dirty = False
+            entry.signature = table_signature(self.data_dir, table_name)
+        committed = len(self.transaction)
+        self.transaction = None
+        self._evict(keep=None)
+        return committed
+
+    def rollback(self):
+        # Измененные таблицы просто забываются: на диске осталось
+        # состояние до begin, при следующем обращении они перечитываются.
+        if self.transaction is None:
+            raise ProgrammingError("Транзакция не начата")
+        rolled_back = sorted(self.transaction)
+        for table_name in rolled_back:
+            self._discard(table_name)
+        self.transaction = None
+        return rolled_back
+
+    def discard(self, table_name):
+        # Забыть таблицу без записи (после drop_table или compact).
+        self._discard(table_name)
+
+    def close(self):
+        if self.transaction is not None:
+            self.rollback()
+        self.flush()
+
+    def stats(self):
+        return {
+            "tables": len(self.entries),
+            "bytes": self.size,
+            "max_bytes": self.max_bytes,
+            "dirty": sum(1 for entry in self.entries.values() if entry.dirty),
+            "write_back": self.write_back,
+            "transaction": self.transaction is not None,
+        }
@@ -2,41 +2,123 @@
 
 import json
 import os
+import sys
+
+from .errors import OperationalError, ProgrammingError
+from .metrics import count_file
 
 DATA_DIR = "data"
 METADATA = "db_meta.json"
-
-
-def ensure_data_dir():
-    if not os.path.exists(DATA_DIR):
-        os.makedirs(DATA_DIR)
-
-
-def load_table_data(table_name):
-    ensure_data_dir()
-    filename = os.path.join(DATA_DIR, f"{table_name}.json")
+# Служебный ключ в db_meta.json с описаниями индексов: {таблица: {столбец: тип}}
+INDEXES_KEY = "__indexes__"
+# Служебный ключ с ограничениями столбцов:
+# {таблица: {столбец: {"not_null": true, "default": значение}}}
+COLUMNS_KEY = "__columns__"
+# Служебные ключи не являются таблицами, их имена зарезервированы.
+SERVICE_KEYS = (INDEXES_KEY, COLUMNS_KEY)
+
+# Надежность записи на диск:
+# off    - без fsync: файлы не обрываются при падении процесса, но сбой ОС
+#          может потерять последние изменения;
+# normal - fsync при полной перезаписи файлов и журнала операций, дописывание
+#          в лог таблицы только сбрасывается в ОС;
+# full   - fsync после каждой записи в лог и fsync каталога после
+#          переименования, создания и удаления файлов.
+DURABILITY_OFF = "off"
+DURABILITY_NORMAL = "normal"
+DURABILITY_FULL = "full"
+DURABILITY_LEVELS = (DURABILITY_OFF, DURABILITY_NORMAL, DURABILITY_FULL)
+
+def get_durability(level):
+    if level not in DURABILITY_LEVELS:
+        raise ProgrammingError(f"Уровень надежности '{level}' не поддерживается. "
+                               f"Используйте: {', '.join(DURABILITY_LEVELS)}")
+    return level
+
+
+class DataDir:
+    # Каталог базы и надежность записи. У каждого соединения свой объект,
+    # и функции, которые работают с файлами базы, получают его явно: два
+    # соединения с разными каталогами не мешают друг другу, в том числе
+    # в разных потоках.
+    def __init__(self, path=DATA_DIR, durability=DURABILITY_NORMAL):
+        self.path = os.fspath(path)
+        self.durability = get_durability(durability)
+
+    def file(self, filename):
+        return os.path.join(self.path, filename)
+
+    def ensure(self):
+        os.makedirs(self.path, exist_ok=True)
+
+    def sync_file(self, f, append=False):
+        f.flush()
+        level = self.durability
+        if level == DURABILITY_FULL or (level == DURABILITY_NORMAL and not append):
+            os.fsync(f.fileno())
+
+    def sync_dir(self, directory=None):
+        # Запись о переименовании или удалении файла хранится в каталоге.
+        if self.durability != DURABILITY_FULL:
+            return
+        if directory is None:
+            directory = self.path
+        try:
+            fd = os.open(directory, os.O_RDONLY)
+        except OSError:  # например, в Windows каталог так не открыть
+            return
+        try:
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+
+
+def atomic_write(data_dir, filename, write, binary=False):
+    # Запись во временный файл и атомарная замена: при сбое на диске
+    # остается либо старая, либо новая версия файла целиком.
+    tmp_filename = filename + ".tmp"
+    with open(tmp_filename, 'wb') if binary else \
+            open(tmp_filename, 'w', encoding='utf-8') as f:
+        write(f)
+        data_dir.sync_file(f)
+    os.replace(tmp_filename, filename)
+    data_dir.sync_dir(os.path.dirname(filename) or ".")
+    count_file("bytes_written", filename)
+
+
+def _dump_json(data):
+    return lambda f: json.dump(data, f, indent=2, ensure_ascii=False)
+
+
+def load_table_data(data_dir, table_name):
+    data_dir.ensure()
+    filename = data_dir.file(f"{table_name}.json")
 
     if not os.path.exists(filename):
         return []
 
     try:
         with open(filename, 'r', encoding='utf-8') as f:
-            return json.load(f)
-    except (json.JSONDecodeError, FileNotFoundError):
+            data = json.load(f)
+    except FileNotFoundError:
         return []
+    except json.JSONDecodeError:
+        # Пустая таблица вместо поврежденной привела бы к потере данных
+        # при следующей записи, поэтому сообщаем об ошибке.
+        raise OperationalError(f"Файл таблицы '{table_name}' поврежден: {filename}")
+    count_file("bytes_read", filename)
+    return data
 
 
-def save_table_data(table_name, data):
-    ensure_data_dir()
-    filename = os.path.join(DATA_DIR, f"{table_name}.json")
+def save_table_data(data_dir, table_name, data):
+    data_dir.ensure()
+    filename = data_dir.file(f"{table_name}.json")
+    atomic_write(data_dir, filename, _dump_json(data))
 
-    with open(filename, 'w', encoding='utf-8') as f:
-        json.dump(data, f, indent=2, ensure_ascii=False)
 
-
-def load_metadata():
-    ensure_data_dir()
-    filename = os.path.join(DATA_DIR, METADATA)
+def load_metadata(data_dir):
+    data_dir.ensure()
+    filename = data_dir.file(METADATA)
 
     if not os.path.exists(filename):
         return {}
@@ -44,13 +126,24 @@ def load_metadata():
     try:
         with open(filename, 'r', encoding='utf-8') as f:
             return json.load(f)
-    except (json.JSONDecodeError, FileNotFoundError):
+    except FileNotFoundError:
         return {}
+    except json.JSONDecodeError:
+        raise OperationalError(f"Файл метаданных поврежден: {filename}")
+
 
+def save_metadata(data_dir, metadata):
+    data_dir.ensure()
+    atomic_write(data_dir, data_dir.file(METADATA), _dump_json(metadata))
 
-def save_metadata(metadata):
-    ensure_data_dir()
-    filename = os.path.join(DATA_DIR, METADATA)
 
-    with open(filename, 'w', encoding='utf-8') as f:
-        json.dump(metadata, f, indent=2, ensure_ascii=False)
+def estimate_size(rows):
+    # Грубая оценка занимаемой памяти: список, его элементы и значения
+    # в словарях строк.
+    size = sys.getsizeof(rows)
+    for row in rows:
+        size += sys.getsizeof(row)
+        if isinstance(row, dict):
+            for value in row.values():
+                size += sys.getsizeof(value)
+    return size
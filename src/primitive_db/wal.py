@@ -0,0 +1,174 @@
+# src/primitive_db/wal.py
+
+import contextlib
+import json
+import os
+
+from .locks import metadata_lock, table_lock, table_locks
+from .storage import (
+    DEFAULT_STORAGE,
+    append_log,
+    create_table_log,
+    is_log_table,
+    json_path,
+    maybe_compact,
+    read_state,
+    remove_table,
+    remove_unused_segments,
+    save_table,
+    truncate_log,
+)
+from .utils import METADATA, SERVICE_KEYS, load_metadata, save_metadata
+
+# Журнал операций, которые меняют несколько файлов сразу: create_table и
+# drop_table (метаданные и файлы таблиц) и commit транзакции (логи всех
+# измененных таблиц). Сначала в журнал записывается вся операция, затем она
+# применяется, затем журнал удаляется. Если процесс упал посередине, при
+# следующем запуске операция применяется заново.
+WAL_FILE = "wal.jsonl"
+
+
+def wal_path(data_dir):
+    return data_dir.file(WAL_FILE)
+
+
+def _apply(data_dir, record):
+    # Каждый шаг можно безопасно повторить.
+    if "tables" in record:
+        return _apply_changes(data_dir, record["tables"])
+    for table_name, schema in record["create"].items():
+        if not is_log_table(data_dir, table_name):
+            storage = record.get("storage", {}).get(table_name, DEFAULT_STORAGE)
+            create_table_log(data_dir, table_name, schema, storage)
+    save_metadata(data_dir, record["metadata"])
+    for table_name in record["remove"]:
+        remove_table(data_dir, table_name)
+
+
+def _apply_changes(data_dir, tables):
+    # Лог обрезается до длины перед транзакцией, поэтому повторное
+    # применение не дублирует записи.
+    states = {}
+    for table_name, change in tables.items():
+        if "rows" in change:
+            save_table(data_dir, table_name, change["rows"])
+        else:
+            truncate_log(data_dir, table_name, change["offset"])
+            states[table_name] = append_log(data_dir, table_name, change["records"],
+                                            compact=False)
+    return states
+
+
+def _log_and_apply(data_dir, record):
+    # Журнал один на базу: операции разных процессов выполняются по очереди
+    # под блокировкой метаданных.
+    data_dir.ensure()
+    with metadata_lock(data_dir):
+        with open(wal_path(data_dir), "a", encoding="utf-8") as f:
+            f.write(json.dumps(record, ensure_ascii=False) + "\n")
+            data_dir.sync_file(f)
+        result = _apply(data_dir, record)
+        os.remove(wal_path(data_dir))
+        data_dir.sync_dir()
+    return result
+
+
+def commit(data_dir, metadata, create=None, remove=(), storage=None):
+    # Согласованно записывает метаданные и создает или удаляет файлы таблиц.
+    # storage - форматы сегментов создаваемых таблиц {таблица: формат}.
+    _log_and_apply(data_dir, {"metadata": metadata, "create": create or {},
+                              "remove": list(remove), "storage": storage or {}})
+
+
+def commit_changes(data_dir, tables):
+    # tables: {таблица: {"offset": длина лога, "records": записи лога}} или
+    # {таблица: {"rows": все строки}} для таблиц в формате .json.
+    if not tables:
+        return
+    states = _log_and_apply(data_dir, {"tables": tables})
+    # Сжатие меняет файлы целиком, поэтому выполняется после удаления журнала.
+    for table_name, state in states.items():
+        maybe_compact(data_dir, table_name, state)
+
+
+def _read_wal(data_dir):
+    records = []
+    with open(wal_path(data_dir), "r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                records.append(json.loads(line))
+            except json.JSONDecodeError:
+                # Запись оборвана: до сбоя операция не начинала применяться.
+                break
+    return records
+
+
+def _replay(data_dir):
+    # Повтор операции из журнала, оставшегося от упавшего процесса. Вызывается
+    # под блокировкой метаданных: журнал работающего процесса не виден.
+    replayed = 0
+    with metadata_lock(data_dir):
+        if os.path.exists(wal_path(data_dir)):
+            for record in _read_wal(data_dir):
+                _apply(data_dir, record)
+                replayed += 1
+            os.remove(wal_path(data_dir))
+    return replayed
+
+
+@contextlib.contextmanager
+def write_locks(data_dir, table_names):
+    # Запись в таблицы вне журнала: разделяемая блокировка метаданных (другие
+    # процессы в это время не применяют журнал) и блокировки самих таблиц.
+    # Журнал, найденный под разделяемой блокировкой, остался от сбоя: его
+    # нужно применить до записи, иначе повтор commit обрежет лог таблицы
+    # вместе с новыми записями. Применяется он под исключительной
+    # блокировкой, взятой заново (повысить разделяемую нельзя), после чего
+    # проверка повторяется.
+    while True:
+        with metadata_lock(data_dir, exclusive=False):
+            if not os.path.exists(wal_path(data_dir)):
+                with table_locks(data_dir, table_names):
+                    yield
+                return
+        _replay(data_dir)
+
+
+def _owner_lock(data_dir, filename):
+    # Блокировка файла, которому принадлежит временный файл filename.
+    target = filename[:-len(".tmp")]
+    if target == METADATA:
+        return contextlib.nullcontext()  # уже удерживается в recover
+    return table_lock(data_dir, os.path.splitext(target)[0])
+
+
+def recover(data_dir):
+    # Восстановление при запуске: повтор незавершенных операций, удаление
+    # временных файлов и проверка хвостов логов таблиц. Возвращает число
+    # повторенных операций. Другие процессы могут работать с базой в это
+    # время, поэтому каждый файл проверяется под блокировкой его владельца.
+    data_dir.ensure()
+    with metadata_lock(data_dir):
+        replayed = _replay(data_dir)
+
+        for filename in os.listdir(data_dir.path):
+            if filename.endswith(".tmp"):
+                with _owner_lock(data_dir, filename):
+                    with contextlib.suppress(FileNotFoundError):
+                        os.remove(data_dir.file(filename))
+
+        for table_name in load_metadata(data_dir):
+            if table_name in SERVICE_KEYS or not is_log_table(data_dir, table_name):
+                continue
+            with table_lock(data_dir, table_name):
+                # Таблица уже переведена в лог, старый файл .json остался
+                # от сбоя.
+                if os.path.exists(json_path(data_dir, table_name)):
+                    os.remove(json_path(data_dir, table_name))
+                # Оборванная последняя строка лога исправляется сжатием.
+                read_state(data_dir, table_name)
+                # Сегменты, записанные переносом лога, прерванным сбоем.
+                remove_unused_segments(data_dir, table_name)
+
+        data_dir.sync_dir()
+    return replayed
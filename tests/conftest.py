@@ -0,0 +1,13 @@
+# tests/conftest.py
+
+import pytest
+
+from src.primitive_db import connect
+
+
+@pytest.fixture
+def connection(tmp_path):
+    # Каждый тест работает со своим каталогом данных.
+    connection = connect(tmp_path / "data")
+    yield connection
+    connection.close()
@@ -0,0 +1,104 @@
+# tests/test_aggregates.py
+
+import random
+
+import pytest
+
+from src.primitive_db import ProgrammingError, connect
+
+ROWS = [("x", 1, 0.5), ("y", None, 1.5), ("x", 5, None), (None, 3, 2.0)]
+
+
+@pytest.fixture
+def table(connection):
+    connection.create_table("t", [("g", "str"), ("a", "int"), ("f", "float")])
+    connection.executemany("insert into t values (?, ?, ?)", ROWS)
+    return connection
+
+
+def _one(connection, sql):
+    return connection.execute(sql).fetchall()
+
+
+def test_aggregates_skip_null(table):
+    assert _one(table, "select count(*), count(a), sum(a), avg(a), min(a), max(a), "
+                       "sum(f), avg(f) from t") == [(4, 3, 9, 3.0, 1, 5, 4.0, 4.0 / 3)]
+    assert _one(table, "select min(g), max(g), count(g) from t") == [("x", "y", 3)]
+
+
+def test_aggregates_over_no_rows(table):
+    assert _one(table, "select count(*), sum(a), avg(f), min(g) from t "
+                       "where a > 100") == [(0, None, None, None)]
+    assert _one(table, "select g, count(*) from t where a > 100 group by g") == []
+
+
+def test_group_by_matches_manual_grouping(connection):
+    rng = random.Random(16)
+    rows = [(rng.choice(["a", "b", "c", None]), rng.randrange(100)) for _ in range(300)]
+    connection.create_table("t", [("g", "str"), ("n", "int")])
+    connection.executemany("insert into t values (?, ?)", rows)
+    expected = {}
+    for group, value in rows:
+        if value > 10:
+            expected.setdefault(group, []).append(value)
+    result = _one(connection, "select g, count(*), sum(n), min(n), max(n) from t "
+                              "where n > 10 group by g")
+    assert sorted(result, key=lambda row: (row[0] is not None, row[0])) == [
+        (group, len(values), sum(values), min(values), max(values))
+        for group, values in sorted(expected.items(),
+                                    key=lambda item: (item[0] is not None, item[0]))]
+
+
+def test_group_by_order_and_limit(table):
+    assert _one(table, "select g, count(*), sum(a) from t group by g "
+                       "order by count(*) desc limit 1") == [("x", 2, 6)]
+    # NULL идет первым, в том числе отдельной группой.
+    assert _one(table, "select g, count(*) from t group by g order by g") == [
+        (None, 1), ("x", 2), ("y", 1)]
+    assert _one(table, "select g, max(a) from t group by g order by max(a) desc "
+                       "limit 2 offset 1") == [(None, 3), ("y", None)]
+
+
+def test_aggregate_errors(table):
+    for sql in ("select sum(g) from t", "select g, count(*) from t",
+                "select a, count(*) from t group by g", "select sum(*) from t",
+                "select count(*) from t group by missing"):
+        with pytest.raises(ProgrammingError):
+            table.execute(sql)
+
+
+def test_totals_come_from_statistics(table):
+    # count(*), min и max без WHERE и GROUP BY не читают строки таблицы.
+    with connect(table.path) as connection:
+        profile = connection.explain_analyze("select count(*), min(a), max(f) from t")
+        assert "load" not in profile["stages"]
+        assert "rows_loaded" not in profile["counters"]
+        assert connection.execute("select count(*), min(a), max(f) from t").fetchall() \
+            == [(4, 1, 2.0)]
+        # sum статистикой не считается: строки читаются.
+        profile = connection.explain_analyze("select count(*), sum(a) from t")
+        assert profile["counters"]["rows_loaded"] == 4
+
+
+def test_statistics_after_update_and_delete(table):
+    statistics = table.table_info("t")["statistics"]
+    assert statistics["a"] == {"min": 1, "max": 5, "exact": True}
+    table.execute("insert into t values ('z', 7, 0.25)")
+    assert table.table_info("t")["statistics"]["a"] == {"min": 1, "max": 7,
+                                                        "exact": True}
+
+    # После delete границы остаются прежними, но становятся неточными:
+    # min и max тогда считаются по данным.
+    table.execute("delete from t where a >= 5")
+    info = table.table_info("t")
+    assert info["rows"] == 3
+    assert info["statistics"]["a"] == {"min": 1, "max": 7, "exact": False}
+    assert _one(table, "select count(*), min(a), max(a) from t") == [(3, 1, 3)]
+
+    table.execute("update t set a = 10 where ID = 1")
+    assert table.table_info("t")["statistics"]["a"]["max"] == 10
+    assert _one(table, "select min(a), max(a) from t") == [(3, 10)]
+
+    table.compact("t")
+    assert table.table_info("t")["statistics"]["a"] == {"min": 3, "max": 10,
+                                                        "exact": True}
@@ -0,0 +1,51 @@
+# tests/test_batch.py
+
+import pytest
+
+from src.primitive_db import connect
+from src.primitive_db.decorators import set_auto_confirm
+from src.primitive_db.engine import run_batch
+
+SCRIPT = [
+    "create_table t a:int",
+    "insert into t values (1)",
+    "insert into t values (x)",
+    "-- комментарий",
+    "bogus",
+    "insert into t values (2)",
+]
+
+
+@pytest.fixture(autouse=True)
+def workdir(tmp_path, monkeypatch):
+    # Пакетный режим открывает базу в каталоге data текущего каталога.
+    monkeypatch.chdir(tmp_path)
+    set_auto_confirm(False)
+    yield tmp_path
+    set_auto_confirm(None)
+
+
+def test_successful_batch_returns_zero(capsys):
+    assert run_batch(SCRIPT[:2], quiet=True) == 0
+    captured = capsys.readouterr()
+    assert captured.err == ""
+    assert "Выполнено команд: 2" in captured.out
+
+
+def test_failed_statements_reported_on_stderr_when_quiet(capsys):
+    assert run_batch(SCRIPT, quiet=True) == 1
+    captured = capsys.readouterr()
+    errors = captured.err.splitlines()
+    assert len(errors) == 2
+    assert errors[0].startswith("Команда 3: ")
+    assert errors[1].startswith("Команда 4: ")
+    assert "с ошибкой: 2" in captured.out
+
+
+def test_stop_on_error(capsys, workdir):
+    assert run_batch(SCRIPT, quiet=True, stop_on_error=True) == 1
+    assert "Выполнено команд: 3" in capsys.readouterr().out
+    # Команды после ошибки не выполнялись.
+    connection = connect(workdir / "data")
+    assert connection.execute("select count(*) from t").fetchall() == [(1,)]
+    connection.close()
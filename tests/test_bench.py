@@ -0,0 +1,62 @@
+# tests/test_bench.py
+
+import argparse
+
+import pytest
+
+from benchmarks import bench, stress
+
+
+def _results(p50, peak_mb, size="1000"):
+    workloads = {name: {"p50": p50} for name in bench.WORKLOADS}
+    return {"sizes": {size: {"workloads": workloads,
+                             "peak_rss": peak_mb * 1024 * 1024}}}
+
+
+def test_summary():
+    samples = [i / 1000 for i in range(1, 101)]
+    summary = bench._summary(samples, rows=1000)
+    assert summary["ops"] == 100
+    assert summary["p50"] == pytest.approx(0.0505)
+    assert summary["p95"] == 0.096
+    assert summary["p99"] == 0.1
+    assert summary["max"] == 0.1
+    assert summary["ops_per_sec"] == pytest.approx(100 / sum(samples))
+    assert summary["rows_per_sec"] == pytest.approx(1000 / sum(samples))
+    assert "rows_per_sec" not in bench._summary([0.0])
+
+
+def test_compare_reports_regressions():
+    baseline = _results(0.001, 50)
+    assert bench.compare(_results(0.0011, 51), baseline, 0.25) == []
+    regressions = bench.compare(_results(0.002, 100), baseline, 0.25)
+    assert len(regressions) == len(bench.WORKLOADS) + 1
+
+
+def test_compare_ignores_small_absolute_changes():
+    # Рост в разы, но на доли микросекунды и мегабайта - это шум, а не регрессия.
+    baseline = _results(0.000001, 1)
+    assert bench.compare(_results(0.000003, 2), baseline, 0.25) == []
+
+
+def test_compare_skips_sizes_missing_in_baseline():
+    assert bench.compare(_results(1.0, 500, "5000"), _results(0.001, 1), 0.25) == []
+
+
+def test_sizes():
+    assert bench._sizes("10,200") == [10, 200]
+    for value in ("", "10,x", "0"):
+        with pytest.raises(argparse.ArgumentTypeError):
+            bench._sizes(value)
+
+
+def test_measure_size(tmp_path):
+    report = bench._measure_size(50, 5, str(tmp_path))
+    assert set(report["workloads"]) == set(bench.WORKLOADS)
+    assert report["workloads"]["bulk_load"]["rows_per_sec"] > 0
+    assert report["workloads"]["delete"]["ops"] == 5
+    assert report["peak_rss"] > 0
+
+
+def test_stress_run(tmp_path):
+    assert stress.run(str(tmp_path / "data"), 2, 1, 20) == []
@@ -0,0 +1,100 @@
+# tests/test_bulk.py
+
+import json
+
+import pytest
+
+from src.primitive_db import DataError, ProgrammingError, bulk, connect
+
+COLUMNS = [("s", "str"), ("a", "int"), ("f", "float"), ("b", "bool")]
+ROWS = [('x, "q"', 1, 0.5, True), (None, None, None, None), ("ü", -2, 1e-7, False)]
+
+
+@pytest.fixture
+def table(connection, monkeypatch):
+    # Маленькие порции: импорт и экспорт проходят через несколько порций.
+    monkeypatch.setattr(bulk, "CHUNK_ROWS", 2)
+    connection.create_table("t", COLUMNS)
+    connection.executemany("insert into t values (?, ?, ?, ?)", ROWS)
+    return connection
+
+
+def _rows(connection, table_name="t"):
+    return connection.execute(f"select from {table_name}").fetchall()
+
+
+@pytest.mark.parametrize("extension", ["csv", "jsonl"])
+def test_export_import_round_trip(table, tmp_path, extension):
+    path = tmp_path / f"t.{extension}"
+    assert table.export_file("t", str(path)) == 3
+    table.create_table("u", COLUMNS)
+    assert table.import_file("u", str(path)) == 3
+    expected = _rows(table)
+    if extension == "csv":
+        # В CSV нет NULL: пустое поле текстового столбца читается как ''.
+        expected[1] = (2, "", None, None, None)
+    assert _rows(table, "u") == expected
+
+
+def test_export_with_where(table, tmp_path):
+    path = tmp_path / "t.jsonl"
+    assert table.export_file("t", str(path), where="a < ? or a is null",
+                             params=(0,)) == 2
+    with open(path, encoding="utf-8") as f:
+        assert [json.loads(line)["ID"] for line in f] == [2, 3]
+
+
+def test_import_ignores_id_column(table, tmp_path):
+    path = tmp_path / "t.csv"
+    path.write_text("ID,b,f,a,s\n100,true,1.5,7,y\n", encoding="utf-8")
+    table.import_file("t", str(path))
+    assert _rows(table)[-1] == (4, "y", 7, 1.5, True)
+
+
+@pytest.mark.parametrize("content", [
+    "s,a,f,b\nq,1,1,true\nw,2,2,false\ne,3,3,true\nr,x,4,true\n",
+    "s,a,f,b\nq,1,1,true\nw,2,2,false\ne,3,3\n",
+    "s,a,f\nq,1,1\n",
+])
+def test_failed_csv_import_leaves_table_unchanged(table, tmp_path, content):
+    path = tmp_path / "bad.csv"
+    path.write_text(content, encoding="utf-8")
+    before = _rows(table)
+    with pytest.raises(DataError):
+        table.import_file("t", str(path))
+    assert _rows(table) == before
+    assert table.table_info("t")["rows"] == 3
+    # ID не израсходованы, и на диске ничего не изменилось.
+    assert table.execute("insert into t values ('z', 9, 9, true)").lastrowid == 4
+    with connect(table.path) as other:
+        assert _rows(other) == before + [(4, "z", 9, 9.0, True)]
+
+
+def test_failed_jsonl_import_leaves_table_unchanged(table, tmp_path):
+    path = tmp_path / "bad.jsonl"
+    lines = [{"s": "q", "a": i, "f": 1, "b": True} for i in range(5)]
+    lines[4]["a"] = 1.5
+    path.write_text("".join(json.dumps(line) + "\n" for line in lines) + "{",
+                    encoding="utf-8")
+    before = _rows(table)
+    with pytest.raises(DataError):
+        table.import_file("t", str(path))
+    assert _rows(table) == before
+
+
+def test_failed_import_inside_transaction(table, tmp_path):
+    path = tmp_path / "bad.csv"
+    path.write_text("s,a,f,b\nq,1,1,true\nr,x,4,true\n", encoding="utf-8")
+    table.begin()
+    table.execute("insert into t values ('z', 9, 9, true)")
+    rows = _rows(table)
+    with pytest.raises(DataError):
+        table.import_file("t", str(path))
+    assert _rows(table) == rows
+    table.commit()
+    assert len(_rows(table)) == 4
+
+
+def test_unknown_format(table, tmp_path):
+    with pytest.raises(ProgrammingError):
+        table.export_file("t", str(tmp_path / "t.xml"))
@@ -0,0 +1,100 @@
+# tests/test_cache.py
+
+import pytest
+
+from src.primitive_db import connect
+from src.primitive_db.cache import QueryCache
+from src.primitive_db.engine import run_cache_stats
+from src.primitive_db.utils import DataDir
+
+
+@pytest.fixture
+def cache(tmp_path):
+    data_dir = DataDir(tmp_path / "data")
+    data_dir.ensure()
+    return QueryCache(data_dir, max_entries=3, max_bytes=10_000)
+
+
+def _get(cache, key, value=None, table_name="t"):
+    return cache(table_name, key, lambda: [key] if value is None else value)
+
+
+def test_lru_keeps_recently_used(cache):
+    for key in ("a", "b", "c"):
+        _get(cache, key)
+    _get(cache, "a")
+    _get(cache, "d")
+    # Вытеснена "b": к ней обращались раньше всех.
+    assert [full_key[-1] for full_key in cache.entries] == ["c", "a", "d"]
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"], stats["evictions"]) == (1, 4, 1)
+    assert stats["entries"] == 3
+    assert stats["hit_rate"] == pytest.approx(1 / 5)
+
+
+def test_size_bound(cache):
+    _get(cache, "big", list(range(2000)))
+    assert cache.stats()["entries"] == 0
+    for key in "abc":
+        _get(cache, key, list(range(100)))
+    assert 0 < cache.size <= cache.max_bytes
+    assert cache.size == sum(size for _, size in cache.entries.values())
+
+
+def test_invalidate_drops_only_that_table(cache):
+    _get(cache, "a")
+    _get(cache, "b", table_name="u")
+    cache.invalidate("t")
+    assert [full_key[0] for full_key in cache.entries] == ["u"]
+    assert cache.stats()["invalidations"] == 1
+    assert cache.size == sum(size for _, size in cache.entries.values())
+
+
+@pytest.fixture
+def table(connection):
+    connection.create_table("t", [("a", "int")])
+    connection.executemany("insert into t values (?)", [(i,) for i in range(10)])
+    return connection
+
+
+def _select(connection):
+    return [row[1] for row in connection.execute("select from t where a > 6")]
+
+
+def test_repeated_select_hits(table):
+    assert _select(table) == [7, 8, 9]
+    assert _select(table) == [7, 8, 9]
+    stats = table.stats()["cache"]
+    assert (stats["hits"], stats["misses"]) == (1, 1)
+
+
+@pytest.mark.parametrize("write, expected", [
+    ("insert into t values (42)", [7, 8, 9, 42]),
+    ("update t set a = 0 where a = 8", [7, 9]),
+    ("delete from t where a = 7", [8, 9]),
+])
+def test_no_stale_reads_after_write(table, write, expected):
+    _select(table)
+    table.execute(write)
+    assert _select(table) == expected
+    assert table.stats()["cache"]["invalidations"] >= 1
+
+
+def test_no_stale_reads_after_other_connection_writes(table):
+    _select(table)
+    with connect(table.path) as other:
+        other.execute("insert into t values (50)")
+    assert _select(table) == [7, 8, 9, 50]
+
+
+def test_cache_stats_command(table, capsys):
+    _select(table)
+    _select(table)
+    run_cache_stats(table, [])
+    rows = dict([cell.strip() for cell in line.strip("|").split("|")]
+                for line in capsys.readouterr().out.splitlines()
+                if line.startswith("|"))
+    assert rows["Попадания"] == "1"
+    assert rows["Промахи"] == "1"
+    assert rows["Доля попаданий"] == "50.00%"
+    assert rows["Записей в кеше"] == "1 / 256"
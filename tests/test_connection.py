@@ -0,0 +1,76 @@
+# tests/test_connection.py
+
+import threading
+
+import pytest
+
+from src.primitive_db import ProgrammingError, connect
+
+ROWS = 200
+
+
+def _fill(connection, name, barrier, errors):
+    try:
+        barrier.wait()
+        for i in range(ROWS):
+            connection.execute(f'insert into t values ("{name}", {i})')
+    except Exception as e:  # ошибка потока проверяется в основном потоке
+        errors.append(e)
+
+
+def test_connections_to_different_paths_in_threads(tmp_path):
+    # Каталог и надежность записи - свои у каждого соединения: записи одного
+    # не попадают в каталог другого.
+    first = connect(tmp_path / "first")
+    second = connect(tmp_path / "second", durability="full")
+    for connection in (first, second):
+        connection.create_table("t", [("name", "str"), ("n", "int")])
+
+    barrier = threading.Barrier(2)
+    errors = []
+    threads = [threading.Thread(target=_fill, args=(connection, name, barrier,
+                                                    errors))
+               for connection, name in ((first, "first"), (second, "second"))]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    first.close()
+    second.close()
+    assert errors == []
+
+    for name in ("first", "second"):
+        with connect(tmp_path / name) as connection:
+            rows = connection.execute("select from t").fetchall()
+        assert len(rows) == ROWS
+        assert {row[1] for row in rows} == {name}
+
+
+def test_durability_is_per_connection(tmp_path):
+    first = connect(tmp_path / "first", durability="off")
+    second = connect(tmp_path / "second")
+    first.set_durability("full")
+    assert first.durability == "full"
+    assert second.durability == "normal"
+    first.close()
+    second.close()
+
+
+def test_unknown_durability(tmp_path):
+    with pytest.raises(ProgrammingError):
+        connect(tmp_path / "data", durability="always")
+    with connect(tmp_path / "data") as connection:
+        with pytest.raises(ProgrammingError):
+            connection.set_durability("always")
+        assert connection.durability == "normal"
+
+
+def test_list_tables_uses_connection_path(tmp_path):
+    first = connect(tmp_path / "first")
+    second = connect(tmp_path / "second")
+    first.create_table("a", [("x", "int")])
+    second.create_table("b", [("x", "int")])
+    assert first.list_tables() == ["a"]
+    assert second.list_tables() == ["b"]
+    first.close()
+    second.close()
@@ -0,0 +1,55 @@
+# tests/test_durability.py
+
+import os
+
+import pytest
+
+from src.primitive_db import connect
+
+
+def _fsyncs(monkeypatch, action):
+    calls = []
+    fsync = os.fsync
+
+    def counting_fsync(fd):
+        calls.append(fd)
+        fsync(fd)
+
+    monkeypatch.setattr(os, "fsync", counting_fsync)
+    action()
+    monkeypatch.setattr(os, "fsync", fsync)
+    return len(calls)
+
+
+@pytest.mark.parametrize("durability, synced", [("off", False), ("normal", False),
+                                                ("full", True)])
+def test_append_is_fsynced_only_with_full(tmp_path, monkeypatch, durability,
+                                          synced):
+    # Дописывание в лог таблицы сбрасывается в ОС при любой надежности,
+    # а fsync выполняется только при full.
+    with connect(tmp_path / "data", durability=durability) as connection:
+        connection.create_table("t", [("a", "int")])
+        calls = _fsyncs(monkeypatch,
+                        lambda: connection.execute("insert into t values (1)"))
+    assert bool(calls) == synced
+
+
+def test_rewrite_is_fsynced_with_normal(tmp_path, monkeypatch):
+    with connect(tmp_path / "data") as connection:
+        connection.create_table("t", [("a", "int")])
+        connection.execute("insert into t values (1)")
+        connection.begin()
+        connection.execute("insert into t values (2)")
+        calls = _fsyncs(monkeypatch, connection.commit)
+    assert calls
+
+
+def test_appended_rows_are_read_back(tmp_path):
+    path = tmp_path / "data"
+    with connect(path, durability="off") as connection:
+        connection.create_table("t", [("a", "int")])
+        for value in range(3):
+            connection.execute("insert into t values (?)", (value,))
+    with connect(path) as connection:
+        assert connection.execute("select from t").fetchall() == [
+            (1, 0), (2, 1), (3, 2)]
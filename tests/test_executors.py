@@ -0,0 +1,124 @@
+# tests/test_executors.py
+
+import random
+
+import pytest
+
+from src.primitive_db.columnar import ColumnarTable
+from src.primitive_db.execution import NumpyExecutor, PythonExecutor
+from src.primitive_db.parallel import ParallelExecutor
+from src.primitive_db.parser import parse_where_clause
+from src.primitive_db.predicates import compile_where
+
+# Без NumPy сравнивать не с чем: исполнитель numpy недоступен.
+pytest.importorskip("numpy")
+
+SCHEMA = {"ID": "integer", "a": "integer", "f": "float", "s": "text",
+          "b": "boolean", "n": "integer"}
+WHERE = [
+    "a = 3", "a != 3", "a < 0", "a <= -10", "a > 20", "a >= 0",
+    "f < 0.5", "f >= -1.25", "s = 'xa'", "s != 'yb'", "s < 'y'", "b = true",
+    "b != false", "n = 1",
+    "a in (1, 2, 3, -4)", "s in ('xa', 'zc')", "b in (false)",
+    "a between -5 and 5", "f between -1 and 1", "s between 'x' and 'y'",
+    "s like 'x%'", "s like '_b'", "s not like '%c'",
+    "a not in (1, 2)", "a not between 0 and 10",
+    "a is null", "f is not null", "s is null", "b is null", "n is null",
+    "a > 0 and b = true", "a < 0 or s = 'zc'", "not (a = 3)",
+    "not (a > 0 and f < 0)", "not (s like 'x%' or b = false)",
+    "(a > 0 or f > 0) and not (b is null)", "not not (a between 1 and 9)",
+    "a is null or a > 25", "not (a is not null and s is not null)",
+    # Условия, которым подходят оба значения bool: строки с NULL не подходят.
+    "b in (true, false)", "b >= false", "b <= true", "b between false and true",
+    "b not in (true)", "not (b = true)", "not (b in (true, false))",
+    "s in ('xa', 'yb', 'zc', 'xb')", "s not in ('xa')", "s >= 'xb'",
+    "s not between 'xb' and 'yb'", "not (s in ('xa', 'yb'))",
+    "f not between -1 and 1", "not (f < 0)", "f in (0.5, -1)",
+    "n in (0, 1, 2)", "n not between 1 and 2", "not (n = 0)",
+]
+
+
+def _value(rng, generate):
+    return None if rng.random() < 0.2 else generate()
+
+
+def _table(size=500, seed=7):
+    rng = random.Random(seed)
+    rows = []
+    for record_id in range(1, size + 1):
+        rows.append({
+            "ID": record_id,
+            "a": _value(rng, lambda: rng.randrange(-30, 30)),
+            "f": _value(rng, lambda: rng.uniform(-2, 2)),
+            "s": _value(rng, lambda: rng.choice(["xa", "yb", "zc", "xb"])),
+            "b": _value(rng, lambda: rng.random() < 0.5),
+            # Столбец без NULL: быстрые пути исполнителей.
+            "n": rng.randrange(3),
+        })
+    return ColumnarTable.from_rows(SCHEMA, rows)
+
+
+@pytest.fixture(scope="module")
+def table():
+    return _table()
+
+
+@pytest.fixture(scope="module")
+def parallel():
+    # Пул из двух процессов и без нижней границы размера: делится любая таблица.
+    executor = ParallelExecutor(PythonExecutor(), 2, min_rows=0)
+    yield executor
+    executor.close()
+
+
+def _filter(executor, table, where, positions=None):
+    predicate = compile_where(parse_where_clause(where), SCHEMA)
+    return executor.filter(table, predicate, positions)
+
+
+@pytest.mark.parametrize("where", WHERE)
+def test_filter_matches_python(table, parallel, where):
+    expected = _filter(PythonExecutor(), table, where)
+    assert _filter(NumpyExecutor(min_rows=0), table, where) == expected
+    assert _filter(parallel, table, where) == expected
+    # Проверка совпадает с проверкой каждой записи-словаря.
+    predicate = compile_where(parse_where_clause(where), SCHEMA)
+    assert expected == [position for position, row in enumerate(table)
+                        if predicate.matches(row)]
+
+
+@pytest.mark.parametrize("where", WHERE)
+def test_filter_subset_matches_python(table, parallel, where):
+    positions = list(range(3, len(table), 3))
+    expected = _filter(PythonExecutor(), table, where, positions)
+    assert _filter(NumpyExecutor(min_rows=0), table, where, positions) == expected
+    assert _filter(parallel, table, where, positions) == expected
+
+
+def test_small_tables_fall_back_to_python(table):
+    executor = NumpyExecutor()
+    assert executor.min_rows > len(table)
+    assert _filter(executor, table, "a > 0") == \
+        _filter(PythonExecutor(), table, "a > 0")
+
+
+@pytest.mark.parametrize("changes", [
+    {"a": 100},
+    {"a": None},
+    {"f": -0.5, "b": None},
+    {"b": True},
+    {"s": "new"},
+    {"s": None, "n": 2},
+])
+def test_set_values_matches_python(changes):
+    expected_table, numpy_table = _table(), _table()
+    positions = _filter(PythonExecutor(), expected_table, "a > 0 or s is null")
+    expected = PythonExecutor().set_values(expected_table, positions, dict(changes))
+    result = NumpyExecutor(min_rows=0).set_values(numpy_table, positions,
+                                                  dict(changes))
+    assert result == expected
+    assert numpy_table.rows() == expected_table.rows()
+    # После изменения условия снова совпадают.
+    for where in ("a is null", "a = 100", "s = 'new'", "b is null", "f < 0"):
+        assert _filter(NumpyExecutor(min_rows=0), numpy_table, where) == \
+            _filter(PythonExecutor(), expected_table, where)
@@ -0,0 +1,49 @@
+# tests/test_indexes.py
+
+import pytest
+
+
+@pytest.fixture
+def nullable(connection):
+    connection.create_table("t", [("a", "int")])
+    connection.executemany("insert into t values (?)",
+                           [(3,), (None,), (1,), (None,), (2,)])
+    return connection
+
+
+@pytest.mark.parametrize("direction", ["asc", "desc"])
+def test_sorted_index_order_keeps_null_rows(nullable, direction):
+    sql = f"select * from t order by a {direction}"
+    expected = nullable.execute(sql).fetchall()
+    nullable.create_index("t", "a", "sorted")
+    assert nullable.execute(sql).fetchall() == expected
+    assert len(expected) == 5
+
+
+def test_sorted_index_order_puts_null_first(nullable):
+    nullable.create_index("t", "a", "sorted")
+    rows = nullable.execute("select * from t order by a limit 3").fetchall()
+    assert rows == [(2, None), (4, None), (3, 1)]
+    rows = nullable.execute("select * from t order by a desc").fetchall()
+    assert [a for _, a in rows] == [3, 2, 1, None, None]
+
+
+def test_hash_index_lookup_skips_null(nullable):
+    nullable.create_index("t", "a", "hash")
+    assert nullable.execute("select * from t where a = 1").fetchall() == [(3, 1)]
+    assert nullable.execute("select ID from t where a is null").fetchall() == \
+        [(2,), (4,)]
+
+
+@pytest.mark.parametrize("direction", ["asc", "desc"])
+@pytest.mark.parametrize("limit", ["", " limit 3", " limit 1", " limit 10"])
+def test_sorted_index_order_matches_sort(connection, direction, limit):
+    # Равные значения идут в порядке ID и по индексу, и при сортировке
+    # (в том числе при отборе первых строк кучей для LIMIT).
+    connection.create_table("t", [("k", "int")])
+    connection.executemany("insert into t values (?)",
+                           [(1,), (2,), (2,), (None,), (3,), (2,), (None,), (3,)])
+    sql = f"select * from t order by k {direction}{limit}"
+    expected = connection.execute(sql).fetchall()
+    connection.create_index("t", "k", "sorted")
+    assert connection.execute(sql).fetchall() == expected
@@ -0,0 +1,134 @@
+# tests/test_joins.py
+
+import random
+
+import pytest
+
+from src.primitive_db import DataError, ProgrammingError, api
+from src.primitive_db.joins import JoinColumns, split_where
+from src.primitive_db.parser import parse_where_clause
+from src.primitive_db.predicates import compile_where
+
+WHERE = [
+    None,
+    "cities.title = 'c1'",
+    "users.age > 40",
+    "users.age > 40 and cities.code < 3",
+    "users.age < 30 or cities.title = 'c2'",
+    "users.name like 'u1%' and users.age is not null",
+]
+
+
+@pytest.fixture
+def connection(connection):
+    rng = random.Random(17)
+    connection.create_table("cities", [("code", "int"), ("title", "str")])
+    connection.executemany("insert into cities values (?, ?)",
+                           [(code, f"c{code % 3}") for code in range(6)])
+    connection.create_table("users", [("name", "str"), ("city", "int"),
+                                      ("age", "int")])
+    connection.executemany(
+        "insert into users values (?, ?, ?)",
+        [(f"u{i}", None if i % 11 == 0 else rng.randrange(8),
+          None if i % 7 == 0 else rng.randrange(18, 70)) for i in range(120)])
+    return connection
+
+
+def _expected(connection, where):
+    # Соединение вложенными циклами по полным таблицам; условие проверяется
+    # на соединенных строках, без переноса на стороны.
+    columns = JoinColumns({"users": connection.table_info("users")["schema"],
+                           "cities": connection.table_info("cities")["schema"]})
+    names = columns.all_columns()
+    predicate = compile_where(parse_where_clause(where), columns.combined_schema()) \
+        if where is not None else None
+    users = connection.execute("select from users").fetchall()
+    cities = connection.execute("select from cities").fetchall()
+    rows = [user + city for user in users for city in cities
+            if user[2] is not None and user[2] == city[1]]
+    return sorted(row for row in rows
+                  if predicate is None or predicate.matches(dict(zip(names, row))))
+
+
+def _join(connection, where):
+    sql = "select * from users join cities on users.city = cities.code"
+    if where is not None:
+        sql += f" where {where}"
+    return sorted(connection.execute(sql).fetchall())
+
+
+@pytest.fixture
+def calls(monkeypatch):
+    # Какое соединение выбрал планировщик.
+    calls = []
+    for name in ("hash_join", "index_join"):
+        function = getattr(api, name)
+
+        def wrapper(*args, name=name, function=function):
+            calls.append(name)
+            return function(*args)
+
+        monkeypatch.setattr(api, name, wrapper)
+    return calls
+
+
+@pytest.mark.parametrize("where", WHERE)
+def test_hash_and_index_join_return_same_rows(connection, calls, where):
+    hashed = _join(connection, where)
+    assert calls == ["hash_join"]
+    connection.create_index("users", "city", "hash")
+    indexed = _join(connection, where)
+    assert calls == ["hash_join", "index_join"]
+    assert indexed == hashed
+
+
+@pytest.mark.parametrize("where", WHERE)
+def test_join_matches_nested_loops(connection, where):
+    rows = _join(connection, where)
+    assert rows == _expected(connection, where)
+    # Строки с NULL в столбце соединения ни с чем не соединяются.
+    assert all(row[2] is not None for row in rows)
+
+
+def test_join_on_id_uses_primary_key(connection, calls):
+    rows = connection.execute("select users.name, cities.title from cities "
+                              "join users on cities.code = users.ID "
+                              "where users.ID < 4").fetchall()
+    assert calls == ["index_join"]
+    assert sorted(rows) == [("u0", "c1"), ("u1", "c2"), ("u2", "c0")]
+
+
+def test_predicates_are_pushed_to_each_side():
+    columns = JoinColumns({"users": {"ID": "integer", "age": "integer"},
+                           "cities": {"ID": "integer", "title": "text"}})
+    pushed, residual = split_where(parse_where_clause(
+        "users.age > 40 and title = 'c1' and (age < 20 or cities.ID = 2)"), columns)
+    assert pushed["users"] == ("cmp", ">", "age", 40)
+    assert pushed["cities"] == ("cmp", "=", "title", "c1")
+    assert set(residual.columns) == {"users.age", "cities.ID"}
+
+    pushed, residual = split_where(parse_where_clause("age > 40"), columns)
+    assert pushed == {"users": ("cmp", ">", "age", 40), "cities": None}
+    assert residual is None
+
+
+def test_pushed_predicate_uses_index(connection):
+    connection.create_index("users", "age", "sorted")
+    profile = connection.explain_analyze(
+        "select * from users join cities on users.city = cities.code "
+        "where users.age between 30 and 32")
+    assert profile["counters"]["index_hits"] >= 1
+    assert profile["counters"]["rows_scanned"] < 120
+
+
+def test_join_errors(connection):
+    with pytest.raises(ProgrammingError):
+        connection.execute("select * from users join users on users.ID = users.ID")
+    with pytest.raises(ProgrammingError):
+        connection.execute("select * from users join cities on ID = cities.code")
+    with pytest.raises(DataError):
+        connection.execute("select * from users join cities "
+                           "on users.name = cities.code")
+    with pytest.raises(ProgrammingError):
+        connection.execute("select count(*) from users join cities "
+                           "on users.city = cities.code")
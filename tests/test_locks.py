@@ -0,0 +1,98 @@
+# tests/test_locks.py
+
+import json
+import os
+import threading
+import time
+
+import pytest
+
+from src.primitive_db import OperationalError, connect
+from src.primitive_db.locks import file_lock, table_lock
+from src.primitive_db.storage import is_log_table
+from src.primitive_db.utils import DataDir, load_metadata
+from src.primitive_db.wal import wal_path, write_locks
+
+pytest.importorskip("fcntl")
+
+
+@pytest.fixture
+def data_dir(tmp_path):
+    return DataDir(tmp_path / "data")
+
+
+def _hold(data_dir, acquired, events, exclusive=True):
+    with table_lock(data_dir, "t", exclusive):
+        events.append("held")
+        acquired.set()
+        time.sleep(0.2)
+        events.append("released")
+
+
+def _wait_for_lock(data_dir, events, exclusive=True):
+    with table_lock(data_dir, "t", exclusive):
+        events.append("acquired")
+
+
+def _run(data_dir, first_exclusive, second_exclusive):
+    acquired = threading.Event()
+    events = []
+    holder = threading.Thread(target=_hold, args=(data_dir, acquired, events,
+                                                  first_exclusive))
+    holder.start()
+    acquired.wait()
+    waiter = threading.Thread(target=_wait_for_lock, args=(data_dir, events,
+                                                           second_exclusive))
+    waiter.start()
+    holder.join()
+    waiter.join()
+    return events
+
+
+def test_threads_exclude_each_other(data_dir):
+    # Блокировки принадлежат потоку: второй поток ждет, пока первый не
+    # отпустит блокировку, даже в том же процессе.
+    assert _run(data_dir, True, True) == ["held", "released", "acquired"]
+
+
+def test_shared_waits_for_exclusive(data_dir):
+    assert _run(data_dir, True, False) == ["held", "released", "acquired"]
+
+
+def test_shared_locks_do_not_wait(data_dir):
+    assert _run(data_dir, False, False) == ["held", "acquired", "released"]
+
+
+def test_reentrant_in_one_thread(data_dir):
+    with table_lock(data_dir, "t"):
+        with table_lock(data_dir, "t"):
+            pass
+        with table_lock(data_dir, "t", exclusive=False):
+            pass
+
+
+def test_upgrade_is_refused(data_dir):
+    # flock повышает блокировку не атомарно, поэтому повышение запрещено:
+    # блокировку для записи нужно брать сразу.
+    with file_lock(data_dir, "t", exclusive=False):
+        with pytest.raises(OperationalError):
+            with file_lock(data_dir, "t"):
+                pass
+    with file_lock(data_dir, "t"):
+        pass
+
+
+def test_write_locks_replay_journal_left_by_crash(data_dir):
+    # Журнал, оставшийся от упавшего процесса, применяется до записи под
+    # исключительной блокировкой метаданных, взятой заново.
+    with connect(data_dir.path) as connection:
+        connection.create_table("t", [("a", "int")])
+    metadata = dict(load_metadata(data_dir), u={"ID": "integer", "a": "integer"})
+    with open(wal_path(data_dir), "w", encoding="utf-8") as f:
+        f.write(json.dumps({"metadata": metadata, "create": {"u": metadata["u"]},
+                            "remove": []}) + "\n")
+
+    with write_locks(data_dir, ["t"]):
+        assert not os.path.exists(wal_path(data_dir))
+        assert is_log_table(data_dir, "u")
+    assert "u" in load_metadata(data_dir)
@@ -0,0 +1,90 @@
+# tests/test_metrics.py
+
+import json
+import threading
+
+from src.primitive_db import connect
+from src.primitive_db.metrics import Profile, count, profiling, stage
+
+
+def _table(connection):
+    connection.create_table("t", [("a", "int")])
+    connection.executemany("insert into t values (?)", [(i,) for i in range(10)])
+
+
+def test_explain_analyze_select(connection):
+    _table(connection)
+    profile = connection.explain_analyze("select from t where a > ?", (6,))
+    assert profile["kind"] == "select"
+    assert {"parse", "filter"} <= set(profile["stages"])
+    assert sum(profile["stages"].values()) <= profile["total"]
+    assert profile["counters"]["rows_returned"] == 3
+    assert profile["counters"]["rows_scanned"] == 10
+
+
+def test_explain_analyze_cold_read(connection):
+    # Новое соединение еще не держит таблицу в памяти и читает ее с диска.
+    _table(connection)
+    with connect(connection.path) as other:
+        profile = other.explain_analyze("select from t")
+    assert "load" in profile["stages"]
+    assert profile["counters"]["rows_loaded"] == 10
+    assert profile["counters"]["bytes_read"] > 0
+
+
+def test_explain_analyze_runs_the_command(connection):
+    _table(connection)
+    profile = connection.explain_analyze("insert into t values (10)")
+    assert profile["kind"] == "insert"
+    assert profile["counters"]["bytes_written"] > 0
+    assert len(connection.execute("select from t").fetchall()) == 11
+
+
+def test_stats_by_kind(connection):
+    _table(connection)
+    assert connection.metrics.stats() == {}
+    connection.metrics.collect = True
+    connection.execute("select from t")
+    connection.execute("select from t where a = 1")
+    connection.execute("insert into t values (10)")
+    stats = connection.metrics.stats()
+    assert stats["select"]["count"] == 2
+    assert stats["insert"]["count"] == 1
+    assert stats["select"]["max"] <= stats["select"]["total"]
+    connection.metrics.reset()
+    assert connection.metrics.stats() == {}
+
+
+def test_metrics_file(connection, tmp_path):
+    _table(connection)
+    path = tmp_path / "metrics.jsonl"
+    connection.metrics.open_file(path)
+    connection.execute("select from t")
+    connection.execute("delete from t where a = 1")
+    connection.metrics.close()
+    with open(path, encoding="utf-8") as f:
+        lines = [json.loads(line) for line in f]
+    assert [line["kind"] for line in lines] == ["select", "delete"]
+
+
+def test_nested_stage_is_not_counted_twice():
+    profile = Profile("select")
+    with profiling(profile):
+        with stage("filter"):
+            with stage("load"):
+                count("rows_loaded", 5)
+    assert profile.stages["filter"] + profile.stages["load"] <= profile.total
+    assert profile.counters == {"rows_loaded": 5}
+
+
+def test_counters_belong_to_the_thread():
+    # Точки замера в другом потоке не пишут в замер этого потока.
+    profile = Profile("select")
+    with profiling(profile):
+        thread = threading.Thread(target=count, args=("rows_loaded", 7))
+        thread.start()
+        thread.join()
+        count("rows_loaded")
+    assert profile.counters == {"rows_loaded": 1}
+    count("rows_loaded")
+    assert profile.counters == {"rows_loaded": 1}
@@ -0,0 +1,144 @@
+# tests/test_output.py
+
+import io
+import json
+import shutil
+
+import pytest
+
+from src.primitive_db import ProgrammingError, connect, engine
+from src.primitive_db.output import write_jsonl, write_table, write_tsv
+
+SIZE = 10000
+PAGES = [(0, 0), (0, 3), (3, 0), (5, 2), (10, 17), (1, SIZE), (4, SIZE + 5),
+         (None, 7), (None, SIZE), (None, SIZE + 1)]
+
+
+@pytest.fixture(scope="module")
+def path(tmp_path_factory):
+    path = tmp_path_factory.mktemp("output") / "data"
+    with connect(path) as connection:
+        connection.create_table("t", [("a", "int"), ("s", "str")])
+        connection.executemany("insert into t values (?, ?)",
+                               [(i % 97, f"s{i}") for i in range(SIZE)])
+    return path
+
+
+@pytest.fixture(scope="module")
+def table(path):
+    # Тесты только читают таблицу, поэтому соединение у них общее; индекс
+    # создается в своей копии каталога.
+    with connect(path) as connection:
+        yield connection
+
+
+def _page(limit, offset):
+    clause = "" if limit is None else f" limit {limit}"
+    return clause + f" offset {offset}" if offset else clause
+
+
+@pytest.mark.parametrize("limit, offset", PAGES)
+@pytest.mark.parametrize("query", [
+    "select from t",
+    "select from t where a < 10",
+    "select from t order by a desc",
+    "select a, s from t where a > 50 order by s",
+    "select a, count(*) from t group by a order by a",
+])
+def test_limit_offset_slices_full_result(table, query, limit, offset):
+    rows = table.execute(query).fetchall()
+    stop = None if limit is None else offset + limit
+    assert table.execute(query + _page(limit, offset)).fetchall() == \
+        rows[offset:stop]
+
+
+@pytest.fixture(scope="module")
+def indexed(path, tmp_path_factory):
+    copy = tmp_path_factory.mktemp("indexed") / "data"
+    shutil.copytree(path, copy)
+    with connect(copy) as connection:
+        connection.create_index("t", "a", "sorted")
+    return copy
+
+
+@pytest.mark.parametrize("limit, offset", PAGES)
+def test_limit_offset_over_sorted_index(table, indexed, limit, offset):
+    query = "select from t order by a"
+    rows = table.execute(query).fetchall()
+    with connect(indexed) as connection:
+        result = connection.execute(query + _page(limit, offset)).fetchall()
+    stop = None if limit is None else offset + limit
+    assert result == rows[offset:stop]
+
+
+def test_limit_stops_scan_early(table):
+    profile = table.explain_analyze("select from t where a < 50 limit 5")
+    assert profile["counters"]["rows_returned"] == 5
+    assert profile["counters"]["rows_scanned"] < SIZE
+
+
+def test_rowcount(table):
+    assert table.execute("select from t limit 5 offset 9998").rowcount == 2
+    # С условием число строк заранее неизвестно.
+    assert table.execute("select from t where a = 1 limit 5").rowcount == -1
+
+
+@pytest.mark.parametrize("clause", ["limit -1", "limit x", "offset 1.5",
+                                    "limit 2 offset -3"])
+def test_invalid_limit(table, clause):
+    with pytest.raises(ProgrammingError):
+        table.execute(f"select from t {clause}")
+
+
+ROWS = [(1, "a\tb", None, True), (2, "line\nbreak \\ ü", 1.5, False)]
+NAMES = ["ID", "s", "f", "b"]
+
+
+def test_write_tsv():
+    out = io.StringIO()
+    assert write_tsv(out, NAMES, iter(ROWS)) == 2
+    assert out.getvalue().splitlines() == [
+        "ID\ts\tf\tb", "1\ta\\tb\t\\N\tTrue", "2\tline\\nbreak \\\\ ü\t1.5\tFalse"]
+
+
+def test_write_jsonl():
+    out = io.StringIO()
+    assert write_jsonl(out, NAMES, iter(ROWS)) == 2
+    assert [json.loads(line) for line in out.getvalue().splitlines()] == [
+        {"ID": 1, "s": "a\tb", "f": None, "b": True},
+        {"ID": 2, "s": "line\nbreak \\ ü", "f": 1.5, "b": False}]
+
+
+def test_write_table_chunks_and_empty():
+    # Строк больше одной порции, и длинное значение во второй порции
+    # расширяет столбец: выводится новая линия рамки.
+    rows = [(i, "x") for i in range(1500)] + [(1500, "much longer value")]
+    out = io.StringIO()
+    assert write_table(out, ["ID", "s"], iter(rows)) == 1501
+    lines = out.getvalue().splitlines()
+    assert sum(1 for line in lines if line.startswith("|")) == 1501 + 1
+    assert lines[-2].startswith("| 1500 | much longer value")
+    assert len(set(line for line in lines if line.startswith("+"))) == 2
+
+    out = io.StringIO()
+    assert write_table(out, ["ID", "s"], iter([])) == 0
+    assert [line for line in out.getvalue().splitlines()
+            if line.startswith("|")] == ["| ID | s |"]
+    assert write_table(io.StringIO(), ["a"], iter([(None,)])) == 1
+
+
+@pytest.mark.parametrize("output_format, expected", [
+    ("tsv", ["ID\ta\ts", "3\t2\ts2", "4\t3\ts3"]),
+    ("jsonl", ['{"ID": 3, "a": 2, "s": "s2"}', '{"ID": 4, "a": 3, "s": "s3"}']),
+])
+def test_console_output_format(table, monkeypatch, capsys, output_format, expected):
+    monkeypatch.setitem(engine._output, "format", "table")
+    engine.run_set(table, ["set", "output", output_format])
+    capsys.readouterr()
+    engine.run_statement(table, table.statement("select from t limit 2 offset 2"))
+    assert capsys.readouterr().out.splitlines() == expected
+    # LIMIT 0 и OFFSET за концом: только заголовок (для tsv) или ничего.
+    for clause in ("limit 0", f"offset {SIZE}"):
+        engine.run_statement(table, table.statement(f"select from t {clause}"))
+        header = expected[:1] if output_format == "tsv" else []
+        assert capsys.readouterr().out.splitlines() == header
@@ -0,0 +1,70 @@
+# tests/test_parallel.py
+
+import random
+
+import pytest
+
+from src.primitive_db.aggregates import parse_select_item
+from src.primitive_db.columnar import ColumnarTable
+from src.primitive_db.execution import PythonExecutor
+from src.primitive_db.parallel import ParallelExecutor
+from src.primitive_db.parser import parse_where_clause
+from src.primitive_db.predicates import compile_where
+
+SCHEMA = {"ID": "integer", "g": "text", "a": "integer", "f": "float"}
+ITEMS = ["count(*)", "count(a)", "sum(a)", "avg(a)", "min(a)", "max(a)",
+         "sum(f)", "avg(f)", "min(f)", "max(f)"]
+
+
+@pytest.fixture(scope="module")
+def table():
+    rng = random.Random(18)
+    rows = [{"ID": record_id, "g": rng.choice(["x", "y", "z"]),
+             "a": None if rng.random() < 0.1 else rng.randrange(-1000, 1000),
+             "f": None if rng.random() < 0.1 else rng.random()}
+            for record_id in range(1, 5001)]
+    return ColumnarTable.from_rows(SCHEMA, rows)
+
+
+@pytest.fixture(scope="module")
+def parallel():
+    executor = ParallelExecutor(PythonExecutor(), 3, min_rows=0)
+    yield executor
+    executor.close()
+
+
+def _same(left, right):
+    # Целые и границы совпадают точно; суммы float - с точностью до округления
+    # при сложении частей.
+    assert len(left) == len(right)
+    for left_row, right_row in zip(left, right):
+        assert left_row == pytest.approx(right_row, rel=1e-12)
+        assert [value for value in left_row if not isinstance(value, float)] == \
+            [value for value in right_row if not isinstance(value, float)]
+
+
+@pytest.mark.parametrize("where", ["a > 0", "f < 0.3 or a is null", "g = 'y'"])
+def test_filter_matches_serial(table, parallel, where):
+    predicate = compile_where(parse_where_clause(where), SCHEMA)
+    expected = PythonExecutor().filter(table, predicate)
+    assert parallel.filter(table, predicate) == expected
+    positions = expected[::2]
+    assert parallel.filter(table, predicate, positions) == \
+        PythonExecutor().filter(table, predicate, positions)
+
+
+@pytest.mark.parametrize("group_by", [[], ["g"]])
+def test_aggregate_matches_serial(table, parallel, group_by):
+    items = [*group_by, *map(parse_select_item, ITEMS)]
+    positions = range(len(table))
+    expected = sorted(PythonExecutor().aggregate(table, positions, items, group_by))
+    result = sorted(parallel.aggregate(table, positions, items, group_by))
+    _same(result, expected)
+
+
+def test_aggregate_over_subset_matches_serial(table, parallel):
+    items = list(map(parse_select_item, ITEMS))
+    predicate = compile_where(parse_where_clause("a > 100"), SCHEMA)
+    positions = PythonExecutor().filter(table, predicate)
+    _same(parallel.aggregate(table, positions, items, []),
+          PythonExecutor().aggregate(table, positions, items, []))
@@ -0,0 +1,59 @@
+# tests/test_predicates.py
+
+import pytest
+
+from src.primitive_db.errors import DataError
+from src.primitive_db.parser import parse_where_clause
+from src.primitive_db.predicates import compile_where
+
+SCHEMA = {"ID": "integer", "a": "integer", "s": "text", "f": "float",
+          "b": "boolean"}
+ROWS = [
+    {"ID": 1, "a": 3, "s": "x", "f": 1.0, "b": True},
+    {"ID": 2, "a": None, "s": None, "f": None, "b": None},
+    {"ID": 3, "a": 1, "s": "y", "f": 2.5, "b": False},
+    {"ID": 4, "a": 5, "s": "xz", "f": None, "b": True},
+]
+
+
+def matching_ids(where):
+    predicate = compile_where(parse_where_clause(where), SCHEMA)
+    return [row["ID"] for row in ROWS if predicate.matches(row)]
+
+
+@pytest.mark.parametrize("negated, direct", [
+    ("not (a = 3)", "a != 3"),
+    ("not (a < 3)", "a >= 3"),
+    ("not (a in (1, 3))", "a not in (1, 3)"),
+    ("not (a between 2 and 4)", "a not between 2 and 4"),
+    ("not (s like 'x%')", "s not like 'x%'"),
+    ("not (a is null)", "a is not null"),
+    ("not (a = 3 and b = true)", "a != 3 or b != true"),
+    ("not (a = 3 or f > 2)", "a != 3 and f <= 2"),
+])
+def test_not_matches_direct_form(negated, direct):
+    assert matching_ids(negated) == matching_ids(direct)
+
+
+@pytest.mark.parametrize("where, expected", [
+    ("a != 3", [3, 4]),
+    ("not (a = 3)", [3, 4]),
+    ("not (a = 3 or f > 2)", []),
+    ("not not (a = 3)", [1]),
+    ("a is null", [2]),
+    ("not (b = true)", [3]),
+    ("s not like 'x%'", [3]),
+])
+def test_value_tests_never_match_null(where, expected):
+    assert matching_ids(where) == expected
+
+
+def test_null_parameter_is_rejected():
+    # a = ? с параметром None: сравнение с NULL всегда ложно.
+    with pytest.raises(DataError):
+        compile_where(("cmp", "=", "a", None), SCHEMA)
+
+
+def test_negated_conditions_are_not_index_constraints():
+    predicate = compile_where(parse_where_clause("not (a = 3) and s = 'x'"), SCHEMA)
+    assert predicate.constraints == {"s": {"eq": "x"}}
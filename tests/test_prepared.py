@@ -0,0 +1,99 @@
+# tests/test_prepared.py
+
+import pytest
+
+from src.primitive_db import DataError, ProgrammingError, connect
+from src.primitive_db.decorators import set_auto_confirm
+from src.primitive_db.engine import run_batch
+
+
+@pytest.fixture
+def table(connection):
+    connection.create_table("t", [("a", "int"), ("s", "str")])
+    return connection
+
+
+def test_parameters_are_bound_in_order(table):
+    insert = table.prepare("ins", "insert into t values (?, ?)")
+    select = table.prepare("sel", "select from t where a > ? and s != ?")
+    update = table.prepare("upd", "update t set s = ? where ID = ?")
+    assert (insert.param_count, select.param_count, update.param_count) == (2, 2, 2)
+    for values in [(1, "x"), (2, "y"), (3, "z")]:
+        table.execute(insert, values)
+    assert table.execute(select, (1, "z")).fetchall() == [(2, 2, "y")]
+    table.execute(update, ("q", 1))
+    assert table.execute(select, (0, "y")).fetchall() == [(1, 1, "q"), (3, 3, "z")]
+    assert table.prepared_statement("sel") is select
+
+
+@pytest.mark.parametrize("sql, params, error", [
+    ("insert into t values (?, ?)", (1,), ProgrammingError),
+    ("insert into t values (?, ?)", (1, "x", 2), ProgrammingError),
+    ("select from t where a > ?", (), ProgrammingError),
+    ("insert into t values (?, ?)", ("x", "y"), DataError),
+    ("select from t where a > ?", ("x",), DataError),
+    ("update t set a = ? where ID = ?", (1.5, 1), DataError),
+])
+def test_wrong_parameters(table, sql, params, error):
+    statement = table.prepare("q", sql)
+    table.execute("insert into t values (1, 'x')")
+    with pytest.raises(error):
+        table.execute(statement, params)
+    assert table.execute("select from t").fetchall() == [(1, 1, "x")]
+
+
+def test_plan_is_rebuilt_after_schema_change(table):
+    # Условие без параметров компилируется один раз на схему: после
+    # пересоздания таблицы оно строится заново по новой схеме.
+    fixed = table.prepare("fixed", "select from t where a = 1")
+    select = table.prepare("sel", "select from t where a > ?")
+    table.execute("insert into t values (1, 'x')")
+    assert table.execute(fixed).fetchall() == [(1, 1, "x")]
+
+    table.drop_table("t")
+    table.create_table("t", [("a", "str"), ("s", "str"), ("n", "int")])
+    table.execute("insert into t values ('1', 'b', 3)")
+    assert table.execute(select, ("0",)).fetchall() == [(1, "1", "b", 3)]
+    with pytest.raises(DataError):
+        table.execute(fixed)
+
+    # Таблицу пересоздало другое соединение.
+    with connect(table.path) as other:
+        other.drop_table("t")
+        other.create_table("t", [("s", "str"), ("a", "int")])
+        other.execute("insert into t values ('w', 1)")
+    assert table.execute(fixed).fetchall() == [(1, "w", 1)]
+    assert table.execute(select, (0,)).fetchall() == [(1, "w", 1)]
+
+
+def test_deallocate_and_errors(table):
+    table.prepare("q", "select from t")
+    table.deallocate("q")
+    with pytest.raises(ProgrammingError):
+        table.prepared_statement("q")
+    with pytest.raises(ProgrammingError):
+        table.deallocate("q")
+    with pytest.raises(ProgrammingError):
+        table.prepare("q", "create_table u a:int")
+
+
+def test_console_prepare_and_execute(tmp_path, monkeypatch, capsys):
+    monkeypatch.chdir(tmp_path)
+    set_auto_confirm(False)
+    try:
+        assert run_batch(["create_table t a:int s:str",
+                          "prepare ins as insert into t values (?, ?)",
+                          "execute ins (1, 'x')",
+                          "execute ins (2, 'y')",
+                          "prepare sel as select from t where a > ?",
+                          "execute sel (1)",
+                          "execute ins (1)"], quiet=True) == 1
+    finally:
+        set_auto_confirm(None)
+    errors = capsys.readouterr().err.splitlines()
+    assert len(errors) == 1
+    assert errors[0].startswith("Команда 7: ")
+    assert "Неверное количество параметров" in errors[0]
+    with connect(tmp_path / "data") as connection:
+        assert connection.execute("select from t").fetchall() == [(1, 1, "x"),
+                                                                  (2, 2, "y")]
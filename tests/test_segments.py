@@ -0,0 +1,100 @@
+# tests/test_segments.py
+
+import os
+
+import pytest
+
+from src.primitive_db import connect, storage
+from src.primitive_db.storage import (
+    fold_log,
+    read_header,
+    segment_path,
+    segments_path,
+)
+
+
+@pytest.fixture
+def table(connection, monkeypatch):
+    # Сегменты по 4 строки: 12 строк ложатся в три сегмента с зонными
+    # картами a 10..40, 50..80 и 90..120.
+    monkeypatch.setattr(storage, "SEGMENT_ROWS", 4)
+    connection.create_table("t", [("a", "int")])
+    connection.executemany("insert into t values (?)",
+                           [(i * 10,) for i in range(1, 13)])
+    assert connection.table_info("t")["segments"] == 3
+    return connection
+
+
+def _select(path, where):
+    # Свежее соединение: таблица не в памяти и читается по зонным картам.
+    with connect(path) as connection:
+        return connection.execute(f"select from t where {where}").fetchall()
+
+
+def _segments(connection):
+    segments = read_header(connection.data_dir, "t")["segments"]
+    return {meta["file"]: os.stat(segment_path(connection.data_dir, "t", meta))
+            for meta in segments}
+
+
+def test_select_reads_only_matching_segments(table):
+    with connect(table.path) as connection:
+        profile = connection.explain_analyze("select from t where a > 100")
+        assert profile["counters"]["rows_loaded"] == 4
+        assert connection.execute("select from t where a > 100").fetchall() == [
+            (11, 110), (12, 120)]
+
+
+@pytest.mark.parametrize("fold", [False, True])
+def test_row_moved_out_of_segment_range(table, fold):
+    # Строка уходит за границы зонной карты своего сегмента: до переноса лога
+    # в сегменты ее находит чтение сегмента с изменениями, после - новая
+    # зонная карта переписанного сегмента.
+    table.execute("update t set a = 1000 where ID = 2")
+    if fold:
+        fold_log(table.data_dir, "t")
+    assert _select(table.path, "a > 500") == [(2, 1000)]
+    assert _select(table.path, "a = 20") == []
+
+    table.execute("delete from t where ID = 2")
+    assert table.execute("insert into t values (1000)").lastrowid == 13
+    if fold:
+        fold_log(table.data_dir, "t")
+    assert _select(table.path, "a > 500") == [(13, 1000)]
+    assert _select(table.path, "a <= 40") == [(1, 10), (3, 30), (4, 40)]
+    assert _select(table.path, "a >= 90") == [(9, 90), (10, 100), (11, 110),
+                                               (12, 120), (13, 1000)]
+
+
+def test_fold_rewrites_only_affected_segments(table):
+    before = _segments(table)
+    first, second, third = before
+
+    # Изменен только второй сегмент.
+    table.execute("update t set a = 55 where ID = 6")
+    fold_log(table.data_dir, "t")
+    after = _segments(table)
+    assert list(after)[0] == first and list(after)[2] == third
+    assert list(after)[1] not in before
+    for name in (first, third):
+        assert after[name].st_ino == before[name].st_ino
+        assert after[name].st_mtime_ns == before[name].st_mtime_ns
+    assert sorted(os.listdir(segments_path(table.data_dir, "t"))) == sorted(after)
+
+    # Последний сегмент полон: новая строка ложится в новый сегмент.
+    table.execute("insert into t values (130)")
+    fold_log(table.data_dir, "t")
+    names = list(_segments(table))
+    assert names[:3] == list(after) and len(names) == 4
+
+    # Удаление из первого сегмента и вставка в неполный последний
+    # переписывают только эти два сегмента.
+    table.execute("delete from t where ID = 1")
+    table.execute("insert into t values (140)")
+    fold_log(table.data_dir, "t")
+    final = list(_segments(table))
+    assert final[1:3] == names[1:3]
+    assert final[0] not in names and final[3] not in names
+    assert _select(table.path, "a > 0") == [
+        (2, 20), (3, 30), (4, 40), (5, 50), (6, 55), (7, 70), (8, 80),
+        (9, 90), (10, 100), (11, 110), (12, 120), (13, 130), (14, 140)]
@@ -0,0 +1,110 @@
+# tests/test_server.py
+
+import asyncio
+import threading
+
+import pytest
+
+from src.primitive_db import DataError, TableNotFoundError
+from src.primitive_db.client import PIPELINE_WINDOW, Client, ClientPool
+from src.primitive_db.server import Server
+
+
+@pytest.fixture
+def port(tmp_path):
+    # Сервер на свободном порту localhost; цикл asyncio - в отдельном потоке.
+    loop = asyncio.new_event_loop()
+    thread = threading.Thread(target=loop.run_forever)
+    thread.start()
+    server = asyncio.run_coroutine_threadsafe(
+        Server(tmp_path / "data").start(port=0), loop).result(10)
+    with Client(port=server.address()[1]) as client:
+        client.call("create_table", "t", [["name", "str"], ["n", "int"]])
+    yield server.address()[1]
+    asyncio.run_coroutine_threadsafe(server.close(), loop).result(10)
+    loop.call_soon_threadsafe(loop.stop)
+    thread.join()
+    loop.close()
+
+
+def test_execute_and_errors(port):
+    with Client(port=port) as client:
+        assert client.execute("insert into t values (?, ?)", ("a", 1)).lastrowid == 1
+        result = client.execute("select from t where n = ?", (1,))
+        assert result.columns == ("ID", "name", "n")
+        assert result.rows == [(1, "a", 1)]
+        with pytest.raises(DataError):
+            client.execute("insert into t values (?, ?)", ("b", "x"))
+        with pytest.raises(TableNotFoundError):
+            client.execute("select from missing")
+        assert client.call("table_info", "t")["rows"] == 1
+
+
+def test_pipeline_keeps_order(port):
+    # Запросов больше, чем окно конвейера: ответы все равно идут по порядку.
+    count = PIPELINE_WINDOW * 2 + 5
+    with Client(port=port) as client:
+        pipeline = client.pipeline()
+        for i in range(count):
+            pipeline.execute("insert into t values (?, ?)", (f"r{i}", i))
+        results = pipeline.run()
+        assert [result.lastrowid for result in results] == list(range(1, count + 1))
+        assert client.call("table_info", "t")["rows"] == count
+
+
+def test_pipeline_error_keeps_client_in_sync(port):
+    with Client(port=port) as client:
+        pipeline = client.pipeline()
+        pipeline.execute("insert into t values (?, ?)", ("a", 1))
+        pipeline.execute("insert into t values (?, ?)", ("b", "x"))
+        pipeline.execute("insert into t values (?, ?)", ("c", 3))
+        with pytest.raises(DataError):
+            pipeline.run()
+        # Ответы на все запросы пачки прочитаны: следующий запрос получает свой.
+        rows = client.execute("select from t").rows
+    assert [row[1] for row in rows] == ["a", "c"]
+
+
+def test_pool_from_threads(port):
+    ids = []
+    lock = threading.Lock()
+
+    def insert(worker):
+        for i in range(25):
+            record_id = pool.execute("insert into t values (?, ?)",
+                                     (f"w{worker}", i)).lastrowid
+            with lock:
+                ids.append(record_id)
+
+    with ClientPool(port=port, max_size=4) as pool:
+        threads = [threading.Thread(target=insert, args=(worker,))
+                   for worker in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        assert sorted(ids) == list(range(1, 201))
+        assert pool.call("table_info", "t")["rows"] == 200
+
+
+def test_transaction_blocks_other_clients(port):
+    result = []
+    with Client(port=port) as owner, Client(port=port) as other:
+        owner.call("begin")
+        owner.execute("insert into t values (?, ?)", ("a", 1))
+        thread = threading.Thread(
+            target=lambda: result.append(other.execute("select from t").rows))
+        thread.start()
+        thread.join(timeout=0.2)
+        assert thread.is_alive()
+        owner.call("commit")
+        thread.join(timeout=5)
+    assert result == [[(1, "a", 1)]]
+
+
+def test_disconnect_rolls_back(port):
+    with Client(port=port) as client:
+        client.call("begin")
+        client.execute("insert into t values (?, ?)", ("a", 1))
+    with Client(port=port) as client:
+        assert client.execute("select from t").rows == []
@@ -0,0 +1,65 @@
+# tests/test_snapshot.py
+
+import json
+import threading
+
+import pytest
+
+from src.primitive_db import connect
+from src.primitive_db.locks import table_lock
+from src.primitive_db.storage import log_path, read_state, read_table_log
+from src.primitive_db.utils import DataDir
+
+
+@pytest.fixture
+def data_dir(tmp_path):
+    data_dir = DataDir(tmp_path / "data")
+    with connect(data_dir.path) as connection:
+        connection.create_table("t", [("a", "int")])
+        connection.executemany("insert into t values (?)", [(1,), (2,)])
+    return data_dir
+
+
+def _values(connection):
+    return [row[1] for row in connection.execute("select from t")]
+
+
+def test_unfinished_batch_is_not_visible(data_dir):
+    # Пачка, которую другой процесс еще дописывает: у ее записей состояние
+    # без статистики, завершающей пачку.
+    state = read_state(data_dir, "t")
+    state.pop("stats")
+    with open(log_path(data_dir, "t"), "a", encoding="utf-8") as f:
+        f.write(json.dumps({"op": "i", "row": {"ID": 3, "a": 3},
+                            "state": dict(state, next_id=4, rows=3)}) + "\n")
+    table = read_table_log(data_dir, "t")[1]
+    assert list(table.ids.values()) == [1, 2]
+
+
+def test_other_connection_sees_completed_writes(data_dir):
+    reader = connect(data_dir.path)
+    writer = connect(data_dir.path)
+    assert _values(reader) == [1, 2]
+    writer.execute("insert into t values (3)")
+    assert _values(reader) == [1, 2, 3]
+
+    writer.begin()
+    writer.execute("insert into t values (4)")
+    writer.execute("delete from t where a = 1")
+    assert _values(reader) == [1, 2, 3]
+    writer.commit()
+    assert _values(reader) == [2, 3, 4]
+    reader.close()
+    writer.close()
+
+
+def test_reads_do_not_wait_for_writers(data_dir):
+    # Чтение не берет блокировок: select выполняется, пока другой поток
+    # держит блокировку таблицы для записи.
+    result = []
+    with connect(data_dir.path) as reader, table_lock(data_dir, "t"):
+        thread = threading.Thread(target=lambda: result.append(_values(reader)))
+        thread.start()
+        thread.join(timeout=5)
+        assert not thread.is_alive()
+    assert result == [[1, 2]]
@@ -0,0 +1,167 @@
+# tests/test_tables.py
+
+import json
+import threading
+
+import pytest
+
+from src.primitive_db import connect
+from src.primitive_db.tables import WRITE_AT_EXIT
+
+
+def _deferred(path):
+    connection = connect(path)
+    connection.tables.write_back = WRITE_AT_EXIT
+    return connection
+
+
+def _name_of(connection, record_id, table_name="t"):
+    return connection.execute(f"select from {table_name} where ID = ?",
+                              (record_id,)).fetchone()[1]
+
+
+def test_lastrowid_is_final_with_deferred_write_back(tmp_path):
+    # Вставка при отложенной записи все равно пишется сразу: ID, который
+    # получил вызывающий код, не достается строке другого соединения.
+    path = tmp_path / "data"
+    with connect(path) as connection:
+        connection.create_table("t", [("name", "str")])
+    first = _deferred(path)
+    second = connect(path)
+    ids = {}
+    for connection, name in ((first, "a1"), (second, "b1"), (first, "a2")):
+        ids[name] = connection.execute("insert into t values (?)", (name,)).lastrowid
+    first.close()
+    second.close()
+
+    assert len(set(ids.values())) == 3
+    with connect(path) as connection:
+        for name, record_id in ids.items():
+            assert _name_of(connection, record_id) == name
+
+
+def _insert_rows(path, prefix, barrier, ids, errors):
+    try:
+        connection = _deferred(path)
+        barrier.wait()
+        for i in range(50):
+            name = f"{prefix}{i}"
+            ids[name] = connection.execute("insert into t values (?)",
+                                           (name,)).lastrowid
+        connection.close()
+    except Exception as e:  # ошибка потока проверяется в основном потоке
+        errors.append(e)
+
+
+def test_lastrowid_from_threads(tmp_path):
+    path = tmp_path / "data"
+    with connect(path) as connection:
+        connection.create_table("t", [("name", "str")])
+    barrier = threading.Barrier(2)
+    ids = {}
+    errors = []
+    threads = [threading.Thread(target=_insert_rows,
+                                args=(path, prefix, barrier, ids, errors))
+               for prefix in ("a", "b")]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert errors == []
+
+    assert len(set(ids.values())) == 100
+    with connect(path) as connection:
+        rows = dict((row[0], row[1]) for row in
+                    connection.execute("select from t").fetchall())
+    assert rows == {record_id: name for name, record_id in ids.items()}
+
+
+def test_stale_json_write_keeps_other_changes(tmp_path):
+    # Таблица в старом формате .json переписывается целиком: отложенные
+    # изменения одного соединения применяются к строкам, которые записало
+    # другое, а не затирают их.
+    path = tmp_path / "data"
+    path.mkdir()
+    (path / "db_meta.json").write_text(
+        json.dumps({"t": {"ID": "integer", "name": "text"}}), encoding="utf-8")
+    (path / "t.json").write_text(
+        json.dumps([{"ID": 1, "name": "a"}, {"ID": 2, "name": "b"}]),
+        encoding="utf-8")
+
+    first = _deferred(path)
+    second = connect(path)
+    first.execute('update t set name = "a2" where ID = 1')
+    second.execute('update t set name = "b2" where ID = 2')
+    second.execute('insert into t values ("c")')
+    first.execute("delete from t where ID = 2")
+    first.close()
+    second.close()
+
+    rows = json.loads((path / "t.json").read_text(encoding="utf-8"))
+    assert rows == [{"ID": 1, "name": "a2"}, {"ID": 3, "name": "c"}]
+
+
+@pytest.fixture
+def pool(tmp_path):
+    # Три таблицы одного размера; в пул помещаются только две из них.
+    path = tmp_path / "data"
+    with connect(path) as connection:
+        for table_name in ("a", "b", "c"):
+            connection.create_table(table_name, [("name", "str")])
+            connection.executemany(f"insert into {table_name} values (?)",
+                                   [(f"{table_name}{i}",) for i in range(100)])
+    connection = connect(path)
+    connection.tables.max_bytes = connection.tables._entry("a").size * 5 // 2
+    yield connection
+    connection.close()
+
+
+def test_pool_evicts_least_recently_used(pool):
+    tables = pool.tables
+    for table_name in ("b", "a", "c"):
+        tables.get(table_name)
+    # Вытеснена "b": к ней обращались раньше всех.
+    assert list(tables.entries) == ["a", "c"]
+    tables.get("b")
+    assert list(tables.entries) == ["c", "b"]
+    stats = tables.stats()
+    assert stats["tables"] == 2
+    assert stats["bytes"] == tables.size <= stats["max_bytes"]
+    assert tables.size == sum(entry.size for entry in tables.entries.values())
+
+
+def test_evicted_dirty_table_is_written(pool):
+    pool.tables.write_back = WRITE_AT_EXIT
+    pool.execute('update a set name = "x" where ID = 1')
+    assert pool.tables.stats()["dirty"] == 1
+    with connect(pool.path) as other:
+        assert _name_of(other, 1, "a") == "a0"
+
+    # Вытеснение измененной таблицы записывает ее изменения на диск.
+    pool.tables.get("b")
+    pool.tables.get("c")
+    assert list(pool.tables.entries) == ["b", "c"]
+    assert pool.tables.stats()["dirty"] == 0
+    with connect(pool.path) as other:
+        assert _name_of(other, 1, "a") == "x"
+    assert _name_of(pool, 1, "a") == "x"
+
+
+@pytest.mark.parametrize("write_back", [WRITE_AT_EXIT, 3])
+def test_dirty_tables_are_written_on_flush(pool, write_back):
+    pool.tables.write_back = write_back
+    pool.execute('update a set name = "x" where ID = 1')
+    pool.execute('update b set name = "y" where ID = 1')
+    assert pool.tables.stats()["dirty"] == 2
+    with connect(pool.path) as other:
+        assert (_name_of(other, 1, "a"), _name_of(other, 1, "b")) == ("a0", "b0")
+
+    if write_back == WRITE_AT_EXIT:
+        pool.flush()
+    else:
+        # Третья операция: изменения записываются каждые три операции.
+        pool.execute('update a set name = "z" where ID = 2')
+    assert pool.tables.stats()["dirty"] == 0
+    with connect(pool.path) as other:
+        assert _name_of(other, 1, "a") == "x"
+        assert _name_of(other, 1, "b") == "y"
@@ -0,0 +1,108 @@
+# tests/test_transactions.py
+
+import pytest
+
+from src.primitive_db import OperationalError, ProgrammingError, connect
+
+
+@pytest.fixture
+def path(tmp_path):
+    path = tmp_path / "data"
+    with connect(path) as connection:
+        connection.create_table("t", [("name", "str"), ("n", "int")])
+        connection.executemany("insert into t values (?, ?)",
+                               [("a", 1), ("b", 2), ("c", 3)])
+    return path
+
+
+def _rows(connection):
+    return connection.execute("select from t").fetchall()
+
+
+def test_reads_own_writes(path):
+    with connect(path) as connection:
+        connection.begin()
+        assert connection.in_transaction
+        assert connection.execute("insert into t values ('d', 4)").lastrowid == 4
+        connection.execute("update t set n = 20 where name = 'b'")
+        connection.execute("delete from t where n = 1")
+        assert _rows(connection) == [(2, "b", 20), (3, "c", 3), (4, "d", 4)]
+        assert connection.execute("select count(*) from t").fetchall() == [(3,)]
+        connection.rollback()
+
+
+def test_rollback_discards_writes(path):
+    with connect(path) as connection:
+        before = _rows(connection)
+        connection.begin()
+        connection.execute("insert into t values ('d', 4)")
+        connection.execute("update t set n = 0 where ID > 0")
+        connection.execute("delete from t where name = 'a'")
+        assert connection.rollback() == ["t"]
+        assert not connection.in_transaction
+        assert _rows(connection) == before
+        # ID отмененной вставки снова свободен.
+        assert connection.execute("insert into t values ('e', 5)").lastrowid == 4
+    with connect(path) as connection:
+        assert _rows(connection) == before + [(4, "e", 5)]
+
+
+def test_commit_persists_across_reopen(path):
+    with connect(path) as connection:
+        connection.begin()
+        connection.execute("insert into t values ('d', 4)")
+        connection.execute("delete from t where name = 'a'")
+        connection.commit()
+    with connect(path) as connection:
+        assert _rows(connection) == [(2, "b", 2), (3, "c", 3), (4, "d", 4)]
+
+
+def test_context_manager_commits_or_rolls_back(path):
+    with connect(path) as connection:
+        connection.begin()
+        connection.execute("insert into t values ('d', 4)")
+    with pytest.raises(RuntimeError):
+        with connect(path) as connection:
+            connection.begin()
+            connection.execute("delete from t where ID > 0")
+            raise RuntimeError
+    with connect(path) as connection:
+        assert len(_rows(connection)) == 4
+
+
+def test_other_connection_sees_only_committed(path):
+    writer, reader = connect(path), connect(path)
+    writer.begin()
+    writer.execute("insert into t values ('d', 4)")
+    assert len(_rows(reader)) == 3
+    writer.commit()
+    assert len(_rows(reader)) == 4
+    writer.close()
+    reader.close()
+
+
+def test_commit_after_concurrent_change_fails(path):
+    writer, other = connect(path), connect(path)
+    writer.begin()
+    writer.execute("update t set n = 10 where ID = 1")
+    other.execute("insert into t values ('d', 4)")
+    with pytest.raises(OperationalError):
+        writer.commit()
+    writer.rollback()
+    assert _rows(writer)[0] == (1, "a", 1)
+    writer.close()
+    other.close()
+
+
+def test_transaction_errors(path):
+    with connect(path) as connection:
+        with pytest.raises(ProgrammingError):
+            connection.commit()
+        with pytest.raises(ProgrammingError):
+            connection.rollback()
+        connection.begin()
+        with pytest.raises(ProgrammingError):
+            connection.begin()
+        with pytest.raises(ProgrammingError):
+            connection.create_table("u", [("a", "int")])
+        connection.rollback()
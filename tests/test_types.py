@@ -0,0 +1,102 @@
+# tests/test_types.py
+
+import math
+
+import pytest
+
+from src.primitive_db import DataError, ProgrammingError, connect
+from src.primitive_db.core import RecordType
+from src.primitive_db.parser import DEFAULT
+
+SCHEMA = {"ID": "integer", "a": "integer", "f": "float", "s": "text",
+          "b": "boolean"}
+COLUMNS = [("a", "int"), ("f", "float"), ("s", "str"), ("b", "bool")]
+ROWS = [(1, 0.5, "x", True), (None, None, None, None), (-2, 1e300, "", False)]
+
+
+@pytest.fixture
+def record_type():
+    return RecordType(SCHEMA, {"s": {"not_null": True}, "b": {"default": True}})
+
+
+def test_values_are_converted(record_type):
+    assert record_type.values(["5", "1.5", "x", "false"]) == [5, 1.5, "x", False]
+    assert record_type.values([-3, 2, "x", True]) == [-3, 2.0, "x", True]
+    assert record_type.record([1, 1, "x"]) == {"ID": None, "a": 1, "f": 1.0,
+                                               "s": "x", "b": True}
+
+
+@pytest.mark.parametrize("values", [[1.5, 1, "x"], [1, "q", "x"], [1, 1, "x", "yes"]])
+def test_invalid_values(record_type, values):
+    # Дробное значение в столбце int отклоняется, а не обрезается.
+    with pytest.raises(DataError):
+        record_type.values(values)
+
+
+def test_not_null(record_type):
+    assert record_type.values([None, None, "x"]) == [None, None, "x", True]
+    with pytest.raises(DataError):
+        record_type.values([1, 1, None])
+    with pytest.raises(DataError):
+        record_type.changes({"s": None})
+
+
+def test_defaults(record_type):
+    assert record_type.required == 3
+    assert record_type.values([1, 1, "x", DEFAULT]) == [1, 1.0, "x", True]
+    assert record_type.changes({"b": DEFAULT, "a": "7"}) == {"b": True, "a": 7}
+    with pytest.raises(ProgrammingError):
+        record_type.values([1, 1])
+    with pytest.raises(ProgrammingError):
+        record_type.changes({"ID": 5})
+
+
+def test_constraints_through_connection(connection):
+    connection.create_table("u", [("name", "str", {"not_null": True}),
+                                  ("age", "int", {"default": 18})])
+    connection.execute("insert into u values ('a')")
+    connection.execute("insert into u values ('b', null)")
+    assert connection.execute("select from u").fetchall() == [(1, "a", 18),
+                                                              (2, "b", None)]
+    with pytest.raises(DataError):
+        connection.execute("insert into u values (null, 3)")
+    with pytest.raises(DataError):
+        connection.execute("update u set name = null where ID = 1")
+    connection.execute("update u set age = default where ID = 2")
+    assert connection.execute("select count(*), sum(age) from u").fetchall() == [
+        (2, 36)]
+
+
+def test_float_and_null_columns(connection):
+    connection.create_table("t", COLUMNS)
+    connection.executemany("insert into t values (?, ?, ?, ?)", ROWS)
+    assert connection.execute("select ID from t where f is null").fetchall() == [
+        (2,)]
+    assert connection.execute("select ID from t where f > 0.25").fetchall() == [
+        (1,), (3,)]
+    assert connection.execute("select count(f), max(f) from t").fetchall() == [
+        (2, 1e300)]
+    # NaN хранит NULL столбца float, поэтому как значение он не принимается.
+    with pytest.raises(DataError):
+        connection.execute("insert into t values (1, ?, 'x', true)", (math.nan,))
+    connection.execute("insert into t values (1, ?, 'x', true)", (math.inf,))
+    assert connection.execute("select f from t where ID = 4").fetchall() == [
+        (math.inf,)]
+
+
+@pytest.mark.parametrize("storage, other", [("jsonl", "binary"), ("binary", "jsonl")])
+def test_storage_round_trip(tmp_path, storage, other):
+    # Значения всех типов, в том числе NULL, переживают переоткрытие базы
+    # и перевод таблицы в другой формат и обратно.
+    path = tmp_path / "data"
+    expected = [(i + 1, *row) for i, row in enumerate(ROWS)]
+    with connect(path) as connection:
+        connection.create_table("t", COLUMNS, storage=storage)
+        connection.executemany("insert into t values (?, ?, ?, ?)", ROWS)
+    for target in (other, storage):
+        with connect(path) as connection:
+            assert connection.execute("select from t").fetchall() == expected
+            connection.convert("t", target)
+            assert connection.table_info("t")["storage"] == target
+    with connect(path) as connection:
+        assert connection.execute("select from t").fetchall() == expected
@@ -0,0 +1,89 @@
+# tests/test_wal.py
+
+import json
+import os
+
+import pytest
+
+from src.primitive_db import connect
+from src.primitive_db.storage import insert_record, log_path
+from src.primitive_db.utils import DataDir, load_metadata
+from src.primitive_db.wal import wal_path
+
+
+@pytest.fixture
+def data_dir(tmp_path):
+    data_dir = DataDir(tmp_path / "data")
+    with connect(data_dir.path) as connection:
+        connection.create_table("t", [("a", "int")])
+        connection.execute("insert into t values (1)")
+    return data_dir
+
+
+def _write_wal(data_dir, *records):
+    with open(wal_path(data_dir), "w", encoding="utf-8") as f:
+        for record in records:
+            f.write(json.dumps(record) + "\n")
+
+
+def _rows(data_dir):
+    with connect(data_dir.path) as connection:
+        return connection.execute("select from t").fetchall()
+
+
+def _commit_record(data_dir, *values):
+    # Операция commit транзакции, которая вставляет строки со значениями values.
+    records = [insert_record({"ID": 2 + i, "a": value})
+               for i, value in enumerate(values)]
+    return {"tables": {"t": {"offset": os.path.getsize(log_path(data_dir, "t")),
+                             "records": records}}}
+
+
+def test_create_is_replayed_on_connect(data_dir):
+    metadata = dict(load_metadata(data_dir), u={"ID": "integer", "b": "text"})
+    _write_wal(data_dir, {"metadata": metadata, "create": {"u": metadata["u"]},
+                          "remove": []})
+    with connect(data_dir.path) as connection:
+        assert connection.recovered == 1
+        assert connection.list_tables() == ["t", "u"]
+    assert not os.path.exists(wal_path(data_dir))
+
+
+def test_commit_is_replayed(data_dir):
+    _write_wal(data_dir, _commit_record(data_dir, 5, 6))
+    assert _rows(data_dir) == [(1, 1), (2, 5), (3, 6)]
+
+
+def test_replay_after_partial_apply_does_not_duplicate(data_dir):
+    # Процесс упал после того, как дописал часть записей в лог: повтор
+    # обрезает лог до длины перед транзакцией.
+    record = _commit_record(data_dir, 5, 6)
+    with open(log_path(data_dir, "t"), "a", encoding="utf-8") as f:
+        f.write(json.dumps(record["tables"]["t"]["records"][0]) + "\n")
+    _write_wal(data_dir, record)
+    assert _rows(data_dir) == [(1, 1), (2, 5), (3, 6)]
+
+
+def test_torn_journal_line_is_ignored(data_dir):
+    # Оборванная запись журнала: до сбоя операция не начинала применяться.
+    with open(wal_path(data_dir), "w", encoding="utf-8") as f:
+        f.write('{"tables": {"t": ')
+    assert _rows(data_dir) == [(1, 1)]
+    assert not os.path.exists(wal_path(data_dir))
+
+
+def test_temporary_files_are_removed(data_dir):
+    tmp_file = data_dir.file("t.jsonl.tmp")
+    with open(tmp_file, "w", encoding="utf-8") as f:
+        f.write("partial")
+    connect(data_dir.path).close()
+    assert not os.path.exists(tmp_file)
+
+
+def test_torn_log_line_is_dropped(data_dir):
+    with open(log_path(data_dir, "t"), "a", encoding="utf-8") as f:
+        f.write('{"op": "i", "row": {"ID": 2, ')
+    assert _rows(data_dir) == [(1, 1)]
+    with connect(data_dir.path) as connection:
+        assert connection.execute("insert into t values (7)").lastrowid == 2
+    assert _rows(data_dir) == [(1, 1), (2, 7)]